@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+# Case-insensitive indexes on auth_user for the lookups Django generates for
+# iexact/istartswith: on SQLite `col LIKE %s`, served by a NOCASE index; on
+# PostgreSQL `UPPER(col::text) LIKE UPPER(%s)`, served by a pattern_ops
+# expression index. Other backends keep the plain lookups.
+INDEXES = [
+    ('accounts_user_email_ci_idx', 'email'),
+    ('accounts_user_username_ci_idx', 'username'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, column in INDEXES:
+        if vendor == 'sqlite':
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON auth_user ({column} COLLATE NOCASE)')
+        elif vendor == 'postgresql':
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON auth_user (UPPER({column}::text) text_pattern_ops)'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for name, column in INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -2,10 +2,12 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from monitoring.serializers import TimedSerializerMixin
+from wembli.sparse_fields import SparseFieldsetMixin
 from .models import Profile, Address
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined']
@@ -26,7 +28,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return attrs
     
     def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
+        # iexact is served by the case-insensitive email index (accounts 0002)
+        if User.objects.filter(email__iexact=value).exists():
             raise serializers.ValidationError("A user with this email already exists.")
         return value
     
@@ -73,12 +76,15 @@ class ChangePasswordSerializer(serializers.Serializer):
         return value
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
     first_name = serializers.CharField(source='user.first_name', read_only=True)
     last_name = serializers.CharField(source='user.last_name', read_only=True)
     full_name = serializers.SerializerMethodField()
+    sparse_field_requirements = {
+        'full_name': {'select_related': ['user'], 'only': ['user', 'user__first_name', 'user__last_name']},
+    }
     
     class Meta:
         model = Profile
@@ -118,7 +124,7 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
@@ -155,7 +161,7 @@ class AddressCreateSerializer(serializers.ModelSerializer):
         return Address.objects.create(user=user, **validated_data)
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(read_only=True)
     
     class Meta:
@@ -1,3 +1,82 @@
+import csv
+import io
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Profile
+from .serializers import UserRegistrationSerializer
+
+
+class UserDirectoryTest(TestCase):
+    """The admin user directory pages by keyset and searches by index-backed prefix."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', email='admin@example.com', is_staff=True)
+        cls.users = [
+            User.objects.create_user(f'user{i}', email=f'User{i}@Example.com', is_active=i != 4)
+            for i in range(5)
+        ]
+        for user in cls.users:
+            Profile.objects.create(user=user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def ids(self, response):
+        return [row['id'] for row in response.json()['results']]
+
+    def test_cursor_pages(self):
+        response = self.client.get('/accounts/users/', {'page_size': 2})
+        seen = self.ids(response)
+        next_url = response.json()['next']
+        # Rows inserted mid-walk land before the cursor and don't shift later pages.
+        User.objects.create_user('late')
+        while next_url:
+            response = self.client.get(next_url)
+            seen += self.ids(response)
+            next_url = response.json()['next']
+        expected = sorted([self.admin.pk] + [user.pk for user in self.users], reverse=True)
+        self.assertEqual(seen, expected)
+
+    def test_search_and_filters(self):
+        response = self.client.get('/accounts/users/', {'search': 'USER'})
+        self.assertEqual(len(self.ids(response)), 5)
+        response = self.client.get('/accounts/users/', {'search': 'user3@example'})
+        self.assertEqual(self.ids(response), [self.users[3].pk])
+        response = self.client.get('/accounts/users/', {'search': 'user', 'is_active': 'false'})
+        self.assertEqual(self.ids(response), [self.users[4].pk])
+
+    def test_include_profile(self):
+        response = self.client.get('/accounts/users/', {'search': 'user', 'include': 'profile'})
+        self.assertTrue(all('profile' in row for row in response.json()['results']))
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.get('/accounts/users/').status_code, 403)
+        self.assertEqual(self.client.get('/accounts/users/export/').status_code, 403)
+
+    def test_export(self):
+        response = self.client.get('/accounts/users/export/', {'is_active': 'true'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['id', 'username', 'email'])
+        self.assertEqual([row[1] for row in rows[1:]], ['admin', 'user0', 'user1', 'user2', 'user3'])
+
+    def test_email_lookups_use_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('index check is SQLite specific')
+        queryset = User.objects.filter(email__istartswith='user1')
+        self.assertIn('accounts_user_email_ci_idx', queryset.explain())
 
-# Create your tests here.
+    def test_registration_email_unique_ignoring_case(self):
+        serializer = UserRegistrationSerializer(data={
+            'username': 'another', 'email': 'USER0@example.COM',
+            'password': 'a-Long-pass-9', 'password_confirm': 'a-Long-pass-9',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
@@ -25,4 +25,5 @@ urlpatterns = [
     
     # Admin URLs
     path('users/', views.UserListView.as_view(), name='user-list'),
+    path('users/export/', views.export_users, name='user-export'),
 ]
\ No newline at end of file
@@ -1,10 +1,16 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout
 from django.contrib.auth.models import User
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+import csv
+from wembli.batch import no_batch
+from wembli.sparse_fields import SparseQuerysetMixin
 
 from .models import Profile, Address
 from .serializers import (
@@ -132,7 +138,7 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
 
 
 # Address Views
-class AddressListCreateView(generics.ListCreateAPIView):
+class AddressListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -145,7 +151,7 @@ class AddressListCreateView(generics.ListCreateAPIView):
         return AddressSerializer
 
 
-class AddressDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AddressDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -195,10 +201,69 @@ def get_default_address(request):
 
 
 # User Management Views (for admin or extended functionality)
-class UserListView(generics.ListAPIView):
-    queryset = User.objects.all()
+class UserPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
+
+
+USER_EXPORT_FIELDS = ['id', 'username', 'email', 'first_name', 'last_name',
+                      'is_active', 'is_staff', 'date_joined', 'last_login']
+
+
+def filter_users(queryset, query_params):
+    """``?search=`` prefix match on username or email, case-insensitive and index-backed."""
+    search = (query_params.get('search') or '').strip()
+    if search:
+        queryset = queryset.filter(Q(username__istartswith=search) | Q(email__istartswith=search))
+    
+    is_active = query_params.get('is_active')
+    if is_active in ('true', 'false'):
+        queryset = queryset.filter(is_active=is_active == 'true')
+    
+    return queryset
+
+
+class UserListView(SparseQuerysetMixin, generics.ListAPIView):
+    """Admin user directory: keyset (cursor) pagination, ``?search=`` and ``?include=profile``."""
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = UserPagination
+
+    def get_serializer_class(self):
+        if self.request.query_params.get('include') == 'profile':
+            return UserProfileSerializer
+        return UserSerializer
+
+    def get_queryset(self):
+        return filter_users(User.objects.all(), self.request.query_params)
+
+
+class Echo:
+    """File-like object for csv.writer that hands rows back instead of buffering them."""
+
+    def write(self, value):
+        return value
+
+
+@no_batch
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_users(request):
+    """Stream the (filtered) user directory as CSV without loading it into memory."""
+    users = filter_users(User.objects.order_by('id'), request.query_params)
+    writer = csv.writer(Echo())
+    rows = users.values_list(*USER_EXPORT_FIELDS).iterator(chunk_size=2000)
+    
+    def stream():
+        yield writer.writerow(USER_EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+    
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="users.csv"'
+    return response
 
 
 @api_view(['GET'])
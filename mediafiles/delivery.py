@@ -0,0 +1,160 @@
+"""
+File delivery that keeps file bytes out of Python workers where possible.
+
+``serve_file`` either hands the file to the front-end server
+(``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache/lighttpd) or, with
+``FILE_DELIVERY = None``, streams it itself with byte-range support. Either
+way responses carry a strong ETag and cache headers; content-hashed file
+names are cached as immutable.
+"""
+
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+
+
+CONTENT_HASH_RE = re.compile(r'^[0-9a-f]{32,}$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def resolve_path(root, path):
+    """Absolute path of ``path`` under ``root``; 404 for traversal, dotfiles and directories."""
+    path = posixpath.normpath(path).lstrip('/')
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404('File not found')
+    try:
+        fullpath = Path(safe_join(root, path))
+    except ValueError:
+        raise Http404('File not found')
+    if not fullpath.is_file():
+        raise Http404('File not found')
+    return fullpath
+
+
+def content_hash(fullpath):
+    """The hash embedded in a content-addressed file name, if any."""
+    stem = fullpath.name.split('.', 1)[0]
+    return stem if CONTENT_HASH_RE.match(stem) else None
+
+
+def file_etag(fullpath, stat):
+    digest = content_hash(fullpath)
+    if digest:
+        return f'"{digest}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def cache_control(fullpath):
+    if content_hash(fullpath):
+        return IMMUTABLE_CACHE_CONTROL
+    return f'public, max-age={getattr(settings, "FILE_DELIVERY_MAX_AGE", 3600)}'
+
+
+def parse_range(header, size):
+    """``(start, end)`` inclusive for a single satisfiable range, None to send it all,
+    or False if the range cannot be satisfied."""
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        # Malformed and multi-range requests get the full entity.
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(fullpath, start, length):
+    with open(fullpath, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload(fullpath, root, content_type, method):
+    response = HttpResponse(content_type=content_type)
+    if method == 'x-accel-redirect':
+        root = Path(root).resolve()
+        prefix = next(
+            prefix for prefix, location in settings.ACCEL_REDIRECT_LOCATIONS.items()
+            if Path(location).resolve() == root
+        )
+        relative = fullpath.relative_to(root).as_posix()
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative)
+    else:
+        response['X-Sendfile'] = str(fullpath)
+    return response
+
+
+def serve_file(request, root, path, offload=True):
+    """Serve ``path`` below ``root``; ``offload=False`` always streams from Django."""
+    method = getattr(settings, 'FILE_DELIVERY', None) if offload else None
+    fullpath = resolve_path(root, path).resolve()
+    stat = fullpath.stat()
+    etag = file_etag(fullpath, stat)
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or 'application/octet-stream'
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        response = HttpResponseNotModified()
+    else:
+        if method:
+            response = _offload(fullpath, root, content_type, method)
+        else:
+            response = _local_response(request, fullpath, stat, etag, content_type)
+        # The front-end server passes these headers through with the file.
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control(fullpath)
+    return response
+
+
+def _local_response(request, fullpath, stat, etag, content_type):
+    size = stat.st_size
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file_range(fullpath, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
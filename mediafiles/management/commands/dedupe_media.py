@@ -0,0 +1,76 @@
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mediafiles.models import StoredFile
+from mediafiles.storage import content_addressed_name, count_references, hash_file, referencing_fields
+
+
+class Command(BaseCommand):
+    help = (
+        'Move existing uploads in MEDIA_ROOT to content-addressed names, '
+        'keeping one copy of identical files and updating the model fields that reference them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        fields = list(referencing_fields())
+        directories = sorted({
+            model._meta.get_field(field_name).upload_to.rstrip('/')
+            for model, field_name in fields
+            if isinstance(model._meta.get_field(field_name).upload_to, str)
+        })
+
+        moved = duplicates = saved_bytes = 0
+        for directory in directories:
+            absolute = os.path.join(settings.MEDIA_ROOT, directory)
+            if not os.path.isdir(absolute):
+                continue
+            # Only files directly in the upload directory; content-addressed
+            # files already live in its two-character subdirectories.
+            for entry in sorted(os.scandir(absolute), key=lambda entry: entry.name):
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                old_name = posixpath.join(directory, entry.name)
+                with open(entry.path, 'rb') as f:
+                    sha256 = hash_file(f)
+                new_name = content_addressed_name(old_name, sha256)
+                new_path = os.path.join(settings.MEDIA_ROOT, new_name)
+                is_duplicate = os.path.exists(new_path)
+                size = entry.stat().st_size
+
+                if is_duplicate:
+                    duplicates += 1
+                    saved_bytes += size
+                else:
+                    moved += 1
+                if dry_run:
+                    continue
+
+                with transaction.atomic():
+                    for model, field_name in fields:
+                        model._default_manager.filter(**{field_name: old_name}).update(**{field_name: new_name})
+                    StoredFile.objects.get_or_create(name=new_name, defaults={'sha256': sha256, 'size': size})
+                    if is_duplicate:
+                        os.remove(entry.path)
+                    else:
+                        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                        os.replace(entry.path, new_path)
+
+        if not dry_run:
+            references = count_references()
+            for stored in StoredFile.objects.iterator(chunk_size=2000):
+                count = references.get(stored.name, 0)
+                if count != stored.refcount:
+                    StoredFile.objects.filter(pk=stored.pk).update(refcount=count)
+
+        prefix = 'Would move' if dry_run else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {moved} files; {duplicates} duplicates removed ({saved_bytes} bytes).'
+        ))
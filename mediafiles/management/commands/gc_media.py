@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mediafiles.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed uploads that no model field references any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep unreferenced files younger than this (default 24).')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(hours=options['grace_hours'])
+        deleted, recounted = collect_garbage(older_than, dry_run=options['dry_run'])
+        prefix = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {deleted} unreferenced files; {recounted} reference counts corrected.'
+        ))
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """A content-addressed file in MEDIA_ROOT and how many model fields reference it."""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
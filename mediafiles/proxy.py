@@ -0,0 +1,60 @@
+"""
+Stand-in for the front-end server's file offloading, for local runs and tests.
+
+``OffloadProxy`` wraps a WSGI application and, like nginx or Apache would,
+replaces responses carrying ``X-Accel-Redirect`` or ``X-Sendfile`` with the
+referenced file, honouring range and conditional requests::
+
+    WEMBLI_OFFLOAD_PROXY=1 FILE_DELIVERY=x-accel-redirect gunicorn wembli.wsgi
+"""
+
+from pathlib import Path
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import Http404, HttpResponseNotFound
+
+from .delivery import serve_file
+
+
+class OffloadProxy:
+    def __init__(self, app, locations=None):
+        self.app = app
+        self.locations = locations if locations is not None else settings.ACCEL_REDIRECT_LOCATIONS
+
+    def __call__(self, environ, start_response):
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'], captured['headers'] = status, headers
+            offloaded = {name.lower() for name, _ in headers} & {'x-accel-redirect', 'x-sendfile'}
+            if offloaded:
+                # Swallow the app's response; we send the file instead.
+                return lambda data: None
+            return start_response(status, headers, exc_info)
+
+        body = self.app(environ, capture_start_response)
+        headers = dict((name.lower(), value) for name, value in captured.get('headers', []))
+        target = headers.get('x-accel-redirect') or headers.get('x-sendfile')
+        if target is None:
+            return body
+        if hasattr(body, 'close'):
+            body.close()
+
+        response = self._serve(WSGIRequest(environ), target, 'x-sendfile' in headers)
+        status = f'{response.status_code} {response.reason_phrase}'
+        start_response(status, [(name, value) for name, value in response.items()])
+        return response
+
+    def _serve(self, request, target, sendfile):
+        try:
+            if sendfile:
+                path = Path(target)
+                return serve_file(request, path.parent, path.name, offload=False)
+            for prefix, root in self.locations.items():
+                if target.startswith(prefix):
+                    return serve_file(request, root, unquote(target[len(prefix):]), offload=False)
+        except Http404:
+            pass
+        return HttpResponseNotFound()
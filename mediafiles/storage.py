@@ -0,0 +1,140 @@
+"""
+Content-addressed, deduplicated upload storage.
+
+Uploads are named after the SHA-256 of their bytes inside their ``upload_to``
+directory (``products/3f/3fa9...c1.jpg``), so re-uploading the same image
+stores nothing new. ``StoredFile`` counts references; ``gc_media`` reconciles
+the counts with the model fields in ``MEDIA_FILE_FIELDS`` and removes
+unreferenced files, ``dedupe_media`` converts existing uploads.
+"""
+
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def hash_file(file, chunk_size=64 * 1024):
+    digest = hashlib.sha256()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        digest.update(chunk)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(name, sha256):
+    """``products/photo.JPG`` -> ``products/3f/3fa9...c1.jpg``"""
+    directory = posixpath.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return posixpath.join(directory, sha256[:2], sha256 + extension)
+
+
+def referencing_fields():
+    """``(model, field_name)`` for every file field whose uploads are content-addressed."""
+    for label in getattr(settings, 'MEDIA_FILE_FIELDS', []):
+        model_label, field_name = label.rsplit('.', 1)
+        yield apps.get_model(model_label), field_name
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        from .models import StoredFile
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        sha256 = hash_file(content)
+        name = content_addressed_name(name, sha256)
+
+        # Count the reference before looking at the file: collect_garbage
+        # either sees the new count and keeps the file, or has already
+        # removed row and file, and the file is written again below.
+        if not StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1):
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.create(name=name, sha256=sha256, size=content.size, refcount=1)
+            except IntegrityError:
+                StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+        if not self.exists(name):
+            # Write under a unique temporary name, then move into place. A
+            # concurrent upload of the same bytes may also move its copy there;
+            # the contents are identical, so either one winning is fine.
+            tmp_name = self._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+            os.replace(self.path(tmp_name), self.path(name))
+        return name
+
+    def delete(self, name):
+        from .models import StoredFile
+
+        stored = StoredFile.objects.filter(name=name).first()
+        if stored is None:
+            # Not content-addressed (a legacy upload); behave like FileSystemStorage.
+            return super().delete(name)
+        if stored.refcount > 1:
+            StoredFile.objects.filter(pk=stored.pk, refcount__gt=1).update(refcount=F('refcount') - 1)
+            return
+        stored.delete()
+        super().delete(name)
+
+
+def count_references():
+    """How many rows of each ``MEDIA_FILE_FIELDS`` field reference each file name."""
+    references = {}
+    for model, field_name in referencing_fields():
+        names = (
+            model._default_manager.exclude(**{f'{field_name}__isnull': True})
+            .exclude(**{field_name: ''})
+            .values_list(field_name, flat=True)
+            .iterator(chunk_size=2000)
+        )
+        for name in names:
+            references[name] = references.get(name, 0) + 1
+    return references
+
+
+def collect_garbage(older_than, dry_run=False):
+    """Fix reference counts and delete unreferenced files created before ``older_than``.
+
+    The age cut-off protects files that were just uploaded but whose model
+    row hasn't been saved yet; their counts are left alone too, as zeroing
+    one would let the next delete of the file remove it from under that row.
+    Counts are read before the references, and a row is only changed if its
+    count still matches, so a file re-uploaded meanwhile is kept.
+    Returns ``(deleted, recounted)``.
+    """
+    from .models import StoredFile
+
+    storage = FileSystemStorage(location=settings.MEDIA_ROOT)
+    stored_files = list(
+        StoredFile.objects.filter(created_at__lt=older_than).values_list('pk', 'name', 'refcount')
+    )
+    references = count_references()
+    deleted = recounted = 0
+    for pk, name, refcount in stored_files:
+        count = references.get(name, 0)
+        if count == 0:
+            if dry_run:
+                deleted += 1
+                continue
+            # The file goes while the row delete is uncommitted, so a
+            # concurrent save() of the same bytes waits and writes it again.
+            with transaction.atomic():
+                if StoredFile.objects.filter(pk=pk, refcount=refcount).delete()[0]:
+                    storage.delete(name)
+                    deleted += 1
+        elif count != refcount:
+            if dry_run or StoredFile.objects.filter(pk=pk, refcount=refcount).update(refcount=count):
+                recounted += 1
+    return deleted, recounted
@@ -0,0 +1,245 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from shop.models import Category
+
+from . import storage
+from .delivery import IMMUTABLE_CACHE_CONTROL, serve_file
+from .models import StoredFile
+from .proxy import OffloadProxy
+from .storage import ContentAddressedStorage, collect_garbage
+
+
+CONTENT = bytes(range(256)) * 4
+CONTENT_HASH = '0123456789abcdef0123456789abcdef'
+
+
+class DeliveryTestMixin:
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = tmpdir.name
+        Path(self.root, 'data.bin').write_bytes(CONTENT)
+        Path(self.root, f'{CONTENT_HASH}.bin').write_bytes(CONTENT)
+        Path(self.root, 'feed.json.gz').write_bytes(gzip.compress(b'[]'))
+        Path(self.root, '.secret').write_bytes(b'secret')
+        self.factory = RequestFactory()
+        locations = override_settings(ACCEL_REDIRECT_LOCATIONS={'/protected/': self.root})
+        locations.enable()
+        self.addCleanup(locations.disable)
+
+    def serve(self, name, **headers):
+        return serve_file(self.factory.get(f'/files/{name}', headers=headers), self.root, name)
+
+
+@override_settings(FILE_DELIVERY=None)
+class LocalDeliveryTest(DeliveryTestMixin, SimpleTestCase):
+    """Without offloading, Django streams files with ranges and validators."""
+
+    def test_full_file(self):
+        response = self.serve('data.bin')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'])
+
+    def test_range(self):
+        response = self.serve('data.bin', range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+
+    def test_suffix_range(self):
+        response = self.serve('data.bin', range='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.serve('data.bin', range=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        response = self.serve('data.bin', range='bytes=0-9', if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        etag = self.serve('data.bin')['ETag']
+        response = self.serve('data.bin', if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_content_hashed_names_are_immutable(self):
+        response = self.serve(f'{CONTENT_HASH}.bin')
+        self.assertEqual(response['ETag'], f'"{CONTENT_HASH}"')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_gzip_encoding(self):
+        response = self.serve('feed.json.gz')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_hidden_and_traversal_paths_404(self):
+        for name in ('.secret', '../data.bin', 'missing.bin'):
+            with self.subTest(name=name), self.assertRaises(Http404):
+                self.serve(name)
+
+
+class OffloadDeliveryTest(DeliveryTestMixin, SimpleTestCase):
+    """Offloaded responses carry the same headers as local ones, and no body."""
+
+    @override_settings(FILE_DELIVERY='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = self.serve('feed.json.gz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/feed.json.gz')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_DELIVERY='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.serve('feed.json.gz')
+        self.assertEqual(response['X-Sendfile'], str(Path(self.root, 'feed.json.gz').resolve()))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    @override_settings(FILE_DELIVERY='x-accel-redirect')
+    def test_not_modified_is_not_offloaded(self):
+        etag = self.serve('data.bin')['ETag']
+        response = self.serve('data.bin', if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+    def test_headers_match_local_delivery(self):
+        names = ('ETag', 'Last-Modified', 'Cache-Control', 'Content-Type', 'Content-Encoding')
+        with override_settings(FILE_DELIVERY=None):
+            local = self.serve('feed.json.gz')
+        for method in ('x-accel-redirect', 'x-sendfile'):
+            with self.subTest(method=method), override_settings(FILE_DELIVERY=method):
+                offloaded = self.serve('feed.json.gz')
+                self.assertEqual([offloaded[name] for name in names], [local[name] for name in names])
+
+
+class OffloadProxyTest(DeliveryTestMixin, SimpleTestCase):
+    """The proxy sends the file an offloaded response points at, as nginx would."""
+
+    def request(self, name, method='x-accel-redirect', **headers):
+        def app(environ, start_response):
+            with override_settings(FILE_DELIVERY=method):
+                response = serve_file(WSGIRequest(environ), self.root, name)
+            start_response(f'{response.status_code} {response.reason_phrase}', list(response.items()))
+            return response
+
+        captured = {}
+
+        def start_response(status, headers):
+            captured['status'], captured['headers'] = status, dict(headers)
+
+        proxy = OffloadProxy(app, locations={'/protected/': self.root})
+        body = b''.join(proxy(self.factory.get(f'/files/{name}', headers=headers).environ, start_response))
+        return captured['status'], captured['headers'], body
+
+    def test_serves_accel_redirect(self):
+        status, headers, body = self.request('data.bin')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, CONTENT)
+        self.assertNotIn('X-Accel-Redirect', headers)
+
+    def test_serves_sendfile_range(self):
+        status, headers, body = self.request('data.bin', method='x-sendfile', range='bytes=0-3')
+        self.assertEqual(status, '206 Partial Content')
+        self.assertEqual(body, CONTENT[:4])
+
+    def test_gzip_encoding(self):
+        status, headers, body = self.request('feed.json.gz')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), b'[]')
+
+
+class ContentAddressedStorageTest(TestCase):
+    """Uploads are stored once per content and deleted with their last reference."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = tmpdir.name
+        media_root = override_settings(MEDIA_ROOT=self.root)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def test_same_content_stored_once(self):
+        first = self.storage.save('products/photo.JPG', ContentFile(b'pixels'))
+        second = self.storage.save('products/other.jpg', ContentFile(b'pixels'))
+        digest = hashlib.sha256(b'pixels').hexdigest()
+        self.assertEqual(first, f'products/{digest[:2]}/{digest}.jpg')
+        self.assertEqual(second, first)
+        self.assertEqual(StoredFile.objects.get(name=first).refcount, 2)
+        self.assertEqual(os.listdir(Path(self.root, 'products', digest[:2])), [f'{digest}.jpg'])
+
+    def test_deleted_with_last_reference(self):
+        name = self.storage.save('products/a.png', ContentFile(b'a'))
+        self.storage.save('products/b.png', ContentFile(b'a'))
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 1)
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_legacy_files_deleted_directly(self):
+        Path(self.root, 'legacy.png').write_bytes(b'old')
+        self.storage.delete('legacy.png')
+        self.assertFalse(self.storage.exists('legacy.png'))
+
+    def test_collect_garbage(self):
+        category = Category.objects.create(name='Lamps', slug='lamps')
+        used = self.storage.save('categories/used.png', ContentFile(b'used'))
+        orphan = self.storage.save('categories/orphan.png', ContentFile(b'orphan'))
+        Category.objects.filter(pk=category.pk).update(image=used)
+        StoredFile.objects.filter(name=used).update(refcount=5)
+
+        # Within the grace period nothing is deleted or recounted.
+        self.assertEqual(collect_garbage(timezone.now() - timedelta(hours=1)), (0, 0))
+        self.assertTrue(self.storage.exists(orphan))
+        self.assertEqual(StoredFile.objects.get(name=orphan).refcount, 1)
+
+        self.assertEqual(collect_garbage(timezone.now() + timedelta(seconds=1), dry_run=True), (1, 1))
+        self.assertTrue(self.storage.exists(orphan))
+        self.assertEqual(collect_garbage(timezone.now() + timedelta(seconds=1)), (1, 1))
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertEqual(StoredFile.objects.get(name=used).refcount, 1)
+        # Uploaded again after collection: stored afresh.
+        self.assertEqual(self.storage.save('categories/again.png', ContentFile(b'orphan')), orphan)
+        self.assertTrue(self.storage.exists(orphan))
+
+    def test_reupload_during_collection_kept(self):
+        category = Category.objects.create(name='Lamps', slug='lamps')
+        orphan = self.storage.save('categories/orphan.png', ContentFile(b'orphan'))
+        StoredFile.objects.filter(name=orphan).update(created_at=timezone.now() - timedelta(days=1))
+        real_count_references = storage.count_references
+
+        def count_references():
+            references = real_count_references()
+            # Same bytes uploaded and saved on a model after the snapshot.
+            name = self.storage.save('categories/new.png', ContentFile(b'orphan'))
+            Category.objects.filter(pk=category.pk).update(image=name)
+            return references
+
+        with mock.patch('mediafiles.storage.count_references', count_references):
+            self.assertEqual(collect_garbage(timezone.now()), (0, 0))
+        self.assertTrue(self.storage.exists(orphan))
+        self.assertEqual(StoredFile.objects.get(name=orphan).refcount, 2)
+        self.assertEqual(collect_garbage(timezone.now()), (0, 1))
+
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.http import Http404
+
+from .delivery import serve_file
+
+
+def can_access(request, path):
+    private_prefixes = getattr(settings, 'MEDIA_PRIVATE_PREFIXES', [])
+    if any(path.startswith(prefix) for prefix in private_prefixes):
+        return request.user.is_authenticated and request.user.is_staff
+    return True
+
+
+def serve_media(request, path):
+    """Serve an uploaded file from MEDIA_ROOT after checking access."""
+    if not can_access(request, path):
+        # 404 rather than 403 so private file names aren't confirmed.
+        raise Http404('File not found')
+    return serve_file(request, settings.MEDIA_ROOT, path)
@@ -0,0 +1,29 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['normalized_sql_preview', 'view', 'count', 'average_ms', 'max_ms', 'full_scan_tables', 'last_seen']
+    list_filter = [('full_scan_tables', admin.EmptyFieldListFilter), 'view', 'alias']
+    search_fields = ['normalized_sql', 'view', 'location']
+    readonly_fields = [
+        'fingerprint', 'normalized_sql', 'sql', 'view', 'location', 'alias', 'count', 'total_duration',
+        'max_duration', 'plan', 'full_scan_tables', 'explained_at', 'first_seen', 'last_seen',
+    ]
+
+    @admin.display(description='SQL')
+    def normalized_sql_preview(self, obj):
+        return obj.normalized_sql[:120]
+
+    @admin.display(description='avg ms')
+    def average_ms(self, obj):
+        return round(obj.average_duration * 1000, 1)
+
+    @admin.display(description='max ms', ordering='max_duration')
+    def max_ms(self, obj):
+        return round(obj.max_duration * 1000, 1)
+
+    def has_add_permission(self, request):
+        return False
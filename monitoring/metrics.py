@@ -0,0 +1,260 @@
+"""
+In-process counters and histograms, exposed at /metrics in the Prometheus
+text format.
+
+Recording is a dict update under a lock. Under a pre-forked server each
+worker only sees its own requests, so with ``METRICS_DIR`` set every process
+also writes its values to its own file there (at most every
+``METRICS_FLUSH_SECONDS``, and at exit) and /metrics adds up all the files.
+Like prometheus_client's multiprocess mode, counters of exited workers are
+kept, so the directory should be emptied when the server is (re)deployed.
+"""
+
+import atexit
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.collectors = []
+        self._reset_process()
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker starts from zero rather than re-reporting
+            # whatever the parent had recorded before the fork.
+            os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self.flush)
+
+    def _reset_process(self):
+        self._pid = os.getpid()
+        self._token = secrets.token_hex(4)
+        self._last_flush = time.monotonic()
+
+    def _after_fork(self):
+        self.lock = threading.Lock()
+        for metric in self.metrics.values():
+            metric.values = {}
+        self._reset_process()
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+
+    def register_collector(self, collector):
+        """``collector()`` yields ``(name, type, help, labels, value)`` at snapshot time, for state kept elsewhere."""
+        self.collectors.append(collector)
+        return collector
+
+    def snapshot(self):
+        with self.lock:
+            snapshot = {
+                name: dict(metric.describe(), samples=metric.samples())
+                for name, metric in self.metrics.items()
+            }
+        for collector in self.collectors:
+            for name, metric_type, documentation, labels, value in collector():
+                entry = snapshot.setdefault(name, {
+                    'type': metric_type, 'help': documentation, 'labelnames': list(labels), 'samples': [],
+                })
+                entry['samples'].append([[str(labels[label]) for label in entry['labelnames']], value])
+        return snapshot
+
+    def process_file(self, directory):
+        return os.path.join(directory, f'metrics-{self._pid}-{self._token}.json')
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        directory = get_metrics_dir()
+        if not directory or not any(metric.values for metric in self.metrics.values()):
+            return
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, self.process_file(directory))
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+            self.flush()
+
+    def collect(self):
+        """Values of every process (or just this one without ``METRICS_DIR``)."""
+        directory = get_metrics_dir()
+        if not directory:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for filename in sorted(os.listdir(directory)):
+            if not filename.startswith('metrics-') or not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    merge_snapshot(merged, json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merged
+
+
+registry = Registry()
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self.values = {}
+        self.registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def describe(self):
+        return {'type': self.type, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    def samples(self):
+        return [[list(key), value] for key, value in self.values.items()]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=registry):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            # Per-bucket (not cumulative) counts, then sum and count.
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * len(self.buckets) + [0, 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-2] += value
+            state[-1] += 1
+        self.registry.maybe_flush()
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def describe(self):
+        return dict(super().describe(), buckets=list(self.buckets))
+
+    def samples(self):
+        return [[list(key), list(state)] for key, state in self.values.items()]
+
+
+def get_metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def merge_snapshot(merged, snapshot):
+    for name, entry in snapshot.items():
+        target = merged.setdefault(name, dict(entry, samples=[]))
+        samples = {tuple(labels): value for labels, value in target['samples']}
+        for labels, value in entry['samples']:
+            labels = tuple(labels)
+            if labels not in samples:
+                samples[labels] = value
+            elif isinstance(value, list):
+                samples[labels] = [a + b for a, b in zip(samples[labels], value)]
+            else:
+                samples[labels] += value
+        target['samples'] = [[list(labels), value] for labels, value in samples.items()]
+    return merged
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_text(snapshot):
+    """Prometheus text exposition format 0.0.4."""
+    lines = []
+    for name in sorted(snapshot):
+        entry = snapshot[name]
+        labelnames = entry['labelnames']
+        lines.append(f'# HELP {name} {entry["help"]}')
+        lines.append(f'# TYPE {name} {entry["type"]}')
+        for labels, value in sorted(entry['samples']):
+            if entry['type'] != 'histogram':
+                lines.append(f'{name}{_labels(labelnames, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(entry['buckets'] + [float('inf')], value):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f'{name}_bucket{_labels(labelnames, labels, [le])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labelnames, labels)} {_number(float(value[-2]))}')
+            lines.append(f'{name}_count{_labels(labelnames, labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+http_requests = Counter(
+    'http_requests_total', 'Requests handled, by view, method and status.', ['view', 'method', 'status'],
+)
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Time spent producing a response, by view.', ['view', 'method'],
+)
+http_request_queries = Histogram(
+    'http_request_queries', 'Database queries per request, by view.', ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+db_queries = Counter('db_queries_total', 'Database queries executed, by alias and view.', ['alias', 'view'])
+db_query_duration = Histogram(
+    'db_query_duration_seconds', 'Database query execution time, by alias.', ['alias'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+serializer_duration = Histogram(
+    'serializer_duration_seconds', 'Time to build serializer .data, by serializer.', ['serializer', 'many'],
+)
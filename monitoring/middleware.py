@@ -0,0 +1,102 @@
+import logging
+import time
+import warnings
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import db_queries, db_query_duration, http_request_duration, http_request_queries, http_requests
+from .nplusone import NPlusOneDetector, NPlusOneError, NPlusOneWarning
+from .slow_queries import SlowQueryRecorder, get_threshold
+
+
+nplusone_logger = logging.getLogger('monitoring.nplusone')
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    # Route names, never raw paths, so label values stay bounded.
+    return match.view_name if match is not None else '<unresolved>'
+
+
+class QueryTimer:
+    """``execute_wrapper`` counting and timing one request's queries."""
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            alias = context['connection'].alias
+            db_query_duration.observe(time.perf_counter() - start, alias=alias)
+            db_queries.inc(alias=alias, view=view_label(self.request))
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Records latency, status and query counts of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer(request)
+        start = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            view = view_label(request)
+            http_request_duration.observe(time.perf_counter() - start, view=view, method=request.method)
+            http_requests.inc(view=view, method=request.method, status=status)
+            http_request_queries.observe(timer.count, view=view)
+
+
+class SlowQueryMiddleware:
+    """Logs the request's queries slower than ``SLOW_QUERY_THRESHOLD_MS``; see monitoring.slow_queries."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if get_threshold() is None:
+            return self.get_response(request)
+        recorder = SlowQueryRecorder(request)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                return self.get_response(request)
+        finally:
+            recorder.save()
+
+
+class NPlusOneMiddleware:
+    """Checks every request for repeated queries when ``NPLUSONE_MODE`` is 'warn' or 'raise'."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = getattr(settings, 'NPLUSONE_MODE', None)
+        if mode not in ('warn', 'raise'):
+            return self.get_response(request)
+        with NPlusOneDetector() as detector:
+            response = self.get_response(request)
+        report = detector.report(f'{request.method} {request.path}')
+        if report:
+            if mode == 'raise':
+                raise NPlusOneError(report)
+            nplusone_logger.warning(report)
+            warnings.warn(report, NPlusOneWarning, stacklevel=2)
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('normalized_sql', models.TextField()),
+                ('sql', models.TextField()),
+                ('view', models.CharField(blank=True, max_length=200)),
+                ('location', models.CharField(blank=True, max_length=300)),
+                ('alias', models.CharField(default='default', max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.FloatField(default=0)),
+                ('max_duration', models.FloatField(default=0)),
+                ('plan', models.TextField(blank=True)),
+                ('full_scan_tables', models.CharField(blank=True, max_length=200)),
+                ('explained_at', models.DateTimeField(blank=True, null=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'slow queries',
+                'ordering': ['-last_seen'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    """One row per normalized statement that has run over ``SLOW_QUERY_THRESHOLD_MS``."""
+
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField()
+    # Latest occurrence
+    sql = models.TextField()
+    view = models.CharField(max_length=200, blank=True)
+    location = models.CharField(max_length=300, blank=True)
+    alias = models.CharField(max_length=100, default='default')
+    count = models.PositiveIntegerField(default=0)
+    total_duration = models.FloatField(default=0)
+    max_duration = models.FloatField(default=0)
+    plan = models.TextField(blank=True)
+    # Comma-separated SLOW_QUERY_FULL_SCAN_TABLES the plan reads in full
+    full_scan_tables = models.CharField(max_length=200, blank=True)
+    explained_at = models.DateTimeField(null=True, blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-last_seen']
+        verbose_name_plural = 'slow queries'
+
+    def __str__(self):
+        return self.normalized_sql[:80]
+
+    @property
+    def average_duration(self):
+        return self.total_duration / self.count if self.count else 0
@@ -0,0 +1,160 @@
+"""
+N+1 query detection.
+
+``NPlusOneDetector`` is an ``execute_wrapper`` that groups a request's (or a
+test's) SELECTs by normalized SQL. A statement run ``NPLUSONE_THRESHOLD``
+times or more is reported with the serializer field being rendered when it
+repeated (e.g. ``ReviewSerializer.user_name``) and the innermost project
+frame. ``NPlusOneMiddleware`` (monitoring.middleware) warns about them in
+development (``NPLUSONE_MODE = 'warn'``) or raises (``'raise'``);
+``NPlusOneTestMixin`` fails the test. Known, accepted repeats are listed in ``NPLUSONE_ALLOWLIST``
+as fnmatch patterns of the field, the location or the normalized SQL, or
+wrapped in ``allow_nplusone()``.
+"""
+
+import inspect
+import threading
+from contextlib import ExitStack, contextmanager
+from fnmatch import fnmatch
+
+from django.conf import settings
+from django.db import connections
+
+from .slow_queries import normalize_sql, query_location
+
+
+_state = threading.local()
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def get_threshold():
+    return getattr(settings, 'NPLUSONE_THRESHOLD', 3)
+
+
+def get_allowlist():
+    return getattr(settings, 'NPLUSONE_ALLOWLIST', [])
+
+
+@contextmanager
+def allow_nplusone():
+    """Don't count queries run inside this block."""
+    previous = getattr(_state, 'allowed', False)
+    _state.allowed = True
+    try:
+        yield
+    finally:
+        _state.allowed = previous
+
+
+def serializer_field():
+    """``Serializer.field`` being rendered by the innermost serializer on the stack."""
+    frame = inspect.currentframe()
+    try:
+        while frame is not None:
+            if frame.f_code.co_name == 'to_representation':
+                owner = frame.f_locals.get('self')
+                field = frame.f_locals.get('field')
+                if field is not None and hasattr(owner, 'fields'):
+                    return f'{type(owner).__name__}.{field.field_name}'
+            frame = frame.f_back
+        return ''
+    finally:
+        del frame
+
+
+class Repeat:
+    def __init__(self, sql, field, location):
+        self.sql = sql
+        self.field = field
+        self.location = location
+        self.count = 1
+
+    def __str__(self):
+        origin = ', '.join(part for part in (self.field, self.location) if part) or 'unknown origin'
+        return f'{self.count} x {self.sql[:300]} ({origin})'
+
+    def allowed(self, allowlist):
+        return any(
+            fnmatch(self.field, pattern) or fnmatch(self.location, pattern) or fnmatch(self.sql, pattern)
+            for pattern in allowlist
+        )
+
+
+class NPlusOneDetector:
+    def __init__(self, threshold=None, allowlist=()):
+        self.threshold = threshold or get_threshold()
+        self.allowlist = list(get_allowlist()) + list(allowlist)
+        self.seen = {}
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and not getattr(_state, 'allowed', False) and sql.lstrip()[:6].upper() == 'SELECT':
+            normalized = normalize_sql(sql)
+            repeat = self.seen.get(normalized)
+            if repeat is None:
+                # Most statements run once; only look at the stack when one repeats.
+                self.seen[normalized] = Repeat(normalized, '', '')
+            else:
+                if repeat.count == 1:
+                    repeat.field = serializer_field()
+                    repeat.location = query_location()
+                repeat.count += 1
+        return execute(sql, params, many, context)
+
+    def start(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def stop(self):
+        if self._stack is not None:
+            self._stack.close()
+            self._stack = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def repeats(self):
+        """Statements run ``threshold`` times or more that aren't allowlisted."""
+        return [
+            repeat for repeat in self.seen.values()
+            if repeat.count >= self.threshold and not repeat.allowed(self.allowlist)
+        ]
+
+    def report(self, where=''):
+        repeats = self.repeats()
+        if not repeats:
+            return ''
+        header = f'Possible N+1 queries{f" in {where}" if where else ""}:'
+        return '\n  '.join([header] + [str(repeat) for repeat in repeats])
+
+
+class NPlusOneTestMixin:
+    """TestCase mixin failing any test that runs a statement ``NPLUSONE_THRESHOLD`` times or more.
+
+    ``nplusone_allowlist`` adds patterns for the test class.
+    """
+
+    nplusone_allowlist = []
+
+    def setUp(self):
+        super().setUp()
+        self.nplusone_detector = NPlusOneDetector(allowlist=self.nplusone_allowlist).start()
+        self.addCleanup(self.check_nplusone)
+
+    def check_nplusone(self):
+        self.nplusone_detector.stop()
+        report = self.nplusone_detector.report(self.id())
+        if report:
+            raise self.failureException(report)
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class NPlusOneTestRunner(DiscoverRunner):
+    """The default runner, with ``NPLUSONE_MODE`` set to ``NPLUSONE_TEST_MODE`` for the run.
+
+    With 'raise', any request a test makes through the test client that
+    repeats a query fails that test with ``NPlusOneError``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._nplusone_mode = getattr(settings, 'NPLUSONE_MODE', None)
+        settings.NPLUSONE_MODE = getattr(settings, 'NPLUSONE_TEST_MODE', 'raise')
+
+    def teardown_test_environment(self, **kwargs):
+        settings.NPLUSONE_MODE = self._nplusone_mode
+        super().teardown_test_environment(**kwargs)
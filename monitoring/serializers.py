@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+from .metrics import serializer_duration
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with serializer_duration.time(serializer=type(self.child).__name__, many='true'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Records how long building ``.data`` takes; ``many=True`` lists are timed as a whole.
+
+    Subclasses that don't name a ``Meta.list_serializer_class`` get
+    ``TimedListSerializer``; a custom one should derive from it.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = cls.__dict__.get('Meta')
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        if self.parent is not None:
+            return super().data
+        with serializer_duration.time(serializer=type(self).__name__, many='false'):
+            return super().data
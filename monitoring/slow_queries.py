@@ -0,0 +1,272 @@
+"""
+Slow query log.
+
+``SlowQueryMiddleware`` wraps every query of a request; one that runs longer
+than ``SLOW_QUERY_THRESHOLD_MS`` is logged with its view and the innermost
+project stack frame that issued it. Statements are grouped by normalized SQL
+(literals and placeholders replaced, ``IN`` lists collapsed): SELECTs are
+re-run under ``EXPLAIN`` for a sample of occurrences, at most once per
+``SLOW_QUERY_EXPLAIN_INTERVAL`` per statement and process, and plans that
+read one of ``SLOW_QUERY_FULL_SCAN_TABLES`` in full are flagged. Entries go to
+a rotating log file and, at the end of the request, to ``SlowQuery`` rows
+(admin: Monitoring > Slow queries).
+"""
+
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+import traceback
+from importlib import import_module
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import SlowQuery
+
+
+logger = logging.getLogger('monitoring.slow_queries')
+
+_state = threading.local()
+_explained = {}
+_explained_lock = threading.Lock()
+_handler_lock = threading.Lock()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\?\s*,\s*)*\?\)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def get_threshold():
+    """Seconds, or None when the slow query log is off."""
+    threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+    return None if threshold_ms is None else threshold_ms / 1000
+
+
+def get_full_scan_tables():
+    return getattr(settings, 'SLOW_QUERY_FULL_SCAN_TABLES', [])
+
+
+def normalize_sql(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()
+
+
+_skipped_files = None
+
+
+def skipped_files():
+    """This package and the middleware modules, which wrap every query but never issue one."""
+    global _skipped_files
+    if _skipped_files is None:
+        files = set()
+        for path in settings.MIDDLEWARE:
+            module = import_module(path.rsplit('.', 1)[0])
+            files.add(os.path.splitext(module.__file__)[0])
+        _skipped_files = files
+    return _skipped_files
+
+
+def query_location():
+    """``path:line in function`` of the innermost frame in project code."""
+    base_dir = str(settings.BASE_DIR)
+    own_dir = os.path.dirname(__file__)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (not filename.startswith(base_dir) or filename.startswith(own_dir)
+                or 'site-packages' in filename or os.path.splitext(filename)[0] in skipped_files()):
+            continue
+        return f'{os.path.relpath(filename, base_dir)}:{frame.lineno} in {frame.name}'
+    return ''
+
+
+# 'FROM "shop_product" U0', 'INNER JOIN "shop_category" AS T3'
+_TABLE_ALIAS_RE = re.compile(r'(?:FROM|JOIN)\s+"(\w+)"(?:\s+(?:AS\s+)?"?([A-Z]\d+)"?\b)?')
+
+
+def full_scans(sql, plan_rows, vendor):
+    """Watched tables the plan reads without an index."""
+    watched = set(get_full_scan_tables())
+    aliases = {alias: table for table, alias in _TABLE_ALIAS_RE.findall(sql) if alias}
+    if vendor == 'sqlite':
+        # 'SCAN shop_product' / 'SCAN TABLE shop_product AS U0' read the
+        # table; 'SCAN ... USING INDEX' and 'SEARCH ...' go through an index.
+        pattern = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+    else:
+        pattern = re.compile(r'Seq Scan on (\w+)')
+    tables = set()
+    for row in plan_rows:
+        match = pattern.search(row.strip())
+        if match:
+            table = aliases.get(match.group(1), match.group(1))
+            if table in watched:
+                tables.add(table)
+    return sorted(tables)
+
+
+def should_explain(key, now):
+    interval = getattr(settings, 'SLOW_QUERY_EXPLAIN_INTERVAL', 3600)
+    if random.random() >= getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 1.0):
+        return False
+    with _explained_lock:
+        if now - _explained.get(key, float('-inf')) < interval:
+            return False
+        _explained[key] = now
+    return True
+
+
+def explain(connection, sql, params):
+    """Plan lines for ``sql``; SQLite's EXPLAIN QUERY PLAN tree is indented by depth."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        rows = cursor.fetchall()
+    if connection.vendor != 'sqlite':
+        return [str(row[0]) for row in rows]
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def get_log():
+    """The slow query logger, with the rotating ``SLOW_QUERY_LOG_FILE`` handler attached on first use."""
+    path = getattr(settings, 'SLOW_QUERY_LOG_FILE', None)
+    if path and not getattr(logger, '_slow_query_file', None):
+        with _handler_lock:
+            if not getattr(logger, '_slow_query_file', None):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = RotatingFileHandler(
+                    path,
+                    maxBytes=getattr(settings, 'SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                    backupCount=getattr(settings, 'SLOW_QUERY_LOG_BACKUP_COUNT', 5),
+                    delay=True,
+                )
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+                logger._slow_query_file = path
+    return logger
+
+
+class SlowQueryRecorder:
+    """``execute_wrapper`` collecting one request's slow queries."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self.entries = []
+
+    @property
+    def view(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match is not None else ''
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_state, 'active', False):
+            # Our own EXPLAIN and bookkeeping queries.
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            threshold = get_threshold()
+            if threshold is not None and duration >= threshold:
+                self.record(context['connection'], sql, params, many, duration)
+
+    def record(self, connection, sql, params, many, duration):
+        _state.active = True
+        try:
+            normalized = normalize_sql(sql)
+            key = fingerprint(normalized)
+            entry = {
+                'fingerprint': key,
+                'normalized_sql': normalized,
+                'sql': sql,
+                'alias': connection.alias,
+                'view': self.view,
+                'location': query_location(),
+                'duration': duration,
+                'plan': None,
+                'full_scan_tables': [],
+            }
+            if (not many and sql.lstrip()[:6].upper() == 'SELECT'
+                    and should_explain(key, time.monotonic())):
+                try:
+                    entry['plan'] = explain(connection, sql, params)
+                    entry['full_scan_tables'] = full_scans(sql, entry['plan'], connection.vendor)
+                except Exception as exc:
+                    entry['plan'] = [f'EXPLAIN failed: {exc}']
+            self.entries.append(entry)
+
+            message = f"{duration * 1000:.1f}ms [{connection.alias}] {entry['view'] or '-'} {entry['location'] or '-'}: {normalized}"
+            if entry['full_scan_tables']:
+                message += f" FULL SCAN: {', '.join(entry['full_scan_tables'])}"
+            if entry['plan']:
+                message += '\n    ' + '\n    '.join(entry['plan'])
+            log = get_log()
+            (log.warning if entry['full_scan_tables'] else log.info)(message)
+        finally:
+            _state.active = False
+
+    def save(self):
+        """Fold this request's slow queries into ``SlowQuery`` rows."""
+        if not self.entries:
+            return
+        _state.active = True
+        try:
+            for entry in self.entries:
+                save_entry(entry)
+        finally:
+            _state.active = False
+            self.entries = []
+
+
+def save_entry(entry):
+    now = timezone.now()
+    fields = {
+        'sql': entry['sql'],
+        'view': entry['view'][:200],
+        'location': entry['location'][:300],
+        'alias': entry['alias'],
+        'count': F('count') + 1,
+        'total_duration': F('total_duration') + entry['duration'],
+        'max_duration': Greatest(F('max_duration'), entry['duration']),
+        'last_seen': now,
+    }
+    if entry['plan'] is not None:
+        fields.update(plan='\n'.join(entry['plan']), explained_at=now,
+                      full_scan_tables=','.join(entry['full_scan_tables']))
+    queries = SlowQuery.objects.using('default')
+    if queries.filter(fingerprint=entry['fingerprint']).update(**fields):
+        return
+    try:
+        with transaction.atomic(using='default'):
+            queries.create(
+                fingerprint=entry['fingerprint'],
+                normalized_sql=entry['normalized_sql'],
+                count=1,
+                total_duration=entry['duration'],
+                max_duration=entry['duration'],
+                **{name: value for name, value in fields.items()
+                   if name not in ('count', 'total_duration', 'max_duration')},
+            )
+    except IntegrityError:
+        queries.filter(fingerprint=entry['fingerprint']).update(**fields)
@@ -0,0 +1,242 @@
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import path
+
+from shop.models import Category, Product
+
+from .metrics import Counter, Histogram, Registry, http_requests, render_text
+from .middleware import NPlusOneMiddleware
+from .models import SlowQuery
+from .nplusone import NPlusOneDetector, NPlusOneError, NPlusOneTestMixin, allow_nplusone
+from .slow_queries import SlowQueryRecorder, full_scans, normalize_sql
+
+
+def list_categories(request):
+    # One category query per product: the classic N+1.
+    names = [product.category.name for product in Product.objects.order_by('id')]
+    return HttpResponse(','.join(names))
+
+
+def list_categories_joined(request):
+    names = [product.category.name for product in Product.objects.select_related('category').order_by('id')]
+    return HttpResponse(','.join(names))
+
+
+urlpatterns = [path('products/', list_categories)]
+
+
+class NPlusOneTest(TestCase):
+    """Repeated queries fail tests unless they are allowlisted."""
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [Category.objects.create(name=f'Category {i}', slug=f'category-{i}') for i in range(4)]
+        for i, category in enumerate(categories):
+            Product.objects.create(name=f'Product {i}', slug=f'product-{i}', category=category, price=Decimal(5))
+
+    def get(self, view):
+        return NPlusOneMiddleware(view)(RequestFactory().get('/products/'))
+
+    def test_runner_raises(self):
+        self.assertEqual(settings.NPLUSONE_MODE, 'raise')
+
+    def test_known_nplusone_raises(self):
+        with self.assertRaisesMessage(NPlusOneError, '4 x SELECT'):
+            self.get(list_categories)
+
+    def test_select_related_passes(self):
+        self.assertEqual(self.get(list_categories_joined).status_code, 200)
+
+    @override_settings(NPLUSONE_ALLOWLIST=['*FROM "shop_category"*'])
+    def test_allowlisted_nplusone_passes(self):
+        self.assertEqual(self.get(list_categories).status_code, 200)
+
+    def test_allow_nplusone_block(self):
+        with allow_nplusone():
+            self.assertEqual(self.get(list_categories).status_code, 200)
+
+    def test_detector_threshold(self):
+        with NPlusOneDetector(threshold=5) as detector:
+            list_categories(None)
+        self.assertEqual(detector.repeats(), [])
+
+    def test_client_request_fails_test(self):
+        with override_settings(ROOT_URLCONF='monitoring.tests'), self.assertRaises(NPlusOneError):
+            self.client.get('/products/')
+
+
+class NPlusOneTestMixinTest(NPlusOneTestMixin, TestCase):
+    """The mixin fails tests that repeat queries outside of a request too."""
+
+    nplusone_allowlist = ['*FROM "shop_category"*']
+
+    @classmethod
+    def setUpTestData(cls):
+        # Created before the detector starts, so product saves don't count.
+        for i in range(3):
+            category = Category.objects.create(name=f'Category {i}', slug=f'category-{i}')
+            Product.objects.create(name=f'Book {i}', slug=f'book-{i}', category=category, price=Decimal(5))
+
+    def test_allowlisted_queries(self):
+        list_categories(None)
+        self.assertEqual(self.nplusone_detector.repeats(), [])
+
+
+
+class MetricsTest(SimpleTestCase):
+    """Counters and histograms render as Prometheus text and add up across processes."""
+
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = Counter('requests_total', 'Requests.', ['view'], registry=self.registry)
+        self.latency = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1), registry=self.registry)
+
+    def test_render_text(self):
+        self.requests.inc(view='list')
+        self.requests.inc(2, view='list')
+        self.requests.inc(view='a "quoted" name')
+        for value in (0.05, 0.5, 0.5, 3):
+            self.latency.observe(value)
+        self.assertEqual(render_text(self.registry.snapshot()).splitlines(), [
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1.0"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            'latency_seconds_sum 4.05',
+            'latency_seconds_count 4',
+            '# HELP requests_total Requests.',
+            '# TYPE requests_total counter',
+            'requests_total{view="a \\"quoted\\" name"} 1',
+            'requests_total{view="list"} 3',
+        ])
+
+    def test_labels_checked(self):
+        with self.assertRaises(ValueError):
+            self.requests.inc(status=200)
+        with self.assertRaises(ValueError):
+            Counter('requests_total', 'Again.', registry=self.registry)
+
+    def test_collector(self):
+        @self.registry.register_collector
+        def queue_depth():
+            yield 'queue_depth', 'gauge', 'Queued tasks.', {'queue': 'default'}, 7
+
+        self.assertIn('queue_depth{queue="default"} 7', render_text(self.registry.snapshot()))
+
+    def test_processes_merged(self):
+        other = Registry()
+        other_requests = Counter('requests_total', 'Requests.', ['view'], registry=other)
+        other_latency = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1), registry=other)
+        self.requests.inc(view='list')
+        other_requests.inc(view='list')
+        other_requests.inc(view='detail')
+        self.latency.observe(0.05)
+        other_latency.observe(2)
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            other.flush()
+            merged = self.registry.collect()
+        self.assertEqual(sorted(merged['requests_total']['samples']), [[['detail'], 1], [['list'], 2]])
+        self.assertEqual(merged['latency_seconds']['samples'], [[[], [1, 0, 1, 2.05, 2]]])
+
+
+class MetricsViewTest(TestCase):
+    """/metrics is restricted and counts requests by route name."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('ops', is_staff=True)
+
+    def test_access(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(self.staff)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE http_requests_total counter', response.content.decode())
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_requests_counted(self):
+        key = ('metrics', 'GET', '403')
+        before = http_requests.values.get(key, 0)
+        self.client.get('/metrics')
+        self.assertEqual(http_requests.values[key], before + 1)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=None, SLOW_QUERY_FULL_SCAN_TABLES=['shop_product'])
+class SlowQueryTest(TestCase):
+    """Slow statements are grouped by normalized SQL, sampled for EXPLAIN and checked for full scans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Lamps', slug='lamps')
+        cls.product = Product.objects.create(name='Lamp', slug='lamp', category=category, price=Decimal(5))
+
+    def setUp(self):
+        patcher = mock.patch.dict('monitoring.slow_queries._explained', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, queryset):
+        recorder = SlowQueryRecorder()
+        with self.assertLogs('monitoring.slow_queries', 'INFO') as logs, connection.execute_wrapper(recorder):
+            list(queryset)
+        self.log_output = logs.output
+        return recorder
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM t WHERE name = 'it''s' AND id IN (%s, %s, %s) LIMIT 21"),
+            'SELECT * FROM t WHERE name = ? AND id IN (...) LIMIT ?',
+        )
+
+    def test_full_scans(self):
+        sql = 'SELECT * FROM "shop_product" U0 INNER JOIN "shop_category" ON (1)'
+        self.assertEqual(full_scans(sql, ['SCAN U0', 'SEARCH shop_category USING INTEGER PRIMARY KEY'], 'sqlite'),
+                         ['shop_product'])
+        self.assertEqual(full_scans(sql, ['SCAN shop_product USING INDEX shop_product_idx'], 'sqlite'), [])
+        self.assertEqual(full_scans(sql, ['Seq Scan on shop_product  (cost=0.00..1.01)'], 'postgresql'),
+                         ['shop_product'])
+
+    def test_full_scan_flagged(self):
+        recorder = self.record(Product.objects.filter(description__contains='bright'))
+        self.assertTrue(self.log_output[0].startswith('WARNING:'))
+        self.assertIn('FULL SCAN: shop_product', self.log_output[0])
+        self.assertEqual(recorder.entries[0]['full_scan_tables'], ['shop_product'])
+        self.assertEqual(self.record(Product.objects.filter(pk=self.product.pk)).entries[0]['full_scan_tables'], [])
+
+    def test_saved_per_statement(self):
+        for name in ('a', 'b'):
+            self.record(Product.objects.filter(name=name)).save()
+        row = SlowQuery.objects.get()
+        self.assertEqual(row.count, 2)
+        self.assertIn('"shop_product"."name" = ?', row.normalized_sql)
+        self.assertEqual(row.full_scan_tables, 'shop_product')
+        # EXPLAIN ran for the first occurrence only.
+        self.assertEqual(len(self.log_output[0].splitlines()), 1)
+
+    @override_settings(SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0)
+    def test_sampling(self):
+        self.assertIsNone(self.record(Product.objects.all()).entries[0]['plan'])
+
+    def test_middleware(self):
+        with self.assertLogs('monitoring.slow_queries', 'INFO'):
+            self.client.get('/api/categories/')
+        locations = SlowQuery.objects.filter(view='shop:category-list').values_list('location', flat=True)
+        self.assertTrue(any(location.startswith('shop/serializers.py:') for location in locations))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_disabled(self):
+        self.client.get('/api/categories/')
+        self.assertFalse(SlowQuery.objects.exists())
@@ -0,0 +1,25 @@
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .metrics import registry, render_text
+
+
+def metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        return secrets.compare_digest(supplied, token)
+    if request.META.get('REMOTE_ADDR') in getattr(settings, 'INTERNAL_IPS', ()):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint: every process's metrics when ``METRICS_DIR`` is set."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_text(registry.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
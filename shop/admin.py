@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Category, Product, ProductImage, Cart, CartItem, Order, OrderItem, Review, Wishlist
+from .models import (
+    Category, Product, ProductImage, Cart, CartItem, Order, OrderItem, Review, Wishlist, ProductRecommendation,
+    DailyProductSales, DailyCategorySales, DailyOrderStatus,
+)
 
 admin.site.register(Category)
 admin.site.register(Product)
@@ -9,4 +12,40 @@ admin.site.register(CartItem)
 admin.site.register(Order)
 admin.site.register(OrderItem)
 admin.site.register(Review)
-admin.site.register(Wishlist)
\ No newline at end of file
+admin.site.register(Wishlist)
+admin.site.register(ProductRecommendation)
+
+
+class RollupAdmin(admin.ModelAdmin):
+    """Read-only date-range browsing of the daily sales rollups."""
+    date_hierarchy = 'date'
+    list_per_page = 100
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(RollupAdmin):
+    list_display = ['date', 'product', 'units', 'revenue', 'orders']
+    list_select_related = ['product']
+    search_fields = ['product__name']
+
+
+@admin.register(DailyCategorySales)
+class DailyCategorySalesAdmin(RollupAdmin):
+    list_display = ['date', 'category', 'units', 'revenue', 'orders']
+    list_select_related = ['category']
+    list_filter = ['category']
+
+
+@admin.register(DailyOrderStatus)
+class DailyOrderStatusAdmin(RollupAdmin):
+    list_display = ['date', 'status', 'orders', 'revenue']
+    list_filter = ['status']
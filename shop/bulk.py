@@ -0,0 +1,166 @@
+"""
+Bulk product operations.
+
+Repricing, restocking and toggling ``available``/``featured`` across many
+products run as batched ``UPDATE`` statements (or ``bulk_update`` for
+per-product prices) instead of ``Product.save``, which would rewrite every
+column and queue image work. Each batch is one transaction that ends by
+sending ``products_bulk_updated``; its receivers in ``shop.signals`` do what
+the per-save signals would have done, once per batch: bump the catalog
+cache version, refresh the product cards and, after price changes, the
+totals of carts holding those products.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import DecimalField, F
+from django.db.models.functions import Round
+from django.dispatch import Signal
+from django.utils import timezone
+from wembli.write_queue import write_coordinator
+
+from .filters import filter_products, normalize_product_filters
+from .models import Product
+
+
+# Sent after each batch with product_ids (list) and fields (set of changed fields).
+products_bulk_updated = Signal()
+
+BULK_CHANGES = ('price', 'price_percent', 'stock', 'available', 'featured')
+
+
+class BulkUpdateError(ValueError):
+    pass
+
+
+BULK_FILTERS = ('category', 'featured', 'search', 'min_price', 'max_price', 'available')
+
+
+def select_products(ids=None, filters=None):
+    """Products by id list and/or list filters (``category``, ``featured``, ``search``,
+    ``min_price``, ``max_price`` as in the product list, plus ``available``)."""
+    queryset = Product.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=parse_ids(ids))
+    if filters is not None:
+        if not isinstance(filters, dict):
+            raise BulkUpdateError('filter must be an object')
+        # A misspelt filter must not silently select every product.
+        unknown = set(filters) - set(BULK_FILTERS)
+        if unknown:
+            raise BulkUpdateError(f'Unknown filters: {", ".join(sorted(unknown))}')
+        params = {}
+        for key, value in filters.items():
+            if isinstance(value, (dict, list)):
+                raise BulkUpdateError(f'filter {key} must be a single value')
+            # Query parameter strings, as the product list receives them.
+            params[key] = str(value).lower() if isinstance(value, bool) else str(value)
+        queryset = filter_products(queryset, normalize_product_filters(params))
+        available = filters.get('available')
+        if available is not None:
+            queryset = queryset.filter(available=parse_bool(available))
+    return queryset
+
+
+def parse_ids(ids):
+    if not isinstance(ids, (list, tuple)):
+        raise BulkUpdateError('ids must be a list of product ids')
+    parsed = []
+    for pk in ids:
+        if isinstance(pk, bool) or not (isinstance(pk, int) or (isinstance(pk, str) and pk.isdigit())):
+            raise BulkUpdateError(f'Invalid product id {pk!r}')
+        parsed.append(int(pk))
+    return parsed
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ('true', '1', 'yes'):
+        return True
+    if str(value).lower() in ('false', '0', 'no'):
+        return False
+    raise BulkUpdateError(f'Expected true or false, got {value!r}')
+
+
+def parse_decimal(value, name, minimum):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise BulkUpdateError(f'{name} must be a number')
+    if not number.is_finite() or number < minimum:
+        raise BulkUpdateError(f'{name} must be {minimum} or more')
+    return number
+
+
+def parse_changes(changes):
+    """Validate ``changes`` into UPDATE values; unknown or invalid entries raise ``BulkUpdateError``."""
+    unknown = set(changes) - set(BULK_CHANGES)
+    if unknown:
+        raise BulkUpdateError(f'Unknown changes: {", ".join(sorted(unknown))}')
+    if 'price' in changes and 'price_percent' in changes:
+        raise BulkUpdateError('Use either price or price_percent')
+    values = {}
+    if 'price' in changes:
+        values['price'] = parse_decimal(changes['price'], 'price', 0).quantize(Decimal('0.01'))
+    if 'price_percent' in changes:
+        factor = 1 + parse_decimal(changes['price_percent'], 'price_percent', -100) / 100
+        values['price'] = Round(F('price') * factor, 2, output_field=DecimalField(max_digits=10, decimal_places=2))
+    if 'stock' in changes:
+        values['stock'] = int(parse_decimal(changes['stock'], 'stock', 0))
+    for name in ('available', 'featured'):
+        if name in changes:
+            values[name] = parse_bool(changes[name])
+    if not values:
+        raise BulkUpdateError('Nothing to change')
+    return values
+
+
+def iter_id_batches(queryset, batch_size):
+    """Primary keys of ``queryset`` in ascending batches (keyset, so updates can't shift pages)."""
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def bulk_update_products(queryset, changes, batch_size=1000, dry_run=False):
+    """Apply ``changes`` (see ``BULK_CHANGES``) to ``queryset`` in batches; returns counts."""
+    values = parse_changes(changes)
+    result = {'matched': queryset.count(), 'updated': 0, 'batches': 0}
+    if dry_run:
+        return result
+    fields = set(values)
+    for ids in iter_id_batches(queryset, batch_size):
+        with write_coordinator.atomic():
+            result['updated'] += Product.objects.filter(pk__in=ids).update(updated_at=timezone.now(), **values)
+            products_bulk_updated.send(sender=Product, product_ids=ids, fields=fields)
+        result['batches'] += 1
+    return result
+
+
+def bulk_set_prices(prices, batch_size=1000):
+    """Set individual prices from ``{product_id: price}`` with ``bulk_update``; returns counts."""
+    try:
+        prices = {int(pk): parse_decimal(price, 'price', 0).quantize(Decimal('0.01')) for pk, price in prices.items()}
+    except (TypeError, ValueError) as exc:
+        raise BulkUpdateError(f'Invalid price list: {exc}')
+    result = {'matched': 0, 'updated': 0, 'batches': 0}
+    ids = sorted(prices)
+    for start in range(0, len(ids), batch_size):
+        batch = list(Product.objects.filter(pk__in=ids[start:start + batch_size]).only('pk'))
+        if not batch:
+            continue
+        now = timezone.now()
+        for product in batch:
+            product.price = prices[product.pk]
+            product.updated_at = now
+        with write_coordinator.atomic():
+            result['updated'] += Product.objects.bulk_update(batch, ['price', 'updated_at'])
+            products_bulk_updated.send(sender=Product, product_ids=[p.pk for p in batch], fields={'price'})
+        result['matched'] += len(batch)
+        result['batches'] += 1
+    return result
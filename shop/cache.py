@@ -0,0 +1,30 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+
+CATALOG_VERSION_KEY = 'shop:catalog:version'
+
+
+def get_catalog_version():
+    """Current catalog version; bumped whenever products or categories change."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 2, None)
+
+
+def make_catalog_key(prefix, params):
+    """Build a cache key for ``params`` that is invalidated with the catalog version."""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    return f'shop:{prefix}:v{get_catalog_version()}:{digest}'
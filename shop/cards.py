@@ -0,0 +1,103 @@
+"""
+Product card read model.
+
+``ProductCard`` holds exactly what a product grid shows (names, price, image,
+rating and sort keys), so the list endpoints read one narrow, fully indexed
+table instead of joining categories and aggregating reviews per row. The
+signals in ``shop.signals`` call into this module on every write that can
+change a card; ``rebuild_product_cards`` rebuilds the table from scratch.
+"""
+
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Product, ProductCard
+
+
+CARD_UPDATE_FIELDS = [
+    'name', 'slug', 'category_id', 'category_slug', 'category_name', 'price', 'image',
+    'available', 'featured', 'average_rating', 'reviews_count', 'sales_count',
+    'trending_score', 'create_at', 'updated_at',
+]
+
+
+def build_card(product):
+    """Unsaved card for a product annotated with ``rating`` and ``rating_count``."""
+    return ProductCard(
+        product_id=product.pk,
+        name=product.name,
+        slug=product.slug,
+        category_id=product.category_id,
+        category_slug=product.category.slug,
+        category_name=product.category.name,
+        price=product.price,
+        image=product.image.name or '',
+        available=product.available,
+        featured=product.featured,
+        average_rating=product.rating or 0,
+        reviews_count=product.rating_count,
+        sales_count=product.sales_count,
+        trending_score=product.trending_score,
+        create_at=product.create_at,
+    )
+
+
+def refresh_product_cards(product_ids=None, batch_size=500):
+    """Upsert the cards of ``product_ids`` (all products when None); returns the number written."""
+    products = (
+        Product.objects.select_related('category')
+        .defer('description', 'category__description')
+        .annotate(rating=Avg('reviews__rating'), rating_count=Count('reviews'))
+        .order_by('pk')
+    )
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+
+    written = 0
+    batch = []
+    for product in products.iterator(chunk_size=batch_size):
+        batch.append(build_card(product))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(cards):
+    ProductCard.objects.bulk_create(
+        cards,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=CARD_UPDATE_FIELDS,
+    )
+    return len(cards)
+
+
+def refresh_category_cards(category):
+    """Copy a renamed or re-slugged category onto its products' cards in one UPDATE."""
+    return ProductCard.objects.filter(category_id=category.pk).update(
+        category_slug=category.slug,
+        category_name=category.name,
+        updated_at=timezone.now(),
+    )
+
+
+def sync_card_rankings():
+    """Copy ``sales_count``/``trending_score`` from products after a bulk ranking refresh."""
+    product = Product.objects.filter(pk=OuterRef('pk'))
+    return ProductCard.objects.update(
+        sales_count=Subquery(product.values('sales_count')[:1]),
+        trending_score=Subquery(product.values('trending_score')[:1]),
+    )
+
+
+def rebuild_product_cards(batch_size=500):
+    """Rebuild every card; returns ``(written, deleted)``."""
+    written = refresh_product_cards(batch_size=batch_size)
+    # Cards normally go with their product (CASCADE); this only catches rows
+    # left behind by raw deletes.
+    deleted, _ = ProductCard.objects.exclude(product__in=Product.objects.all()).delete()
+    return written, deleted
+
@@ -0,0 +1,111 @@
+"""
+Cart counters.
+
+``Cart.item_count``, ``line_count`` and ``subtotal`` are kept in step with the
+cart's items so the header badge (``cart_summary``) reads one row instead of
+loading every item and product. Mutations adjust them with F() expressions in
+the same transaction as the item change; ``recalculate_cart_totals`` rebuilds
+them from the items, e.g. after a price change.
+
+Each of these also bumps ``Cart.version``. Clients send the version they last
+saw (``If-Match`` or a ``version`` field) with a mutation; the counter UPDATE
+then matches only that version, so a stale write touches no row, raises
+``StaleCart`` and rolls back the item change with it.
+"""
+
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+from .models import Cart, CartItem
+
+
+class StaleCart(Exception):
+    def __init__(self, cart_id):
+        super().__init__(f'Cart {cart_id} has changed')
+        self.cart_id = cart_id
+
+
+def cart_etag(version):
+    return f'"{version}"'
+
+
+# Expected by a condition that names no version; no cart row ever matches it.
+NO_VERSION = -1
+
+
+def parse_cart_version(request):
+    """The cart version a mutation is conditional on, or None.
+
+    An ``If-Match`` (other than ``*``) or ``version`` that isn't a version of
+    this cart yields ``NO_VERSION``, so the mutation fails as stale (412)
+    instead of going ahead unconditionally.
+    """
+    if_match = request.META.get('HTTP_IF_MATCH', '').strip()
+    if if_match and if_match != '*':
+        for etag in parse_etags(if_match):
+            if etag.startswith('"') and etag.strip('"').isdigit():
+                return int(etag.strip('"'))
+        return NO_VERSION
+    version = request.data.get('version') if hasattr(request, 'data') else None
+    if version is None or if_match:
+        return None
+    if isinstance(version, int) and not isinstance(version, bool):
+        return version
+    if isinstance(version, str) and version.isdigit():
+        return int(version)
+    return NO_VERSION
+
+
+def _update_cart(cart_id, expected_version, **fields):
+    carts = Cart.objects.filter(pk=cart_id)
+    if expected_version is not None:
+        carts = carts.filter(version=expected_version)
+    if not carts.update(version=F('version') + 1, updated_at=timezone.now(), **fields):
+        raise StaleCart(cart_id)
+
+
+def adjust_cart_totals(cart_id, items=0, lines=0, subtotal=Decimal('0'), expected_version=None):
+    """Add deltas to a cart's counters and bump its version in one UPDATE."""
+    _update_cart(
+        cart_id, expected_version,
+        item_count=F('item_count') + items,
+        line_count=F('line_count') + lines,
+        subtotal=F('subtotal') + subtotal,
+    )
+
+
+def reset_cart_totals(cart_id, expected_version=None):
+    _update_cart(cart_id, expected_version, item_count=0, line_count=0, subtotal=Decimal('0'))
+
+
+def cart_totals(cart_id):
+    return Cart.objects.filter(pk=cart_id).values('version', 'item_count', 'line_count', 'subtotal').first()
+
+
+def recalculate_cart_totals(carts=None):
+    """Recompute the counters of ``carts`` (a queryset or ids; all carts when None) from their items."""
+    queryset = Cart.objects.all()
+    if carts is not None:
+        queryset = queryset.filter(pk__in=carts)
+    items = CartItem.objects.filter(cart=OuterRef('pk')).values('cart')
+    return queryset.update(
+        version=F('version') + 1,
+        item_count=Coalesce(
+            Subquery(items.annotate(total=Sum('quantity')).values('total')[:1]),
+            Value(0), output_field=IntegerField(),
+        ),
+        line_count=Coalesce(
+            Subquery(items.annotate(total=Sum(Value(1))).values('total')[:1]),
+            Value(0), output_field=IntegerField(),
+        ),
+        subtotal=Coalesce(
+            Subquery(items.annotate(
+                total=Sum(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+            ).values('total')[:1]),
+            Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
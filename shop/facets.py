@@ -0,0 +1,101 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .cache import make_catalog_key
+from .filters import filter_products, normalize_price
+from .metrics import cache_requests
+
+
+AVAILABLE_FACETS = ('category', 'price')
+DEFAULT_PRICE_BUCKETS = [0, 25, 50, 100, 250, 500]
+MAX_PRICE_BUCKETS = 20
+
+
+def parse_facets(value):
+    if not value:
+        return []
+    requested = [name.strip() for name in value.split(',')]
+    return [name for name in AVAILABLE_FACETS if name in requested]
+
+
+def parse_price_buckets(value):
+    """Parse ``price_buckets=0,50,100`` into sorted, de-duplicated boundaries."""
+    if value:
+        try:
+            boundaries = [Decimal(part) for part in value.split(',') if part.strip()]
+        except (InvalidOperation, ValueError):
+            boundaries = []
+    else:
+        boundaries = []
+    if not boundaries:
+        boundaries = [Decimal(str(b)) for b in getattr(settings, 'SHOP_FACET_PRICE_BUCKETS', DEFAULT_PRICE_BUCKETS)]
+    return sorted(set(normalize_price(b) for b in boundaries if b.is_finite()))[:MAX_PRICE_BUCKETS]
+
+
+def category_facet(queryset, filters):
+    # A category facet lists the alternatives to the current category,
+    # so the category filter itself is not applied.
+    rows = (
+        filter_products(queryset, filters, exclude=('category',))
+        .values('category__slug', 'category__name')
+        .annotate(count=Count('id'))
+        .order_by('category__name')
+    )
+    return [
+        {'slug': row['category__slug'], 'name': row['category__name'], 'count': row['count']}
+        for row in rows
+    ]
+
+
+def price_facet(queryset, filters, boundaries):
+    whens = []
+    for index, low in enumerate(boundaries):
+        if index + 1 < len(boundaries):
+            condition = {'price__gte': low, 'price__lt': boundaries[index + 1]}
+        else:
+            condition = {'price__gte': low}
+        whens.append(When(then=Value(index), **condition))
+
+    rows = (
+        filter_products(queryset, filters, exclude=('min_price', 'max_price'))
+        .annotate(bucket=Case(*whens, default=Value(-1), output_field=IntegerField()))
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .order_by('bucket')
+    )
+    counts = {row['bucket']: row['count'] for row in rows}
+
+    buckets = []
+    for index, low in enumerate(boundaries):
+        high = boundaries[index + 1] if index + 1 < len(boundaries) else None
+        buckets.append({
+            'min_price': str(low),
+            'max_price': str(high) if high is not None else None,
+            'count': counts.get(index, 0),
+        })
+    return buckets
+
+
+def get_product_facets(queryset, filters, facets, boundaries):
+    """Return facet counts for ``filters``, cached under the normalized filter key."""
+    key = make_catalog_key('facets', {
+        'filters': filters,
+        'facets': facets,
+        'price_buckets': boundaries if 'price' in facets else None,
+    })
+    result = cache.get(key)
+    cache_requests.inc(cache='facets', result='miss' if result is None else 'hit')
+    if result is not None:
+        return result
+
+    result = {}
+    if 'category' in facets:
+        result['category'] = category_facet(queryset, filters)
+    if 'price' in facets:
+        result['price'] = price_facet(queryset, filters, boundaries)
+
+    cache.set(key, result, getattr(settings, 'SHOP_FACET_CACHE_TIMEOUT', 300))
+    return result
@@ -0,0 +1,227 @@
+"""
+Partner product feeds (XML, CSV and NDJSON), gzipped on disk.
+
+``build_product_feeds`` splits the available catalog into segments of
+``SHOP_FEED_SEGMENT_SIZE`` consecutive product ids. Each segment is written
+once per format as its own gzip member, streaming the products from a
+chunked queryset, and the manifest records its product count and newest
+``updated_at`` (of the product or its card, which carries the ratings).
+A later run rewrites only the segments whose count or ``updated_at`` moved,
+then assembles each feed by concatenating the members, which is itself a
+valid gzip file, so unchanged segments are never re-read or recompressed.
+The finished files are served by ``product_feed`` without touching the
+database.
+"""
+
+import csv
+import gzip
+import io
+import json
+import mimetypes
+import os
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max
+from django.utils import timezone
+
+from .models import Product
+from .storefront import get_url_template
+
+
+FEED_FORMATS = ('xml', 'csv', 'ndjson')
+FEED_FIELDS = [
+    'id', 'title', 'description', 'link', 'image_link', 'category', 'price', 'currency',
+    'stock', 'availability', 'rating', 'review_count', 'updated_at',
+]
+# For the Content-Type of products.ndjson.gz (served with Content-Encoding: gzip)
+mimetypes.add_type('application/x-ndjson', '.ndjson')
+
+PRODUCT_COLUMNS = [
+    'id', 'name', 'slug', 'description', 'price', 'stock', 'image', 'updated_at',
+    'category__name', 'card__average_rating', 'card__reviews_count',
+]
+
+
+def get_feed_root():
+    return getattr(settings, 'SHOP_FEED_ROOT', os.path.join(settings.BASE_DIR, 'feeds'))
+
+
+def get_segment_size():
+    return getattr(settings, 'SHOP_FEED_SEGMENT_SIZE', 5000)
+
+
+def feed_path(feed_format):
+    return os.path.join(get_feed_root(), f'products.{feed_format}.gz')
+
+
+def segment_path(feed_format, segment):
+    return os.path.join(get_feed_root(), 'segments', feed_format, f'{segment:06d}.gz')
+
+
+def manifest_path():
+    return os.path.join(get_feed_root(), 'segments', 'manifest.json')
+
+
+def feed_products():
+    return Product.objects.filter(available=True)
+
+
+def segment_states():
+    """``{segment: [product count, newest updated_at]}`` for the whole catalog, in one query."""
+    segment_size = get_segment_size()
+    rows = (
+        feed_products()
+        .annotate(segment=ExpressionWrapper(F('pk') / segment_size, output_field=IntegerField()))
+        .values('segment')
+        .annotate(count=Count('pk'), changed=Max('updated_at'), card_changed=Max('card__updated_at'))
+        .order_by('segment')
+    )
+    return {
+        str(row['segment']): [row['count'], max(filter(None, (row['changed'], row['card_changed']))).isoformat()]
+        for row in rows
+    }
+
+
+class FeedWriter:
+    """Renders feed rows; ``header``/``footer`` wrap the concatenated segments."""
+
+    def __init__(self, base_url=None):
+        self.base_url = (base_url or getattr(settings, 'SHOP_FEED_BASE_URL', '')).rstrip('/')
+        self.currency = getattr(settings, 'SHOP_FEED_CURRENCY', 'USD')
+        self.link_template = get_url_template('product')
+        self.image_storage = Product._meta.get_field('image').storage
+
+    def item(self, row):
+        image_url = self.image_storage.url(row['image']) if row['image'] else ''
+        return {
+            'id': row['id'],
+            'title': row['name'],
+            'description': row['description'],
+            'link': self.base_url + self.link_template.replace('{slug}', row['slug']),
+            'image_link': self.base_url + image_url if image_url.startswith('/') else image_url,
+            'category': row['category__name'],
+            'price': f"{row['price']:.2f}",
+            'currency': self.currency,
+            'stock': row['stock'],
+            'availability': 'in stock' if row['stock'] > 0 else 'out of stock',
+            'rating': round(row['card__average_rating'] or 0, 2),
+            'review_count': row['card__reviews_count'] or 0,
+            'updated_at': row['updated_at'].isoformat(),
+        }
+
+    def header(self, feed_format):
+        if feed_format == 'xml':
+            return (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<products generated={quoteattr(timezone.now().isoformat())}>\n'
+            )
+        if feed_format == 'csv':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(FEED_FIELDS)
+            return buffer.getvalue()
+        return ''
+
+    def footer(self, feed_format):
+        return '</products>\n' if feed_format == 'xml' else ''
+
+    def write(self, feed_format, out, item):
+        if feed_format == 'xml':
+            out.write('<product>' + ''.join(
+                f'<{name}>{escape(str(item[name]))}</{name}>' for name in FEED_FIELDS
+            ) + '</product>\n')
+        elif feed_format == 'csv':
+            csv.writer(out).writerow([item[name] for name in FEED_FIELDS])
+        else:
+            out.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+
+def write_segment(writer, segment, formats, chunk_size=2000):
+    """Stream one segment's products into a gzip member per format; returns the product count."""
+    segment_size = get_segment_size()
+    rows = (
+        feed_products()
+        .filter(pk__gte=segment * segment_size, pk__lt=(segment + 1) * segment_size)
+        .order_by('pk')
+        .values(*PRODUCT_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+    outputs = {}
+    try:
+        for feed_format in formats:
+            path = segment_path(feed_format, segment)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            outputs[feed_format] = gzip.open(f'{path}.tmp', 'wt', encoding='utf-8', newline='')
+        count = 0
+        for row in rows:
+            item = writer.item(row)
+            for feed_format, out in outputs.items():
+                writer.write(feed_format, out, item)
+            count += 1
+    finally:
+        for out in outputs.values():
+            out.close()
+    for feed_format in formats:
+        path = segment_path(feed_format, segment)
+        os.replace(f'{path}.tmp', path)
+    return count
+
+
+def assemble_feed(writer, feed_format, segments):
+    """Header member + segment members + footer member, swapped in atomically."""
+    path = feed_path(feed_format)
+    with open(f'{path}.tmp', 'wb') as out:
+        out.write(gzip.compress(writer.header(feed_format).encode('utf-8')))
+        for segment in segments:
+            with open(segment_path(feed_format, segment), 'rb') as member:
+                while chunk := member.read(1024 * 1024):
+                    out.write(chunk)
+        out.write(gzip.compress(writer.footer(feed_format).encode('utf-8')))
+    os.replace(f'{path}.tmp', path)
+
+
+def load_manifest():
+    try:
+        with open(manifest_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_product_feeds(formats=FEED_FORMATS, full=False, base_url=None):
+    """Bring the feed files up to date; only changed segments are re-queried."""
+    manifest = load_manifest()
+    if full or manifest.get('segment_size') != get_segment_size():
+        manifest = {'segment_size': get_segment_size(), 'formats': {}}
+    states = segment_states()
+    writer = FeedWriter(base_url)
+    os.makedirs(os.path.dirname(manifest_path()), exist_ok=True)
+
+    # Segments to rewrite, and the formats each is stale in
+    dirty = {}
+    for feed_format in formats:
+        written = manifest['formats'].get(feed_format, {})
+        for segment, state in states.items():
+            if written.get(segment) != state or not os.path.exists(segment_path(feed_format, int(segment))):
+                dirty.setdefault(segment, []).append(feed_format)
+
+    products = 0
+    for segment, segment_formats in sorted(dirty.items(), key=lambda item: int(item[0])):
+        products += write_segment(writer, int(segment), segment_formats)
+
+    ordered = sorted(states, key=int)
+    for feed_format in formats:
+        previous = manifest['formats'].get(feed_format, {})
+        for segment in set(previous) - set(states):
+            try:
+                os.remove(segment_path(feed_format, int(segment)))
+            except FileNotFoundError:
+                pass
+        assemble_feed(writer, feed_format, [int(segment) for segment in ordered])
+        manifest['formats'][feed_format] = states
+
+    manifest['built_at'] = timezone.now().isoformat()
+    with open(f'{manifest_path()}.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(f'{manifest_path()}.tmp', manifest_path())
+    return {'segments': len(states), 'rewritten': len(dirty), 'products_written': products}
@@ -0,0 +1,99 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from .models import Product
+
+
+def normalize_price(value):
+    """Canonical Decimal for a price, without exponent notation (``50`` not ``5E+1``)."""
+    value = Decimal(value)
+    if value == value.to_integral_value():
+        return value.quantize(Decimal(1))
+    return value.normalize()
+
+
+def _parse_price(value):
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except (InvalidOperation, ValueError):
+        return None
+    return normalize_price(price) if price.is_finite() else None
+
+
+def normalize_product_filters(query_params):
+    """Reduce product list query params to a canonical dict of active filters.
+
+    Equivalent requests (``featured=TRUE`` vs ``featured=true``, ``min_price=10.0``
+    vs ``min_price=10``) normalize to the same dict, so it can be used as a cache key.
+    """
+    filters = {}
+
+    category = query_params.get('category')
+    if category:
+        filters['category'] = category
+
+    featured = query_params.get('featured')
+    if featured and featured.lower() == 'true':
+        filters['featured'] = True
+
+    search = (query_params.get('search') or '').strip()
+    if search:
+        filters['search'] = search
+
+    for key in ('min_price', 'max_price'):
+        price = _parse_price(query_params.get(key))
+        if price is not None:
+            filters[key] = price
+
+    return filters
+
+
+def filter_products(queryset, filters, exclude=()):
+    """Apply normalized ``filters`` to a product queryset, skipping keys in ``exclude``."""
+    if 'category' in filters and 'category' not in exclude:
+        queryset = queryset.filter(category__slug=filters['category'])
+
+    if filters.get('featured') and 'featured' not in exclude:
+        queryset = queryset.filter(featured=True)
+
+    if 'search' in filters and 'search' not in exclude:
+        search = filters['search']
+        queryset = queryset.filter(
+            Q(name__icontains=search) |
+            Q(description__icontains=search) |
+            Q(category__name__icontains=search)
+        )
+
+    if 'min_price' in filters and 'min_price' not in exclude:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters and 'max_price' not in exclude:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+
+    return queryset
+
+
+def filter_product_cards(queryset, filters, exclude=()):
+    """``filter_products`` for ``ProductCard`` querysets.
+
+    Search also matches descriptions, which cards don't store, so it filters
+    by the ids of matching products.
+    """
+    if 'category' in filters and 'category' not in exclude:
+        queryset = queryset.filter(category_slug=filters['category'])
+
+    if filters.get('featured') and 'featured' not in exclude:
+        queryset = queryset.filter(featured=True)
+
+    if 'search' in filters and 'search' not in exclude:
+        matching = filter_products(Product.objects.all(), {'search': filters['search']})
+        queryset = queryset.filter(product_id__in=matching.values('pk'))
+
+    if 'min_price' in filters and 'min_price' not in exclude:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters and 'max_price' not in exclude:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+
+    return queryset
@@ -0,0 +1,107 @@
+"""
+Pre-serialized product card fragments.
+
+Popular products appear in thousands of list responses a minute, each time
+serialized from scratch. ``FragmentCache`` keeps the rendered JSON bytes of
+each card, keyed by product id and the card's ``updated_at`` (so any change to
+the card makes a new key and stale entries simply age out), in a
+byte-bounded in-process LRU, optionally backed by a shared cache alias
+(``SHOP_FRAGMENT_CACHE_SHARED``) that other processes fill too.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class FragmentCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024, shared_alias=None, timeout=3600):
+        self.max_bytes = max_bytes
+        self.shared_alias = shared_alias
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'bytes_saved': 0, 'evictions': 0}
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                content = self._entries.get(key)
+                if content is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = content
+            self._stats['hits'] += len(found)
+            self._stats['bytes_saved'] += sum(len(content) for content in found.values())
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared_alias:
+            shared = caches[self.shared_alias].get_many([self._shared_key(key) for key in missing])
+            shared_found = {key: shared[self._shared_key(key)] for key in missing if self._shared_key(key) in shared}
+            self._store_local(shared_found)
+            found.update(shared_found)
+            with self._lock:
+                self._stats['shared_hits'] += len(shared_found)
+                self._stats['bytes_saved'] += sum(len(content) for content in shared_found.values())
+
+        with self._lock:
+            self._stats['misses'] += len(keys) - len(found)
+        return found
+
+    def set_many(self, fragments):
+        self._store_local(fragments)
+        if fragments and self.shared_alias:
+            caches[self.shared_alias].set_many(
+                {self._shared_key(key): content for key, content in fragments.items()},
+                timeout=self.timeout,
+            )
+
+    def _store_local(self, fragments):
+        with self._lock:
+            for key, content in fragments.items():
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._size -= len(previous)
+                if len(content) > self.max_bytes:
+                    continue
+                self._entries[key] = content
+                self._size += len(content)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._stats['evictions'] += 1
+
+    def _shared_key(self, key):
+        return f'shop:fragment:{key}'
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._size, max_bytes=self.max_bytes)
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+_fragment_cache = None
+_fragment_cache_lock = threading.Lock()
+
+
+def get_fragment_cache():
+    global _fragment_cache
+    if _fragment_cache is None:
+        with _fragment_cache_lock:
+            if _fragment_cache is None:
+                _fragment_cache = FragmentCache(
+                    max_bytes=getattr(settings, 'SHOP_FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+                    shared_alias=getattr(settings, 'SHOP_FRAGMENT_CACHE_SHARED', None),
+                    timeout=getattr(settings, 'SHOP_FRAGMENT_CACHE_TIMEOUT', 3600),
+                )
+    return _fragment_cache
@@ -0,0 +1,19 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection, connections
+
+
+@contextmanager
+def scratch_database():
+    """Run against a throwaway, migrated copy of the default database's schema."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
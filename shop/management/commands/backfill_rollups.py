@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from shop.models import Order
+from shop.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups from order history, one day at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD); defaults to the first order.')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD); defaults to today.')
+
+    def handle(self, *args, **options):
+        start = self._parse(options['start'])
+        end = self._parse(options['end']) or timezone.localdate()
+        if start is None:
+            first = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            if first is None:
+                self.stdout.write('No orders to backfill.')
+                return
+            start = timezone.localdate(first)
+
+        days = backfill_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {days} days, {start} to {end}.'))
+
+    def _parse(self, value):
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'Invalid date: {value}')
+        return parsed
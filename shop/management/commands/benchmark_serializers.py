@@ -0,0 +1,84 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from shop.models import Category, Product, ProductImage, Review
+from shop.serializers import ProductListSerializer, ProductSerializer
+from wembli.renderers import FastJSONRenderer, orjson
+
+from ._scratch import scratch_database
+
+
+VARIANTS = [
+    ('list, all fields', ProductListSerializer, ''),
+    ('list, ?fields=id,name,price', ProductListSerializer, 'fields=id,name,price'),
+    ('detail, all fields', ProductSerializer, ''),
+    ('detail, ?exclude=additional_images,average_rating,reviews_count', ProductSerializer,
+     'exclude=additional_images,average_rating,reviews_count'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure payload bytes and serialization time per 100 products, with and without sparse fieldsets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            self.seed()
+            self.stdout.write(f'orjson {"available" if orjson else "not installed"}; '
+                              f'{options["iterations"]} iterations of 100 products')
+            for label, serializer_class, query in VARIANTS:
+                self.run(label, serializer_class, query, options['iterations'])
+
+    def seed(self):
+        category = Category.objects.create(name='Benchmark', slug='benchmark')
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', slug=f'product-{i}', category=category,
+                    description='Lorem ipsum dolor sit amet. ' * 20, price=Decimal(10 + i % 90))
+            for i in range(100)
+        ])
+        users = User.objects.bulk_create([User(username=f'reviewer{i}') for i in range(5)])
+        Review.objects.bulk_create([
+            Review(product=product, user=user, rating=1 + (product.pk + user.pk) % 5, comment='Good')
+            for product in products for user in users
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'products/additional/{product.pk}-{i}.jpg')
+            for product in products for i in range(3)
+        ])
+
+    def run(self, label, serializer_class, query, iterations):
+        request = Request(APIRequestFactory().get('/api/products/', QUERY_STRING=query))
+        request.user = AnonymousUser()
+        context = {'request': request}
+        queryset = Product.objects.filter(available=True).order_by('id')
+
+        serialize_time = 0.0
+        renders = {JSONRenderer: 0.0, FastJSONRenderer: 0.0}
+        for _ in range(iterations):
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                optimized = serializer_class.optimize_queryset(queryset, context)
+                data = serializer_class(optimized, many=True, context=context).data
+            serialize_time += time.perf_counter() - started
+
+            for renderer_class in renders:
+                started = time.perf_counter()
+                content = renderer_class().render(data)
+                renders[renderer_class] += time.perf_counter() - started
+
+        self.stdout.write(
+            f'{label:>64}: {len(content):7d} bytes  {len(queries.captured_queries):3d} queries  '
+            f'serialize {serialize_time / iterations * 1000:7.2f} ms  '
+            f'render {renders[JSONRenderer] / iterations * 1000:6.2f} ms (json) '
+            f'{renders[FastJSONRenderer] / iterations * 1000:6.2f} ms (fast)'
+        )
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from wembli.startup import ENTRYPOINTS, PROBE_PATH, measure_startup, probe_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold-start import time and time to first response of the WSGI and '
+        'ASGI entry points, each in fresh interpreters against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default=PROBE_PATH, help='Path of the first request.')
+        parser.add_argument('--entrypoint', choices=ENTRYPOINTS + ('all',), default='all')
+
+    def handle(self, *args, **options):
+        entrypoints = ENTRYPOINTS if options['entrypoint'] == 'all' else (options['entrypoint'],)
+        import_budget = getattr(settings, 'STARTUP_IMPORT_BUDGET_MS', None)
+        response_budget = getattr(settings, 'STARTUP_FIRST_RESPONSE_BUDGET_MS', None)
+        self.stdout.write(f'budget: import {import_budget} ms, first response {response_budget} ms')
+        with probe_database() as database_name:
+            for entrypoint in entrypoints:
+                self.report(measure_startup(entrypoint, options['path'], options['runs'], database_name))
+
+    def report(self, result):
+        statuses = ', '.join(str(status) for status in result['statuses'])
+        self.stdout.write(
+            f'{result["entrypoint"]:>5}: import {result["import_ms"]:7.1f} ms  '
+            f'first response {result["first_response_ms"]:7.1f} ms  '
+            f'(status {statuses}, median of {result["runs"]})'
+        )
+        if result['statuses'] != [200]:
+            self.stdout.write(self.style.WARNING('       first response was not a 200; pick a --path that serves one'))
+        if result['loaded_at_import']:
+            self.stdout.write(self.style.WARNING(
+                f'       loaded at import: {", ".join(result["loaded_at_import"])}'
+            ))
@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+
+from shop.models import Cart, CartItem, Category, Product
+from wembli.write_queue import WriteCoordinator
+
+from ._scratch import scratch_database
+
+
+MODES = ('direct', 'coordinated', 'batched')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark write throughput with mixed reads against a scratch copy of the '
+        'SQLite database, with N concurrent clients.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per mode.')
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--mode', choices=MODES + ('all',), default='all')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('benchmark_writes only targets SQLite.')
+
+        with scratch_database():
+            journal_mode = connection.cursor().execute('PRAGMA journal_mode').fetchone()[0]
+            self.stdout.write(f'journal_mode={journal_mode} clients={options["clients"]} '
+                              f'write_ratio={options["write_ratio"]}')
+            product_ids, cart_ids = self.seed(options['products'], options['clients'])
+            modes = MODES if options['mode'] == 'all' else (options['mode'],)
+            for mode in modes:
+                self.run(mode, product_ids, cart_ids, options)
+
+    def seed(self, product_count, client_count):
+        category = Category.objects.create(name='Benchmark', slug='benchmark')
+        Product.objects.bulk_create([
+            Product(name=f'Product {i}', slug=f'product-{i}', category=category,
+                    price=Decimal(10 + i % 90), stock=1_000_000)
+            for i in range(product_count)
+        ])
+        Cart.objects.bulk_create([Cart(session_key=f'benchmark-{i}') for i in range(client_count)])
+        return list(Product.objects.values_list('id', flat=True)), list(Cart.objects.values_list('id', flat=True))
+
+    def run(self, mode, product_ids, cart_ids, options):
+        coordinator = WriteCoordinator()
+        stop_at = time.monotonic() + options['duration']
+        lock = threading.Lock()
+        stats = {'reads': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+
+        def add_item(cart_id, product_id):
+            item, created = CartItem.objects.get_or_create(cart_id=cart_id, product_id=product_id)
+            if not created:
+                CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') + 1)
+
+        def client(cart_id):
+            rng = random.Random(cart_id)
+            reads = writes = errors = 0
+            latencies = []
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    if rng.random() < options['write_ratio']:
+                        product_id = rng.choice(product_ids)
+                        if mode == 'direct':
+                            with transaction.atomic():
+                                add_item(cart_id, product_id)
+                        elif mode == 'coordinated':
+                            with coordinator.atomic():
+                                add_item(cart_id, product_id)
+                        else:
+                            coordinator.submit(add_item, cart_id, product_id)
+                        writes += 1
+                    else:
+                        list(Product.objects.filter(available=True).values_list('id', 'price')[:12])
+                        reads += 1
+                except OperationalError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+            connections.close_all()
+            with lock:
+                stats['reads'] += reads
+                stats['writes'] += writes
+                stats['errors'] += errors
+                stats['latencies'].extend(latencies)
+
+        threads = [threading.Thread(target=client, args=(cart_ids[i % len(cart_ids)],))
+                   for i in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencies = sorted(stats['latencies']) or [0.0]
+        duration = options['duration']
+        self.stdout.write(
+            f'{mode:>12}: {stats["writes"] / duration:8.1f} writes/s  {stats["reads"] / duration:8.1f} reads/s  '
+            f'p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms  '
+            f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms  '
+            f'locked errors {stats["errors"]}'
+        )
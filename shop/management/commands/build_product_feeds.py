@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from shop.feeds import FEED_FORMATS, build_product_feeds
+
+
+class Command(BaseCommand):
+    help = 'Update the gzipped partner product feeds; run periodically, only changed segments are rewritten.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='formats', action='append', choices=FEED_FORMATS,
+                            help='Feed format to build (repeatable); all formats by default.')
+        parser.add_argument('--full', action='store_true', help='Rewrite every segment.')
+        parser.add_argument('--base-url', help='Overrides SHOP_FEED_BASE_URL for links and image URLs.')
+
+    def handle(self, *args, **options):
+        result = build_product_feeds(
+            formats=options['formats'] or FEED_FORMATS, full=options['full'], base_url=options['base_url'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rewrote {result['rewritten']} of {result['segments']} segments "
+            f"({result['products_written']} products)."
+        ))
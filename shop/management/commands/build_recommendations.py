@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shop.recommendations import build_recommendations, get_top_k
+
+
+class Command(BaseCommand):
+    help = 'Build "frequently bought together" recommendations from order history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only process orders created since the last run.',
+        )
+        parser.add_argument('--top-k', type=int, default=get_top_k())
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        run = build_recommendations(
+            incremental=options['incremental'],
+            top_k=options['top_k'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {run.orders_processed} orders (up to order {run.last_order_id}).'
+        ))
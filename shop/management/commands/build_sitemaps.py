@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shop.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Update the sitemap index and shards; run periodically, only changed shards are rewritten.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rewrite every shard.')
+
+    def handle(self, *args, **options):
+        result = build_sitemaps(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Rewrote {result['rewritten']} of {result['shards']} sitemap shards."))
@@ -0,0 +1,78 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.bulk import BulkUpdateError, bulk_set_prices, bulk_update_products, select_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Reprice, restock or toggle available/featured on many products with batched UPDATEs '
+        '(no Product.save, no image work).'
+    )
+
+    def add_arguments(self, parser):
+        select = parser.add_argument_group('selection (all products when omitted)')
+        select.add_argument('--ids', help='Comma-separated product ids.')
+        select.add_argument('--filter', action='append', default=[], metavar='KEY=VALUE',
+                            help='Product list filter (category, featured, search, min_price, max_price, '
+                                 'available); repeatable.')
+        change = parser.add_argument_group('changes')
+        change.add_argument('--set-price')
+        change.add_argument('--adjust-price-percent', help='e.g. -10 for a 10%% discount.')
+        change.add_argument('--set-stock', type=int)
+        change.add_argument('--available', choices=('true', 'false'))
+        change.add_argument('--featured', choices=('true', 'false'))
+        change.add_argument('--prices-csv', metavar='PATH', help='CSV of id,price rows to set individually.')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'SHOP_BULK_BATCH_SIZE', 1000))
+        parser.add_argument('--dry-run', action='store_true', help='Only count matching products.')
+
+    def handle(self, *args, **options):
+        try:
+            if options['prices_csv']:
+                with open(options['prices_csv'], newline='') as f:
+                    prices = {row[0]: row[1] for row in csv.reader(f) if row and row[0].strip().isdigit()}
+                result = bulk_set_prices(prices, batch_size=options['batch_size'])
+            else:
+                result = bulk_update_products(
+                    self.selection(options), self.changes(options),
+                    batch_size=options['batch_size'], dry_run=options['dry_run'],
+                )
+        except BulkUpdateError as exc:
+            raise CommandError(str(exc))
+
+        if options['dry_run'] and not options['prices_csv']:
+            self.stdout.write(f"{result['matched']} products match.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Updated {result['updated']} of {result['matched']} products in {result['batches']} batches."
+            ))
+
+    def selection(self, options):
+        ids = None
+        if options['ids']:
+            try:
+                ids = [int(pk) for pk in options['ids'].split(',') if pk.strip()]
+            except ValueError:
+                raise CommandError('--ids must be comma-separated integers')
+        filters = {}
+        for item in options['filter']:
+            key, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'--filter expects KEY=VALUE, got {item!r}')
+            filters[key.strip()] = value.strip()
+        return select_products(ids=ids, filters=filters)
+
+    def changes(self, options):
+        changes = {}
+        if options['set_price'] is not None:
+            changes['price'] = options['set_price']
+        if options['adjust_price_percent'] is not None:
+            changes['price_percent'] = options['adjust_price_percent']
+        if options['set_stock'] is not None:
+            changes['stock'] = options['set_stock']
+        for name in ('available', 'featured'):
+            if options[name] is not None:
+                changes[name] = options[name]
+        return changes
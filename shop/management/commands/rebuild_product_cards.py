@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shop.cards import rebuild_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized product card table used by the product list endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        written, deleted = rebuild_product_cards(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} product cards, removed {deleted} stale cards.'))
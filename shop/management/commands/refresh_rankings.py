@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from shop.rankings import recount_sales, refresh_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Refresh product trending scores; run periodically (e.g. every 15 minutes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recount-sales', action='store_true',
+            help='Also rebuild bestseller counters from the full order history.',
+        )
+
+    def handle(self, *args, **options):
+        if options['recount_sales']:
+            count = recount_sales()
+            self.stdout.write(f'Recounted sales for {count} products.')
+        count = refresh_trending_scores()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed trending scores for {count} products.'))
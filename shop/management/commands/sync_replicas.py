@@ -0,0 +1,55 @@
+import json
+import os
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from wembli.db_router import PRIMARY, get_replicas, sqlite_mtime, sync_marker_path
+
+
+class Command(BaseCommand):
+    help = 'Refresh SQLite read replicas from a consistent snapshot of the primary database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep running and resync every SECONDS.')
+
+    def handle(self, *args, **options):
+        primary = connections.settings[PRIMARY]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replicas only supports SQLite; use the database\'s own replication.')
+        replicas = get_replicas()
+        if not replicas:
+            self.stdout.write('No replicas configured in DATABASE_REPLICAS.')
+            return
+
+        while True:
+            for alias in replicas:
+                self.sync(primary['NAME'], connections.settings[alias]['NAME'])
+                self.stdout.write(f'Synced {alias}.')
+            if not options['watch']:
+                break
+            time.sleep(options['watch'])
+
+    def sync(self, primary_name, replica_name):
+        # Record the primary's mtime before copying so the lag guard errs on the
+        # side of reporting the replica as staler than it is.
+        primary_mtime = sqlite_mtime(primary_name)
+        tmp_name = f'{replica_name}.tmp'
+
+        source = sqlite3.connect(primary_name)
+        target = sqlite3.connect(tmp_name)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        # Swap the snapshot in atomically; connections opened afterwards see it.
+        os.replace(tmp_name, replica_name)
+        marker_tmp = f'{sync_marker_path(replica_name)}.tmp'
+        with open(marker_tmp, 'w') as marker:
+            json.dump({'primary_mtime': primary_mtime, 'synced_at': time.time()}, marker)
+        os.replace(marker_tmp, sync_marker_path(replica_name))
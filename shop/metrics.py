@@ -0,0 +1,24 @@
+from monitoring.metrics import Counter, Histogram, registry
+
+from .fragments import get_fragment_cache
+
+
+cache_requests = Counter(
+    'shop_cache_requests_total', 'Shop cache lookups, by cache and result (hit, shared_hit, miss).',
+    ['cache', 'result'],
+)
+checkouts = Counter('shop_checkouts_total', 'Orders placed.')
+checkout_failures = Counter('shop_checkout_failures_total', 'Rejected or failed checkouts, by reason.', ['reason'])
+image_processing = Histogram(
+    'shop_image_processing_seconds', 'Product image thumbnailing time, by whether the image was resized.',
+    ['resized'],
+)
+
+
+@registry.register_collector
+def fragment_cache_metrics():
+    stats = get_fragment_cache().stats()
+    for result, key in (('hit', 'hits'), ('shared_hit', 'shared_hits'), ('miss', 'misses')):
+        yield 'shop_cache_requests_total', 'counter', '', {'cache': 'fragments', 'result': result}, stats[key]
+    yield ('shop_fragment_cache_bytes', 'gauge', 'Bytes of rendered card JSON held in process memory.',
+           {}, stats['bytes'])
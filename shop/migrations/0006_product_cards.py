@@ -0,0 +1,71 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def populate_cards(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    ProductCard = apps.get_model('shop', 'ProductCard')
+    products = (
+        Product.objects.select_related('category')
+        .annotate(rating=Avg('reviews__rating'), rating_count=Count('reviews'))
+        .order_by('pk')
+    )
+    cards = [
+        ProductCard(
+            product_id=product.pk,
+            name=product.name,
+            slug=product.slug,
+            category_id=product.category_id,
+            category_slug=product.category.slug,
+            category_name=product.category.name,
+            price=product.price,
+            image=product.image.name or '',
+            available=product.available,
+            featured=product.featured,
+            average_rating=product.rating or 0,
+            reviews_count=product.rating_count,
+            sales_count=product.sales_count,
+            trending_score=product.trending_score,
+            create_at=product.create_at,
+        )
+        for product in products.iterator(chunk_size=500)
+    ]
+    ProductCard.objects.bulk_create(cards, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_wishlist_recent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='shop.product')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField()),
+                ('category_id', models.IntegerField()),
+                ('category_slug', models.SlugField()),
+                ('category_name', models.CharField(max_length=200)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('image', models.CharField(blank=True, max_length=100)),
+                ('available', models.BooleanField(default=True)),
+                ('featured', models.BooleanField(default=False)),
+                ('average_rating', models.FloatField(default=0)),
+                ('reviews_count', models.PositiveIntegerField(default=0)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('trending_score', models.FloatField(default=0)),
+                ('create_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-create_at'],
+                'indexes': [models.Index(fields=['available', '-create_at'], name='shop_card_newest_idx'), models.Index(fields=['available', 'category_slug', '-create_at'], name='shop_card_category_idx'), models.Index(fields=['available', 'featured', '-create_at'], name='shop_card_featured_idx'), models.Index(fields=['available', 'price'], name='shop_card_price_idx'), models.Index(fields=['available', 'name'], name='shop_card_name_idx'), models.Index(fields=['available', '-sales_count'], name='shop_card_bestselling_idx'), models.Index(fields=['available', '-trending_score'], name='shop_card_trending_idx'), models.Index(fields=['category_id'], name='shop_card_category_id_idx')],
+            },
+        ),
+        migrations.RunPython(populate_cards, migrations.RunPython.noop),
+    ]
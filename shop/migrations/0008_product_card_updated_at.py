@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_order_status_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcard',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:07
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    Cart = apps.get_model('shop', 'Cart')
+    CartItem = apps.get_model('shop', 'CartItem')
+    totals = {}
+    for cart_id, quantity, price in CartItem.objects.values_list('cart_id', 'quantity', 'product__price').iterator():
+        items, lines, subtotal = totals.get(cart_id, (0, 0, Decimal('0')))
+        totals[cart_id] = (items + quantity, lines + 1, subtotal + quantity * price)
+    for cart_id, (items, lines, subtotal) in totals.items():
+        Cart.objects.filter(pk=cart_id).update(item_count=items, line_count=lines, subtotal=subtotal)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_product_card_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='cart',
+            name='session_key',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_cart_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productcard',
+            name='shop_card_bestselling_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productcard',
+            name='shop_card_trending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='productcard',
+            index=models.Index(fields=['available', '-sales_count', '-product'], name='shop_card_bestselling_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productcard',
+            index=models.Index(fields=['available', '-trending_score', '-product'], name='shop_card_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_card_ranking_tiebreaker'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='wishlist',
+            name='shop_wishlist_user_recent_idx',
+        ),
+        migrations.AddIndex(
+            model_name='wishlist',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='shop_wishlist_user_recent_idx'),
+        ),
+    ]
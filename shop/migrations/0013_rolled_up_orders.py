@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_existing_orders(apps, schema_editor):
+    # Earlier orders are already in the status rollups. Re-recording them
+    # would count them twice, so they are marked as counted. An order whose
+    # rollup task was still queued at deploy loses its item totals until
+    # `manage.py backfill_rollups` is run for its day.
+    Order = apps.get_model('shop', 'Order')
+    RolledUpOrder = apps.get_model('shop', 'RolledUpOrder')
+    pks = Order.objects.values_list('pk', flat=True).iterator(chunk_size=2000)
+    batch = []
+    for pk in pks:
+        batch.append(RolledUpOrder(order_id=pk))
+        if len(batch) >= 2000:
+            RolledUpOrder.objects.bulk_create(batch)
+            batch = []
+    RolledUpOrder.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_wishlist_recent_tiebreaker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RolledUpOrder',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='shop.order')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(mark_existing_orders, migrations.RunPython.noop),
+    ]
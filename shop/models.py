@@ -1,9 +1,16 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
 from django.urls import reverse
-from PIL import Image
+from django.utils import timezone
+from taskqueue.queue import enqueue
+from io import BytesIO
+import os
+import time
 import uuid
 
+from .metrics import image_processing
+
 
 class Category(models.Model):
     name = models.CharField(max_length=200)
@@ -24,7 +31,7 @@ class Category(models.Model):
         return self.name
 
     def get_absolute_url(self):
-        return reverse('shop:category_detail', args=[self.slug])
+        return reverse('shop:category-detail', args=[self.slug])
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -36,6 +43,8 @@ class Product(models.Model):
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     available = models.BooleanField(default=True)
     featured = models.BooleanField(default=False)
+    sales_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
     create_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -43,21 +52,48 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-create_at']
+        indexes = [
+            models.Index(fields=['available', '-sales_count'], name='shop_product_bestselling_idx'),
+            models.Index(fields=['available', '-trending_score'], name='shop_product_trending_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     def get_absolute_url(self):
-        return reverse('shop:product_detail', args=[self.slug])
+        return reverse('shop:product-detail', args=[self.slug])
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         if self.image:
-            img = Image.open(self.image.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.image.path)
+            # Resizing runs on the task queue; the key makes re-saves of the
+            # same image a no-op.
+            enqueue('shop.make_product_thumbnail', [self.pk],
+                    idempotency_key=f'product-thumbnail:{self.pk}:{self.image.name}')
+
+    def make_thumbnail(self):
+        """Shrink the image to fit 300x300, keeping the original if it's already small enough."""
+        # Pillow is imported here rather than at module level so that
+        # processes which never resize a product image don't load it.
+        from PIL import Image
+
+        start = time.perf_counter()
+        img = Image.open(self.image.path)
+        resized = img.height > 300 or img.width > 300
+        if resized:
+            output_size = (300, 300)
+            img.thumbnail(output_size)
+            # Uploads are content-addressed and may be shared with other
+            # products, so store the thumbnail as a new file rather than
+            # rewriting the original in place.
+            buffer = BytesIO()
+            img.save(buffer, format=img.format)
+            original = self.image.name
+            self.image.save(os.path.basename(original), ContentFile(buffer.getvalue()), save=False)
+            Product.objects.filter(pk=self.pk).update(image=self.image.name)
+            ProductCard.objects.filter(pk=self.pk).update(image=self.image.name, updated_at=timezone.now())
+            self.image.storage.delete(original)
+        image_processing.observe(time.perf_counter() - start, resized=str(resized).lower())
 
 
 class ProductImage(models.Model):
@@ -72,7 +108,13 @@ class ProductImage(models.Model):
 
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
-    session_key = models.CharField(max_length=50, null=True, blank=True)
+    session_key = models.CharField(max_length=50, null=True, blank=True, db_index=True)
+    # Maintained by shop.carts alongside every item change, for cart_summary
+    item_count = models.PositiveIntegerField(default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Bumped by every change to the cart's contents; the cart's ETag
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -178,6 +220,151 @@ class Wishlist(models.Model):
 
     class Meta:
         unique_together = ('user', 'product')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='shop_wishlist_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.product.name}"
+
+class ProductRecommendation(models.Model):
+    """Precomputed "frequently bought together" pair, built by ``build_recommendations``."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_in')
+    score = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('product', 'recommended')
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['product', '-score'], name='shop_rec_product_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} ({self.score})"
+
+
+class RecommendationRun(models.Model):
+    last_order_id = models.BigIntegerField(default=0)
+    orders_processed = models.PositiveIntegerField(default=0)
+    incremental = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Recommendation run up to order {self.last_order_id}"
+
+
+class DailyProductSales(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'product')
+        ordering = ['-date']
+        verbose_name_plural = 'Daily product sales'
+
+    def __str__(self):
+        return f"{self.date} - {self.product_id}: {self.units} units"
+
+
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'category')
+        ordering = ['-date']
+        verbose_name_plural = 'Daily category sales'
+
+    def __str__(self):
+        return f"{self.date} - {self.category_id}: {self.units} units"
+
+
+class RolledUpOrder(models.Model):
+    """Orders counted in the daily rollups; written with their increments, so each is counted once."""
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Order {self.order_id} rolled up"
+
+
+class DailyOrderStatus(models.Model):
+    """Orders per day and current status; the day is the order's creation date."""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'status')
+        ordering = ['-date']
+        verbose_name_plural = 'Daily order status'
+
+    def __str__(self):
+        return f"{self.date} - {self.status}: {self.orders} orders"
+
+
+class ProductCard(models.Model):
+    """Flat listing row per product, kept in sync by ``shop.cards``; read by the product list views."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=50)
+    category_id = models.IntegerField()
+    category_slug = models.SlugField(max_length=50)
+    category_name = models.CharField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    image = models.CharField(max_length=100, blank=True)
+    available = models.BooleanField(default=True)
+    featured = models.BooleanField(default=False)
+    average_rating = models.FloatField(default=0)
+    reviews_count = models.PositiveIntegerField(default=0)
+    sales_count = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(default=0)
+    create_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-create_at']
+        indexes = [
+            models.Index(fields=['available', '-create_at'], name='shop_card_newest_idx'),
+            models.Index(fields=['available', 'category_slug', '-create_at'], name='shop_card_category_idx'),
+            models.Index(fields=['available', 'featured', '-create_at'], name='shop_card_featured_idx'),
+            models.Index(fields=['available', 'price'], name='shop_card_price_idx'),
+            models.Index(fields=['available', 'name'], name='shop_card_name_idx'),
+            # The primary key breaks ties, so pages of equal ranks don't overlap.
+            models.Index(fields=['available', '-sales_count', '-product'], name='shop_card_bestselling_idx'),
+            models.Index(fields=['available', '-trending_score', '-product'], name='shop_card_trending_idx'),
+            models.Index(fields=['category_id'], name='shop_card_category_id_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class OrderStatusChange(models.Model):
+    """Append-only log of order status changes; the id is the sequence number of the order event feed."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_changes')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='order_status_changes')
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    previous_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='shop_orderchange_user_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.product.name}"
\ No newline at end of file
+        return f"{self.order_id}: {self.previous_status or '-'} -> {self.status}"
@@ -0,0 +1,158 @@
+"""
+Order status push feed (Server-Sent Events).
+
+Every order status change is appended to ``OrderStatusChange``; its id is the
+event id clients resume from with ``Last-Event-ID``. Changes committed in this
+process reach the streams immediately through ``order_event_bus``; changes
+from other processes (admin on a WSGI worker, the task worker) are picked up
+by one poller per event loop that reads new rows from the change table every
+``SHOP_ORDER_FEED_POLL_SECONDS``, however many streams are open. An idle
+stream is just a parked coroutine and an ``asyncio.Queue``.
+"""
+
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import OrderStatusChange
+
+
+def get_poll_interval():
+    return getattr(settings, 'SHOP_ORDER_FEED_POLL_SECONDS', 2)
+
+
+def get_heartbeat_interval():
+    return getattr(settings, 'SHOP_ORDER_FEED_HEARTBEAT_SECONDS', 15)
+
+
+def get_retry_ms():
+    return getattr(settings, 'SHOP_ORDER_FEED_RETRY_MS', 5000)
+
+
+def change_event(change):
+    return {
+        'id': change.pk,
+        'user_id': change.user_id,
+        'order_id': str(change.order.order_id),
+        'status': change.status,
+        'previous_status': change.previous_status or None,
+        'created_at': change.created_at.isoformat(),
+    }
+
+
+def format_event(event):
+    data = {key: value for key, value in event.items() if key not in ('id', 'user_id')}
+    return f'id: {event["id"]}\nevent: order-status\ndata: {json.dumps(data)}\n\n'
+
+
+class OrderEventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._pollers = {}
+
+    def subscribe(self, user_id):
+        """A queue receiving ``user_id``'s events on the running event loop."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((loop, queue))
+            poller = self._pollers.get(loop)
+            if poller is None or poller.done():
+                self._pollers[loop] = loop.create_task(self._poll(loop))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, event, loop=None):
+        """Deliver ``event`` to its user's streams; callable from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['user_id'], ()))
+        for subscriber_loop, queue in subscribers:
+            if loop is None or subscriber_loop is loop:
+                subscriber_loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def _has_subscribers(self, loop):
+        with self._lock:
+            return any(s[0] is loop for subscribers in self._subscribers.values() for s in subscribers)
+
+    async def _poll(self, loop):
+        last_id = await latest_change_id()
+        while self._has_subscribers(loop):
+            await asyncio.sleep(get_poll_interval())
+            for event in await changes_since(last_id):
+                last_id = event['id']
+                self.publish(event, loop=loop)
+
+
+order_event_bus = OrderEventBus()
+
+
+def record_status_change(order, previous_status=None):
+    """Log a new order or a status change, and push it to open streams once committed."""
+    change = OrderStatusChange.objects.create(
+        order=order,
+        user_id=order.user_id,
+        status=order.status,
+        previous_status=previous_status or '',
+    )
+    event = change_event(change)
+    transaction.on_commit(lambda: order_event_bus.publish(event))
+    return change
+
+
+@sync_to_async
+def latest_change_id():
+    return OrderStatusChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+@sync_to_async
+def changes_since(last_id, user_id=None, limit=500):
+    changes = OrderStatusChange.objects.filter(id__gt=last_id).select_related('order').only(
+        'id', 'user_id', 'status', 'previous_status', 'created_at', 'order__order_id',
+    )
+    if user_id is not None:
+        changes = changes.filter(user_id=user_id)
+    return [change_event(change) for change in changes.order_by('id')[:limit]]
+
+
+async def stream_order_events(user_id, last_event_id=None, order_id=None):
+    """SSE body: missed events since ``last_event_id``, then live events and heartbeats."""
+    queue = order_event_bus.subscribe(user_id)
+    try:
+        yield f'retry: {get_retry_ms()}\n\n'
+        if last_event_id is None:
+            last_event_id = await latest_change_id()
+        backlog = await changes_since(last_event_id, user_id=user_id)
+        # In-process and polled delivery can overlap and arrive out of order,
+        # so de-duplicate by id rather than by a high-water mark.
+        delivered = set()
+        for event in backlog:
+            delivered.add(event['id'])
+            if order_id is None or event['order_id'] == order_id:
+                yield format_event(event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=get_heartbeat_interval())
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event['id'] <= last_event_id or event['id'] in delivered:
+                continue
+            delivered.add(event['id'])
+            if len(delivered) > 1000:
+                delivered = set(sorted(delivered)[-500:])
+            if order_id is None or event['order_id'] == order_id:
+                yield format_event(event)
+    finally:
+        order_event_bus.unsubscribe(user_id, queue)
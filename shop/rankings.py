@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .cards import sync_card_rankings
+from .models import OrderItem, Product, ProductCard
+
+
+def get_trending_half_life():
+    return timedelta(hours=getattr(settings, 'SHOP_TRENDING_HALF_LIFE_HOURS', 72))
+
+
+def record_sale(product_id, quantity):
+    """Take ``quantity`` units out of stock and count them as sold, in one UPDATE."""
+    Product.objects.filter(pk=product_id).update(
+        stock=F('stock') - quantity,
+        sales_count=F('sales_count') + quantity,
+        updated_at=timezone.now(),
+    )
+    ProductCard.objects.filter(pk=product_id).update(sales_count=F('sales_count') + quantity)
+
+
+def _bulk_set(field, scores, batch_size):
+    products = [Product(pk=product_id, **{field: value}) for product_id, value in scores.items()]
+    Product.objects.bulk_update(products, [field], batch_size=batch_size)
+
+
+def refresh_trending_scores(now=None, batch_size=500):
+    """Recompute ``Product.trending_score`` as time-decayed units sold.
+
+    Every unit contributes ``0.5 ** (age / half_life)``; orders older than
+    eight half-lives contribute less than 0.4% and are not read at all.
+    """
+    now = now or timezone.now()
+    half_life = get_trending_half_life().total_seconds()
+    rows = (
+        OrderItem.objects.filter(order__created_at__gte=now - timedelta(seconds=half_life * 8))
+        .exclude(order__status='cancelled')
+        .values_list('product_id', 'quantity', 'order__created_at')
+        .iterator(chunk_size=2000)
+    )
+    scores = {}
+    for product_id, quantity, created_at in rows:
+        age = max((now - created_at).total_seconds(), 0)
+        scores[product_id] = scores.get(product_id, 0) + quantity * 0.5 ** (age / half_life)
+
+    with transaction.atomic():
+        Product.objects.filter(trending_score__gt=0).update(trending_score=0)
+        _bulk_set('trending_score', scores, batch_size)
+        sync_card_rankings()
+    return len(scores)
+
+
+def recount_sales(batch_size=500):
+    """Rebuild ``Product.sales_count`` from order history (for backfills and repairs)."""
+    totals = dict(
+        OrderItem.objects.values('product_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    )
+    with transaction.atomic():
+        Product.objects.filter(sales_count__gt=0).update(sales_count=0)
+        _bulk_set('sales_count', totals, batch_size)
+        sync_card_rankings()
+    return len(totals)
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from itertools import combinations, groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import OrderItem, ProductRecommendation, RecommendationRun
+
+
+# Orders with more distinct products than this only contribute their first
+# MAX_BASKET_SIZE products; pair counting is quadratic in basket size.
+MAX_BASKET_SIZE = 50
+
+
+def get_top_k():
+    return getattr(settings, 'SHOP_RECOMMENDATIONS_TOP_K', 20)
+
+
+class CoPurchaseCounter:
+    """Pairwise co-purchase counts with bounded memory.
+
+    Each product keeps at most ``prune_at`` neighbours; once that is exceeded
+    the lowest counts are dropped down to ``keep``. Pairs that are frequent
+    enough to make the final top-K survive pruning, rare ones are forgotten.
+    """
+
+    def __init__(self, top_k):
+        self.keep = top_k * 2
+        self.prune_at = top_k * 8
+        self.counts = defaultdict(dict)
+
+    def add_basket(self, product_ids):
+        for a, b in combinations(sorted(product_ids)[:MAX_BASKET_SIZE], 2):
+            self._increment(a, b)
+            self._increment(b, a)
+
+    def _increment(self, product_id, other_id):
+        neighbours = self.counts[product_id]
+        neighbours[other_id] = neighbours.get(other_id, 0) + 1
+        if len(neighbours) > self.prune_at:
+            self.counts[product_id] = dict(top_items(neighbours, self.keep))
+
+
+def top_items(counts, limit):
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def iter_order_baskets(since_order_id=0, chunk_size=2000):
+    """Stream ``(order_id, {product_id, ...})`` for orders after ``since_order_id``."""
+    rows = (
+        OrderItem.objects.filter(order_id__gt=since_order_id)
+        .order_by('order_id')
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for order_id, items in groupby(rows, key=itemgetter(0)):
+        yield order_id, {product_id for _, product_id in items}
+
+
+def _write_recommendations(counter, top_k, merge, batch_size):
+    product_ids = list(counter.counts)
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        if merge:
+            existing = ProductRecommendation.objects.filter(product_id__in=batch)
+            for product_id, recommended_id, score in existing.values_list('product_id', 'recommended_id', 'score'):
+                neighbours = counter.counts[product_id]
+                neighbours[recommended_id] = neighbours.get(recommended_id, 0) + score
+            existing.delete()
+
+        ProductRecommendation.objects.bulk_create([
+            ProductRecommendation(product_id=product_id, recommended_id=recommended_id, score=score)
+            for product_id in batch
+            for recommended_id, score in top_items(counter.counts[product_id], top_k)
+        ], batch_size=batch_size)
+
+
+def build_recommendations(incremental=False, top_k=None, chunk_size=2000):
+    """Rebuild the recommendations table from order history.
+
+    With ``incremental=True`` only orders created since the last run are read
+    and their counts are merged into the existing rows of affected products.
+    Returns the ``RecommendationRun`` that records the new watermark.
+    """
+    top_k = top_k or get_top_k()
+    last_run = RecommendationRun.objects.order_by('-id').first()
+    since = last_run.last_order_id if incremental and last_run else 0
+
+    counter = CoPurchaseCounter(top_k)
+    last_order_id = since
+    orders_processed = 0
+    for order_id, product_ids in iter_order_baskets(since, chunk_size):
+        counter.add_basket(product_ids)
+        last_order_id = order_id
+        orders_processed += 1
+
+    with transaction.atomic():
+        if not incremental:
+            ProductRecommendation.objects.all().delete()
+        _write_recommendations(counter, top_k, merge=incremental, batch_size=500)
+        return RecommendationRun.objects.create(
+            last_order_id=last_order_id,
+            orders_processed=orders_processed,
+            incremental=incremental,
+        )
@@ -0,0 +1,179 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.utils import timezone
+
+from .models import DailyCategorySales, DailyOrderStatus, DailyProductSales, Order, OrderItem, RolledUpOrder
+
+
+LINE_TOTAL = Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _increment(model, lookup, **deltas):
+    """Add ``deltas`` to the rollup row identified by ``lookup``, creating it if needed."""
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently between our UPDATE and INSERT.
+        model.objects.filter(**lookup).update(**changes)
+
+
+def order_date(order):
+    return timezone.localdate(order.created_at)
+
+
+def record_order_items(order):
+    """Add a newly created order's lines to the product and category rollups."""
+    day = order_date(order)
+    products = defaultdict(lambda: [0, Decimal('0')])
+    categories = defaultdict(lambda: [0, Decimal('0')])
+    for product_id, category_id, quantity, price in order.items.values_list(
+        'product_id', 'product__category_id', 'quantity', 'price'
+    ):
+        for totals in (products[product_id], categories[category_id]):
+            totals[0] += quantity
+            totals[1] += quantity * price
+
+    with transaction.atomic():
+        for product_id, (units, revenue) in products.items():
+            _increment(DailyProductSales, {'date': day, 'product_id': product_id},
+                       units=units, revenue=revenue, orders=1)
+        for category_id, (units, revenue) in categories.items():
+            _increment(DailyCategorySales, {'date': day, 'category_id': category_id},
+                       units=units, revenue=revenue, orders=1)
+
+
+def record_order_status(order, previous_status=None):
+    """Move an order between status rollups; ``previous_status`` is None for new orders."""
+    day = order_date(order)
+    with transaction.atomic():
+        if previous_status is not None:
+            _increment(DailyOrderStatus, {'date': day, 'status': previous_status},
+                       orders=-1, revenue=-order.total_amount)
+        _increment(DailyOrderStatus, {'date': day, 'status': order.status},
+                   orders=1, revenue=order.total_amount)
+
+
+def record_new_order(order_id):
+    """Add a new order to the product, category and status rollups; False if it was already counted.
+
+    The order is marked in ``RolledUpOrder`` in the same transaction as the
+    increments, so a retried task, or one running after ``rebuild_day``
+    counted the order, adds nothing. The status is read here, so changes
+    made before this ran are included.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order_id).first()
+        if order is None:
+            return False
+        _, created = RolledUpOrder.objects.get_or_create(order=order)
+        if not created:
+            return False
+        record_order_items(order)
+        record_order_status(order)
+    return True
+
+
+def move_order_status(order, previous_status):
+    """Move a counted order between status rollups; uncounted orders are left to ``record_new_order``."""
+    with transaction.atomic():
+        if RolledUpOrder.objects.filter(order_id=order.pk).exists():
+            record_order_status(order, previous_status=previous_status)
+
+
+def rebuild_day(day):
+    """Replace one day's rollups with totals recomputed from its orders.
+
+    In one transaction, every order of the day is marked as counted and the
+    totals are recomputed from the marked orders. A pending
+    ``record_new_order`` for one of them then adds nothing, and an order
+    committed after the marking is left to its own task.
+    """
+    orders = Order.objects.filter(created_at__date=day)
+    with transaction.atomic():
+        RolledUpOrder.objects.bulk_create(
+            [RolledUpOrder(order_id=pk) for pk in orders.filter(rollup__isnull=True).values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        counted = orders.filter(rollup__isnull=False)
+        items = OrderItem.objects.filter(order__in=counted)
+        for model in (DailyProductSales, DailyCategorySales, DailyOrderStatus):
+            model.objects.filter(date=day).delete()
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(date=day, product_id=row['product_id'],
+                              units=row['units'], revenue=row['revenue'], orders=row['orders'])
+            for row in items.values('product_id').annotate(
+                units=Sum('quantity'), revenue=LINE_TOTAL, orders=Count('order_id', distinct=True))
+        ])
+        DailyCategorySales.objects.bulk_create([
+            DailyCategorySales(date=day, category_id=row['product__category_id'],
+                               units=row['units'], revenue=row['revenue'], orders=row['orders'])
+            for row in items.values('product__category_id').annotate(
+                units=Sum('quantity'), revenue=LINE_TOTAL, orders=Count('order_id', distinct=True))
+        ])
+        DailyOrderStatus.objects.bulk_create([
+            DailyOrderStatus(date=day, status=row['status'], orders=row['orders'], revenue=row['revenue'])
+            for row in counted.values('status').annotate(orders=Count('id'), revenue=Sum('total_amount'))
+        ])
+
+
+def backfill_rollups(start, end):
+    """Rebuild all rollups for orders created between ``start`` and ``end`` (inclusive dates).
+
+    Each day is rebuilt in its own short transaction so checkout writes can
+    interleave; returns the number of days rebuilt.
+    """
+    day = start
+    days = 0
+    while day <= end:
+        rebuild_day(day)
+        day += timedelta(days=1)
+        days += 1
+    return days
+
+
+def sales_report(start, end, limit=50):
+    """Date-range sales report served from the rollup tables only."""
+    def totals(queryset, *group_by):
+        return queryset.filter(date__range=(start, end)).values(*group_by)
+
+    by_status = list(
+        totals(DailyOrderStatus.objects, 'status')
+        .annotate(orders=Sum('orders'), revenue=Sum('revenue'))
+        .order_by('status')
+    )
+    by_day = list(
+        totals(DailyProductSales.objects, 'date')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('date')
+    )
+    by_category = list(
+        totals(DailyCategorySales.objects, 'category_id', 'category__name')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'), orders=Sum('orders'))
+        .order_by('-revenue')
+    )
+    by_product = list(
+        totals(DailyProductSales.objects, 'product_id', 'product__name')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'), orders=Sum('orders'))
+        .order_by('-revenue')[:limit]
+    )
+    return {
+        'start': start,
+        'end': end,
+        'totals': {
+            'orders': sum(row['orders'] for row in by_status),
+            'revenue': sum((row['revenue'] for row in by_status), Decimal('0')),
+            'units': sum(row['units'] for row in by_day),
+        },
+        'by_day': by_day,
+        'by_status': by_status,
+        'by_category': by_category,
+        'by_product': by_product,
+    }
@@ -1,9 +1,13 @@
 from rest_framework import serializers
 from .models import Category, Product, ProductImage, Cart, CartItem, Order, OrderItem, Review, Wishlist
 from django.contrib.auth.models import User
+from monitoring.serializers import TimedListSerializer, TimedSerializerMixin
+from wembli.renderers import FastJSONRenderer, JSONFragment
+from wembli.sparse_fields import SparseFieldsetMixin, get_sparse_fields
+from .fragments import get_fragment_cache
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     products_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -23,12 +27,16 @@ class ProductImageSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     additional_images = ProductImageSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
     is_wishlisted = serializers.SerializerMethodField()
+    sparse_field_requirements = {
+        'average_rating': {'prefetch': ['reviews']},
+        'reviews_count': {'prefetch': ['reviews']},
+    }
     
     class Meta:
         model = Product
@@ -55,9 +63,12 @@ class ProductSerializer(serializers.ModelSerializer):
         return False
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     average_rating = serializers.SerializerMethodField()
+    sparse_field_requirements = {
+        'average_rating': {'prefetch': ['reviews']},
+    }
     
     class Meta:
         model = Product
@@ -71,7 +82,86 @@ class ProductListSerializer(serializers.ModelSerializer):
         return 0
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+
+class ProductCardListSerializer(TimedListSerializer):
+    """Assembles full cards from cached JSON fragments; only missing or stale cards are serialized."""
+    renderer = FastJSONRenderer()
+
+    def to_representation(self, data):
+        cards = list(data.all() if hasattr(data, 'all') else data)
+        if self.child.fields_out != self.child.card_fields:
+            # Sparse fieldsets produce partial cards; those aren't cached.
+            return [self.child.to_representation(card) for card in cards]
+        
+        request = self.context.get('request')
+        # Image URLs are absolute, so the host is part of the key.
+        base = request.build_absolute_uri('/') if request is not None else ''
+        keys = [f'{base}:{card.product_id}:{card.updated_at.timestamp()}' for card in cards]
+        cache = get_fragment_cache()
+        fragments = cache.get_many(keys)
+        rendered = {
+            key: self.renderer.render(self.child.to_representation(card))
+            for key, card in zip(keys, cards) if key not in fragments
+        }
+        cache.set_many(rendered)
+        fragments.update(rendered)
+        return [JSONFragment(fragments[key]) for key in keys]
+
+
+class ProductCardSerializer(TimedSerializerMixin, serializers.BaseSerializer):
+    """Read-only, same output as ``ProductListSerializer`` but built straight from ``ProductCard`` rows."""
+    card_fields = ['id', 'name', 'slug', 'category_name', 'price', 'image',
+                   'available', 'featured', 'average_rating']
+    # Column each output field reads, for .only().
+    card_columns = {'id': 'product', 'average_rating': ('average_rating', 'reviews_count')}
+    price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+    image_storage = Product._meta.get_field('image').storage
+
+    class Meta:
+        list_serializer_class = ProductCardListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        self.fields_out = (
+            get_sparse_fields(request, self.card_fields)
+            if request is not None and request.method == 'GET' else self.card_fields
+        )
+
+    @classmethod
+    def optimize_queryset(cls, queryset, context):
+        serializer = cls(context=context)
+        columns = set()
+        for name in serializer.fields_out:
+            column = cls.card_columns.get(name, name)
+            columns.update((column,) if isinstance(column, str) else column)
+        # updated_at keys the fragment cache.
+        return queryset.only(*sorted(columns | {'product', 'updated_at'}))
+
+    def to_representation(self, card):
+        data = {}
+        for name in self.fields_out:
+            if name == 'id':
+                data['id'] = card.product_id
+            elif name == 'price':
+                data['price'] = self.price_field.to_representation(card.price)
+            elif name == 'image':
+                data['image'] = self.image_url(card.image)
+            elif name == 'average_rating':
+                data['average_rating'] = card.average_rating if card.reviews_count else 0
+            else:
+                data[name] = getattr(card, name)
+        return data
+
+    def image_url(self, name):
+        if not name:
+            return None
+        url = self.image_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class CartItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
     product_image = serializers.ImageField(source='product.image', read_only=True)
@@ -89,15 +179,15 @@ class CartItemSerializer(serializers.ModelSerializer):
         return value
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Cart
-        fields = ['id', 'items', 'total_price', 'total_items', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'items', 'total_price', 'total_items', 'version', 'created_at', 'updated_at']
+        read_only_fields = ['version', 'created_at', 'updated_at']
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -112,9 +202,12 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['total_price']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
+    sparse_field_requirements = {
+        'items': {'prefetch': ['items__product']},
+    }
     
     class Meta:
         model = Order
@@ -131,7 +224,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
                  'city', 'postal_code', 'country']
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
     product_name = serializers.CharField(source='product.name', read_only=True)
     
@@ -147,7 +240,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         return value
 
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
     product_image = serializers.ImageField(source='product.image', read_only=True)
@@ -0,0 +1,85 @@
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .bulk import products_bulk_updated
+from .cache import bump_catalog_version
+from .cards import refresh_category_cards, refresh_product_cards
+from .carts import recalculate_cart_totals
+from .models import CartItem, Category, Order, Product, Review
+from .order_events import record_status_change
+from .rollups import move_order_status
+from .tasks import record_order_rollups
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def update_product_card(sender, instance, **kwargs):
+    refresh_product_cards([instance.pk])
+
+
+@receiver(post_init, sender=Product)
+def remember_product_price(sender, instance, **kwargs):
+    instance._cart_price = instance.__dict__.get('price')
+
+
+@receiver(post_save, sender=Product)
+def update_cart_subtotals(sender, instance, created, **kwargs):
+    if not created and instance._cart_price is not None and instance.price != instance._cart_price:
+        recalculate_cart_totals(CartItem.objects.filter(product=instance).values('cart'))
+    instance._cart_price = instance.price
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_carts(sender, instance, **kwargs):
+    # The product's cart lines are cascaded away; recount those carts after.
+    instance._cart_ids = list(CartItem.objects.filter(product=instance).values_list('cart_id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def update_product_carts(sender, instance, **kwargs):
+    if getattr(instance, '_cart_ids', None):
+        recalculate_cart_totals(instance._cart_ids)
+
+
+@receiver(products_bulk_updated)
+def refresh_bulk_updated_products(sender, product_ids, fields, **kwargs):
+    # Once per batch of shop.bulk, for what the per-save receivers above do.
+    bump_catalog_version()
+    refresh_product_cards(product_ids)
+    if 'price' in fields:
+        recalculate_cart_totals(CartItem.objects.filter(product_id__in=product_ids).values('cart'))
+
+
+@receiver(post_save, sender=Category)
+def update_category_cards(sender, instance, created, **kwargs):
+    if not created:
+        refresh_category_cards(instance)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def update_rating_card(sender, instance, **kwargs):
+    refresh_product_cards([instance.product_id])
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads (.only()) don't fetch the status.
+    instance._rollup_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def track_order_status(sender, instance, created, **kwargs):
+    if created:
+        # The task worker adds the order to all rollups at once, after the
+        # creating transaction (and with it the order's items) commits.
+        record_order_rollups.delay(instance.pk, idempotency_key=f'order-rollups:{instance.pk}')
+        record_status_change(instance)
+    elif instance._rollup_status is not None and instance.status != instance._rollup_status:
+        move_order_status(instance, previous_status=instance._rollup_status)
+        record_status_change(instance, previous_status=instance._rollup_status)
+    instance._rollup_status = instance.status
@@ -0,0 +1,140 @@
+"""
+Precomputed sitemaps.
+
+``build_sitemaps`` writes the storefront URLs of available products and
+active categories into gzipped shards of at most ``SHOP_SITEMAP_SHARD_SIZE`` URLs
+(50,000, the protocol's limit): shard N of a section holds the ids from
+N * size up to (N + 1) * size, streamed from a chunked queryset. The
+manifest keeps each shard's URL count and newest ``updated_at`` (its
+``lastmod``), so a later run only rewrites shards whose objects changed,
+and ``sitemap.xml`` indexes them all. The files are served like static
+files by ``sitemap_index`` / ``sitemap_shard``.
+"""
+
+import gzip
+import json
+import os
+import re
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, Product
+from .storefront import get_url_template
+
+
+SHARD_NAME_RE = re.compile(r'^sitemap-[a-z]+-\d{5}\.xml\.gz$')
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def get_sitemap_root():
+    return getattr(settings, 'SHOP_SITEMAP_ROOT', os.path.join(settings.BASE_DIR, 'sitemaps'))
+
+
+def get_shard_size():
+    return min(getattr(settings, 'SHOP_SITEMAP_SHARD_SIZE', 50000), 50000)
+
+
+def get_base_url():
+    return getattr(settings, 'SHOP_SITEMAP_BASE_URL', '').rstrip('/')
+
+
+SECTIONS = {
+    'products': (lambda: Product.objects.filter(available=True), 'product'),
+    'categories': (lambda: Category.objects.filter(is_active=True), 'category'),
+}
+
+
+def shard_name(section, shard):
+    return f'sitemap-{section}-{shard:05d}.xml.gz'
+
+
+def shard_states(section):
+    """``{shard: [url count, newest updated_at]}`` for a section, in one query."""
+    queryset, _ = SECTIONS[section]
+    shard_size = get_shard_size()
+    rows = (
+        queryset()
+        .annotate(shard=ExpressionWrapper(F('pk') / shard_size, output_field=IntegerField()))
+        .values('shard')
+        .annotate(count=Count('pk'), lastmod=Max('updated_at'))
+        .order_by('shard')
+    )
+    return {str(row['shard']): [row['count'], row['lastmod'].isoformat()] for row in rows}
+
+
+def write_shard(section, shard, chunk_size=5000):
+    queryset, page = SECTIONS[section]
+    shard_size = get_shard_size()
+    url_template = get_base_url() + get_url_template(page)
+    rows = (
+        queryset()
+        .filter(pk__gte=shard * shard_size, pk__lt=(shard + 1) * shard_size)
+        .order_by('pk')
+        .values_list('slug', 'updated_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    path = os.path.join(get_sitemap_root(), shard_name(section, shard))
+    with gzip.open(f'{path}.tmp', 'wt', encoding='utf-8') as out:
+        out.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n')
+        for slug, updated_at in rows:
+            loc = escape(url_template.replace('{slug}', slug))
+            out.write(f'<url><loc>{loc}</loc><lastmod>{updated_at.isoformat()}</lastmod></url>\n')
+        out.write('</urlset>\n')
+    os.replace(f'{path}.tmp', path)
+
+
+def write_index(shards):
+    path = os.path.join(get_sitemap_root(), 'sitemap.xml')
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as out:
+        out.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n')
+        for name, lastmod in shards:
+            loc = escape(get_base_url() + reverse('sitemap-shard', args=[name]))
+            out.write(f'<sitemap><loc>{loc}</loc><lastmod>{lastmod}</lastmod></sitemap>\n')
+        out.write('</sitemapindex>\n')
+    os.replace(f'{path}.tmp', path)
+
+
+def manifest_path():
+    return os.path.join(get_sitemap_root(), 'manifest.json')
+
+
+def build_sitemaps(full=False):
+    """Rewrite changed shards and the index; returns counts."""
+    root = get_sitemap_root()
+    os.makedirs(root, exist_ok=True)
+    try:
+        with open(manifest_path()) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if full or manifest.get('shard_size') != get_shard_size():
+        manifest = {'shard_size': get_shard_size(), 'sections': {}}
+
+    index = []
+    rewritten = 0
+    for section in SECTIONS:
+        states = shard_states(section)
+        previous = manifest['sections'].get(section, {})
+        for shard, state in sorted(states.items(), key=lambda item: int(item[0])):
+            name = shard_name(section, int(shard))
+            if previous.get(shard) != state or not os.path.exists(os.path.join(root, name)):
+                write_shard(section, int(shard))
+                rewritten += 1
+            index.append((name, state[1]))
+        for shard in set(previous) - set(states):
+            try:
+                os.remove(os.path.join(root, shard_name(section, int(shard))))
+            except FileNotFoundError:
+                pass
+        manifest['sections'][section] = states
+
+    write_index(index)
+    manifest['built_at'] = timezone.now().isoformat()
+    with open(f'{manifest_path()}.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(f'{manifest_path()}.tmp', manifest_path())
+    return {'shards': len(index), 'rewritten': rewritten}
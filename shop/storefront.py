@@ -0,0 +1,20 @@
+"""
+Public storefront URLs.
+
+Product and category pages are rendered by the storefront, not by this API,
+so sitemaps and partner feeds link to ``SHOP_PRODUCT_URL_TEMPLATE`` and
+``SHOP_CATEGORY_URL_TEMPLATE`` rather than to routes in the URLconf.
+"""
+
+from django.conf import settings
+
+
+DEFAULT_URL_TEMPLATES = {
+    'product': '/products/{slug}/',
+    'category': '/categories/{slug}/',
+}
+
+
+def get_url_template(kind):
+    """Path of a ``'product'`` or ``'category'`` page, with a ``{slug}`` placeholder."""
+    return getattr(settings, f'SHOP_{kind.upper()}_URL_TEMPLATE', DEFAULT_URL_TEMPLATES[kind])
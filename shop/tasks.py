@@ -0,0 +1,18 @@
+from taskqueue.queue import task
+
+from .models import Product
+from .rollups import record_new_order
+
+
+@task
+def record_order_rollups(order_id):
+    """Add a new order to the daily sales rollups; safe to run more than once."""
+    record_new_order(order_id)
+
+
+@task
+def make_product_thumbnail(product_id):
+    """Resize a product image after upload, see ``Product.make_thumbnail``."""
+    product = Product.objects.filter(pk=product_id).first()
+    if product is not None and product.image:
+        product.make_thumbnail()
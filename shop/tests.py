@@ -1,3 +1,1093 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import closing
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from xml.etree import ElementTree
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from taskqueue.models import Task
+from taskqueue.queue import claim_tasks, run_task
+from wembli.db_router import PrimaryPinningMiddleware, PrimaryReplicaRouter, is_pinned, lag_guard, unpin
+from wembli.renderers import FastJSONRenderer, JSONFragment
+from wembli.startup import ENTRYPOINTS, measure_startup, probe_database
+from wembli.write_queue import WriteCoordinator
+
+from .bulk import products_bulk_updated
+from .cards import rebuild_product_cards
+from .carts import recalculate_cart_totals
+from .facets import get_product_facets, parse_price_buckets
+from .feeds import build_product_feeds, feed_path
+from .filters import normalize_product_filters
+from .fragments import FragmentCache
+from .models import (
+    Cart, CartItem, Category, DailyCategorySales, DailyProductSales, Order, OrderItem, Product, ProductCard,
+    ProductRecommendation, Review, Wishlist,
+)
+from .order_events import order_event_bus, stream_order_events
+from .rankings import record_sale, recount_sales, refresh_trending_scores
+from .recommendations import CoPurchaseCounter, build_recommendations, top_items
+from .rollups import backfill_rollups, rebuild_day
+from .sitemaps import SITEMAP_NS, build_sitemaps, get_sitemap_root
+from .views import ProductListView, ProductsByCategory
+
+
+def create_catalog(count=6):
+    categories = [Category.objects.create(name=f'Category {i}', slug=f'category-{i}') for i in range(2)]
+    products = [
+        Product.objects.create(
+            name=f'Product {i}', slug=f'product-{i}', category=categories[i % 2],
+            price=Decimal(10 + i), stock=100
+        )
+        for i in range(count)
+    ]
+    return categories, products
+
+
+class StartupBudgetTest(SimpleTestCase):
+    """Cold starts stay within STARTUP_*_BUDGET_MS and leave heavy modules for first use."""
+
+    def test_entrypoints_within_budget(self):
+        with probe_database() as database_name:
+            results = [measure_startup(entrypoint, runs=3, database_name=database_name) for entrypoint in ENTRYPOINTS]
+        for result in results:
+            with self.subTest(entrypoint=result['entrypoint']):
+                # A real view, query and renderer, not an error page.
+                self.assertEqual(result['statuses'], [200])
+                self.assertEqual(result['loaded_at_import'], [])
+                self.assertLess(result['import_ms'], settings.STARTUP_IMPORT_BUDGET_MS)
+                self.assertLess(result['first_response_ms'], settings.STARTUP_FIRST_RESPONSE_BUDGET_MS)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_MAX_LAG_SECONDS=30)
+class ReplicaRoutingTest(SimpleTestCase):
+    """Catalog reads use the replica until the request writes or the replica falls behind."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.primary_name = os.path.join(tmpdir.name, 'primary.sqlite3')
+        self.replica_name = os.path.join(tmpdir.name, 'replica.sqlite3')
+        with closing(sqlite3.connect(self.primary_name)) as primary:
+            primary.execute('CREATE TABLE catalog (name TEXT)')
+            primary.execute("INSERT INTO catalog VALUES ('lamp')")
+            primary.commit()
+
+        # The live test connection keeps its own settings; only the router and
+        # sync_replicas see these file-backed ones.
+        databases = connections.configure_settings({
+            'default': {**connections.settings['default'], 'NAME': self.primary_name},
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': self.replica_name},
+        })
+        patcher = mock.patch.dict(connections.settings, databases)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        lag_guard._checked.clear()
+        self.addCleanup(lag_guard._checked.clear)
+        unpin()
+        self.addCleanup(unpin)
+        self.router = PrimaryReplicaRouter()
+
+    def sync(self):
+        call_command('sync_replicas', stdout=io.StringIO())
+        lag_guard._checked.clear()
+
+    def test_sync_replicas_copies_primary(self):
+        self.sync()
+        with closing(sqlite3.connect(self.replica_name)) as replica:
+            self.assertEqual(replica.execute('SELECT name FROM catalog').fetchall(), [('lamp',)])
+        self.assertTrue(os.path.exists(f'{self.replica_name}.sync'))
+
+    def test_reads_and_writes(self):
+        self.sync()
+        self.assertEqual(self.router.db_for_read(Product), 'replica')
+        self.assertEqual(Product.objects.all().db, 'replica')
+        # Not a catalog model: always the primary.
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertFalse(is_pinned())
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+
+    def test_card_listings_read_replica(self):
+        self.sync()
+        for view_class, kwargs in ((ProductListView, {}), (ProductsByCategory, {'category_slug': 'lamps'})):
+            view = view_class(kwargs=kwargs, format_kwarg=None)
+            view.request = view.initialize_request(RequestFactory().get('/api/products/'))
+            self.assertEqual(view.get_queryset().db, 'replica')
+        self.assertEqual(ProductRecommendation.objects.all().db, 'replica')
+
+    def test_pinned_to_primary_after_write(self):
+        self.sync()
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(Product))
+            self.router.db_for_write(Cart)
+            routed.append(self.router.db_for_read(Product))
+            return HttpResponse()
+
+        middleware = PrimaryPinningMiddleware(view)
+        middleware(None)
+        self.assertEqual(routed, ['replica', 'default'])
+        # The next request starts unpinned.
+        middleware(None)
+        self.assertEqual(routed[2:], ['replica', 'default'])
+        self.assertFalse(is_pinned())
+
+    def test_never_synced_replica_falls_back_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_stale_replica_falls_back_to_primary(self):
+        self.sync()
+        self.assertEqual(self.router.db_for_read(Product), 'replica')
+        later = time.time() + 60
+        os.utime(self.primary_name, (later, later))
+        lag_guard._checked.clear()
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+
+class RecordingCoordinator(WriteCoordinator):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def _next_batch(self):
+        batch = super()._next_batch()
+        self.batches.append(len(batch))
+        return batch
+
+
+class WriteCoordinatorTest(TestCase):
+    """Writes submitted from many threads commit in shared batches on one writer thread."""
+
+    def test_connection_pragmas(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+    def test_submit_inside_transaction_runs_inline(self):
+        coordinator = RecordingCoordinator()
+        self.assertEqual(coordinator.submit(threading.current_thread), threading.current_thread())
+        self.assertEqual(coordinator.batches, [])
+
+
+class ConcurrentWriteTest(TransactionTestCase):
+    # Outside a test transaction, so the writer thread can take the write lock.
+
+    def test_concurrent_submits_are_batched(self):
+        coordinator = RecordingCoordinator(max_wait=0.05)
+        barrier = threading.Barrier(8)
+        results, errors = {}, {}
+
+        def job(index):
+            if index == 3:
+                raise ValueError('job 3 failed')
+            return index, threading.current_thread().name
+
+        def submit(index):
+            barrier.wait()
+            try:
+                results[index] = coordinator.submit(job, index)
+            except ValueError as exc:
+                errors[index] = exc
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(sorted(results), [0, 1, 2, 4, 5, 6, 7])
+        self.assertEqual({name for _, name in results.values()}, {'sqlite-writer'})
+        # A failing job only fails its own caller.
+        self.assertEqual(list(errors), [3])
+        self.assertEqual(sum(coordinator.batches), 8)
+        self.assertLess(len(coordinator.batches), 8)
+
+
+class BatchTest(TestCase):
+    """POST /api/batch/ runs sub-requests in order and reports failures per item."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog()
+        self.user = User.objects.create_user('shopper', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *requests):
+        return self.client.post('/api/batch/', {'requests': list(requests)}, format='json')
+
+    def test_responses_in_request_order(self):
+        response = self.batch(
+            {'id': 'categories', 'path': '/api/categories/'},
+            {'id': 'add', 'method': 'POST', 'path': '/api/cart/add/',
+             'body': {'product_id': self.products[0].pk, 'quantity': 2}},
+            {'id': 'cart', 'path': '/api/cart/'},
+            {'id': 'missing', 'path': '/api/products/missing/'},
+        )
+        self.assertEqual(response.status_code, 200)
+        results = {item['id']: item for item in response.json()['responses']}
+        self.assertEqual(list(results), ['categories', 'add', 'cart', 'missing'])
+        self.assertEqual(results['categories']['status'], 200)
+        self.assertEqual(results['add']['status'], 201)
+        self.assertEqual(results['cart']['body']['total_items'], 2)
+        self.assertEqual(results['missing']['status'], 404)
+
+    def test_async_and_streaming_views_rejected_per_item(self):
+        response = self.batch(
+            {'id': 'events', 'path': '/api/orders/events/'},
+            {'id': 'feed', 'path': '/api/feeds/products.json.gz'},
+            {'id': 'admin', 'path': '/admin/'},
+            {'id': 'categories', 'path': '/api/categories/'},
+        )
+        self.assertEqual(response.status_code, 200)
+        statuses = [item['status'] for item in response.json()['responses']]
+        self.assertEqual(statuses, [400, 400, 400, 200])
+
+    def test_malformed_request_fails_whole_batch(self):
+        response = self.batch({'path': '/api/categories/'}, {'method': 'TRACE', 'path': '/api/cart/'})
+        self.assertEqual(response.status_code, 400)
+
+
+ORDER_ADDRESS = {
+    'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com', 'phone': '555',
+    'address': '1 Main St', 'city': 'London', 'postal_code': 'N1', 'country': 'UK',
+}
+
+
+@override_settings(TASKQUEUE_EAGER=True)
+class SalesRollupTest(TestCase):
+    """Checkouts and status changes keep the daily rollups in step with the orders."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog()
+        self.user = User.objects.create_user('admin', password='secret', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, *lines):
+        for product, quantity in lines:
+            self.client.post('/api/cart/add/', {'product_id': product.pk, 'quantity': quantity}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/create/', ORDER_ADDRESS, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(order_id=response.json()['order_id'])
+
+    def report(self, **params):
+        response = self.client.get('/api/reports/sales/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def run_rollup_task(self, order):
+        task = Task.objects.get(idempotency_key=f'order-rollups:{order.pk}')
+        Task.objects.filter(pk=task.pk).update(status=Task.QUEUED, run_at=timezone.now())
+        self.assertEqual(claim_tasks('test-worker'), [task.pk])
+        self.assertEqual(run_task(task.pk), Task.DONE)
+
+    def test_checkout_recorded(self):
+        first, second, third = self.products[:3]
+        self.checkout((first, 2), (second, 1), (third, 1))
+        self.checkout((first, 1))
+        report = self.report()
+        self.assertEqual(report['totals']['orders'], 2)
+        self.assertEqual(report['totals']['units'], 5)
+        self.assertEqual(Decimal(report['totals']['revenue']), 3 * first.price + second.price + third.price)
+        by_product = {row['product_id']: row for row in report['by_product']}
+        self.assertEqual(by_product[first.pk]['units'], 3)
+        self.assertEqual(by_product[first.pk]['orders'], 2)
+
+    def test_status_change_moves_order(self):
+        order = self.checkout((self.products[0], 1))
+        order.status = 'shipped'
+        order.save()
+        by_status = {row['status']: row['orders'] for row in self.report()['by_status']}
+        self.assertEqual(by_status, {'pending': 0, 'shipped': 1})
+
+    def test_backfill_matches_incremental_rollups(self):
+        self.checkout((self.products[0], 2), (self.products[1], 1))
+        order = self.checkout((self.products[2], 4))
+        order.status = 'confirmed'
+        order.save()
+        expected = self.report()
+        today = timezone.localdate()
+        self.assertEqual(backfill_rollups(today, today), 1)
+        self.assertEqual(self.report(), expected)
+        # Rebuilding again replaces the rows rather than adding to them.
+        backfill_rollups(today - timedelta(days=1), today)
+        self.assertEqual(self.report(), expected)
+
+    @override_settings(TASKQUEUE_EAGER=False)
+    def test_backfill_then_worker_counts_once(self):
+        order = self.checkout((self.products[0], 2))
+        # Nothing is counted until the worker runs, units and orders alike.
+        totals = self.report()['totals']
+        self.assertEqual((totals['orders'], totals['units']), (0, 0))
+        today = timezone.localdate()
+        backfill_rollups(today, today)
+        self.run_rollup_task(order)
+        # A retry, e.g. after release_stale_locks, adds nothing either.
+        self.run_rollup_task(order)
+        totals = self.report()['totals']
+        self.assertEqual((totals['orders'], totals['units']), (1, 2))
+
+    @override_settings(TASKQUEUE_EAGER=False)
+    def test_status_changed_before_worker(self):
+        order = self.checkout((self.products[0], 1))
+        order.status = 'shipped'
+        order.save()
+        self.run_rollup_task(order)
+        by_status = {row['status']: row['orders'] for row in self.report()['by_status']}
+        self.assertEqual(by_status, {'shipped': 1})
+
+    def test_rebuild_day_replaces_drifted_rows(self):
+        self.checkout((self.products[0], 1))
+        today = timezone.localdate()
+        DailyProductSales.objects.filter(date=today).update(units=99)
+        DailyCategorySales.objects.create(date=today, category=self.categories[1], units=7, revenue=70, orders=1)
+        rebuild_day(today)
+        self.assertEqual(list(DailyProductSales.objects.values_list('units', flat=True)), [1])
+        self.assertFalse(DailyCategorySales.objects.filter(category=self.categories[1]).exists())
+
+    def test_invalid_dates(self):
+        for params in ({'start': '2024-13-45'}, {'end': '2024-02-30'}, {'start': '2024-02-02', 'end': '2024-02-01'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/reports/sales/', params)
+                self.assertEqual(response.status_code, 400)
+
+
+class OrderEventsTest(TestCase):
+    """Order status changes are logged and replayed or streamed to their owner as SSE."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', password='secret')
+        self.order = Order.objects.create(user=self.user, total_amount=1, **ORDER_ADDRESS)
+        self.order.status = 'confirmed'
+        self.order.save()
+        self.client.force_login(self.user)
+
+    def events(self, body):
+        return [
+            json.loads(line[len('data: '):])
+            for line in body.splitlines() if line.startswith('data: ')
+        ]
+
+    def test_replay_since_last_event_id(self):
+        response = self.client.get('/api/orders/events/', HTTP_LAST_EVENT_ID='0')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = self.events(response.content.decode())
+        self.assertEqual([(e['previous_status'], e['status']) for e in events],
+                         [(None, 'pending'), ('pending', 'confirmed')])
+        self.assertEqual(events[0]['order_id'], str(self.order.order_id))
+
+        first_id = self.order.status_changes.order_by('id').first().pk
+        response = self.client.get('/api/orders/events/', {'last_event_id': first_id})
+        self.assertEqual([e['status'] for e in self.events(response.content.decode())], ['confirmed'])
+        response = self.client.get('/api/orders/events/', {'last_event_id': 0, 'order': str(uuid.uuid4())})
+        self.assertEqual(self.events(response.content.decode()), [])
+        self.assertEqual(self.client.get('/api/orders/events/', {'last_event_id': 'x'}).status_code, 400)
+
+    def test_other_users_events_not_replayed(self):
+        other = User.objects.create_user('other')
+        Order.objects.create(user=other, total_amount=1, **ORDER_ADDRESS)
+        response = self.client.get('/api/orders/events/', HTTP_LAST_EVENT_ID='0')
+        self.assertEqual(len(self.events(response.content.decode())), 2)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/orders/events/').status_code, 403)
+
+    @override_settings(SHOP_ORDER_FEED_HEARTBEAT_SECONDS=0.01, SHOP_ORDER_FEED_POLL_SECONDS=0.01)
+    def test_stream(self):
+        changes = list(self.order.status_changes.order_by('id'))
+
+        async def read():
+            stream = stream_order_events(self.user.pk, last_event_id=changes[0].pk)
+            chunks = [await anext(stream), await anext(stream)]
+            # A live event already sent from the backlog is skipped.
+            event = {'id': changes[1].pk, 'user_id': self.user.pk, 'status': 'confirmed'}
+            order_event_bus.publish(event)
+            order_event_bus.publish({**event, 'id': changes[1].pk + 1, 'status': 'shipped'})
+            chunks += [await anext(stream), await anext(stream)]
+            await stream.aclose()
+            # Let the poller notice the stream is gone.
+            await asyncio.sleep(0.05)
+            return chunks
+
+        retry, backlog, live, heartbeat = async_to_sync(read)()
+        self.assertTrue(retry.startswith('retry: '))
+        self.assertEqual(self.events(backlog)[0]['status'], 'confirmed')
+        self.assertTrue(live.startswith(f'id: {changes[1].pk + 1}\n'))
+        self.assertEqual(self.events(live)[0]['status'], 'shipped')
+        self.assertEqual(heartbeat, ': keepalive\n\n')
+
+
+class CartTest(TestCase):
+    """Cart mutations maintain the counters and version, and honour If-Match / If-None-Match."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog()
+        self.user = User.objects.create_user('shopper', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, product, quantity=1, **headers):
+        return self.client.post(
+            '/api/cart/add/', {'product_id': product.pk, 'quantity': quantity}, format='json', headers=headers
+        )
+
+    def summary(self):
+        return self.client.get('/api/cart/summary/').json()
+
+    def test_counters_follow_mutations(self):
+        first, second = self.products[:2]
+        self.add(first, 2)
+        self.add(second, 1)
+        self.add(first, 1)
+        self.assertEqual(self.summary(), {
+            'version': 3, 'item_count': 4, 'line_count': 2, 'subtotal': f'{3 * first.price + second.price:.2f}',
+        })
+
+        item = CartItem.objects.get(cart__user=self.user, product=first)
+        self.client.put(f'/api/cart/items/{item.pk}/update/', {'quantity': 1}, format='json')
+        self.assertEqual(self.summary()['item_count'], 2)
+        self.client.delete(f'/api/cart/items/{item.pk}/remove/')
+        self.assertEqual(self.summary(), {
+            'version': 5, 'item_count': 1, 'line_count': 1, 'subtotal': f'{second.price:.2f}',
+        })
+        self.client.delete('/api/cart/clear/')
+        self.assertEqual(self.summary(), {'version': 6, 'item_count': 0, 'line_count': 0, 'subtotal': '0.00'})
+
+    def test_recalculate_matches_counters(self):
+        self.add(self.products[0], 2)
+        self.add(self.products[1], 3)
+        before = self.summary()
+        Product.objects.filter(pk=self.products[0].pk).update(price=Decimal('1.00'))
+        recalculate_cart_totals()
+        after = self.summary()
+        self.assertEqual(after['version'], before['version'] + 1)
+        self.assertEqual(after['subtotal'], f'{2 + 3 * self.products[1].price:.2f}')
+
+    def test_etag_and_not_modified(self):
+        response = self.add(self.products[0])
+        etag = response['ETag']
+        self.assertEqual(etag, '"1"')
+        self.assertEqual(self.client.get('/api/cart/', headers={'if-none-match': etag}).status_code, 304)
+        self.add(self.products[1])
+        response = self.client.get('/api/cart/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"2"')
+
+    def test_if_match(self):
+        etag = self.add(self.products[0])['ETag']
+        self.assertEqual(self.add(self.products[1], **{'if-match': etag}).status_code, 201)
+        # The cart moved on: the old ETag is stale.
+        response = self.add(self.products[2], **{'if-match': etag})
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(response.json()['line_count'], 2)
+        self.assertEqual(self.add(self.products[2], **{'if-match': '*'}).status_code, 201)
+
+    def test_unparseable_if_match_fails(self):
+        self.add(self.products[0])
+        for if_match in ('"cart-0"', 'W/"1"', 'garbage'):
+            with self.subTest(if_match=if_match):
+                self.assertEqual(self.add(self.products[1], **{'if-match': if_match}).status_code, 412)
+        self.assertEqual(self.summary()['line_count'], 1)
+
+    def test_version_field(self):
+        self.add(self.products[0])
+        response = self.client.delete('/api/cart/clear/', {'version': 0}, format='json')
+        self.assertEqual(response.status_code, 412)
+        response = self.client.delete('/api/cart/clear/', {'version': 'one'}, format='json')
+        self.assertEqual(response.status_code, 412)
+        response = self.client.delete('/api/cart/clear/', {'version': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_delta_response(self):
+        self.add(self.products[0])
+        response = self.client.post(
+            '/api/cart/add/?delta=1', {'product_id': self.products[1].pk, 'quantity': 2}, format='json'
+        )
+        data = response.json()
+        self.assertEqual(data['version'], 2)
+        self.assertEqual(data['item_count'], 3)
+        self.assertEqual([item['product'] for item in data['items']], [self.products[1].pk])
+        self.assertEqual(data['removed'], [])
+
+        item = CartItem.objects.get(cart__user=self.user, product=self.products[0])
+        data = self.client.delete(f'/api/cart/items/{item.pk}/remove/?delta=1').json()
+        self.assertEqual(data['removed'], [item.pk])
+        self.assertEqual(data['items'], [])
+        self.assertEqual(data['line_count'], 1)
+
+
+@override_settings(SHOP_BULK_BATCH_SIZE=2)
+class BulkUpdateTest(TestCase):
+    """Bulk product changes run in batches, bump updated_at and signal once per batch."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.sent = []
+        products_bulk_updated.connect(self.receiver)
+        self.addCleanup(products_bulk_updated.disconnect, self.receiver)
+
+    def receiver(self, sender, product_ids, fields, **kwargs):
+        self.sent.append((list(product_ids), set(fields)))
+
+    def bulk(self, data):
+        return self.client.post('/api/products/bulk/', data, format='json')
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user('shopper', password='secret'))
+        self.assertEqual(self.bulk({'ids': [self.products[0].pk], 'set': {'stock': 1}}).status_code, 403)
+
+    def test_update_by_filter(self):
+        before = Product.objects.get(pk=self.products[0].pk).updated_at
+        response = self.bulk({'filter': {'category': 'category-0'}, 'set': {'price_percent': -10, 'stock': 5}})
+        self.assertEqual(response.json(), {'matched': 3, 'updated': 3, 'batches': 2})
+        # Three products in batches of two: one signal per batch.
+        self.assertEqual([ids for ids, fields in self.sent], [
+            [self.products[0].pk, self.products[2].pk], [self.products[4].pk],
+        ])
+        self.assertEqual(self.sent[0][1], {'price', 'stock'})
+        product = Product.objects.get(pk=self.products[0].pk)
+        self.assertEqual(product.price, (self.products[0].price * Decimal('0.9')).quantize(Decimal('0.01')))
+        self.assertEqual(product.stock, 5)
+        self.assertGreater(product.updated_at, before)
+        self.assertEqual(ProductCard.objects.get(pk=product.pk).price, product.price)
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).stock, 100)
+
+    def test_price_change_updates_carts(self):
+        shopper = User.objects.create_user('shopper', password='secret')
+        client = APIClient()
+        client.force_authenticate(shopper)
+        client.post('/api/cart/add/', {'product_id': self.products[0].pk, 'quantity': 2}, format='json')
+        self.bulk({'ids': [self.products[0].pk], 'set': {'price': '1.50'}})
+        self.assertEqual(client.get('/api/cart/summary/').json()['subtotal'], '3.00')
+
+    def test_set_prices(self):
+        before = Product.objects.get(pk=self.products[1].pk).updated_at
+        response = self.bulk({'prices': {str(self.products[1].pk): '7.25', str(self.products[2].pk): 3}})
+        self.assertEqual(response.json(), {'matched': 2, 'updated': 2, 'batches': 1})
+        self.assertEqual(len(self.sent), 1)
+        product = Product.objects.get(pk=self.products[1].pk)
+        self.assertEqual(product.price, Decimal('7.25'))
+        self.assertGreater(product.updated_at, before)
+
+    def test_dry_run(self):
+        response = self.bulk({'ids': [p.pk for p in self.products[:3]], 'set': {'available': False}, 'dry_run': True})
+        self.assertEqual(response.json(), {'matched': 3, 'updated': 0, 'batches': 0})
+        self.assertEqual(self.sent, [])
+        self.assertEqual(Product.objects.filter(available=False).count(), 0)
+
+    def test_invalid_requests(self):
+        pk = self.products[0].pk
+        for data in (
+            {'ids': pk, 'set': {'stock': 1}},
+            {'ids': ['a'], 'set': {'stock': 1}},
+            {'filter': ['category-0'], 'set': {'stock': 1}},
+            {'filter': {'categroy': 'category-0'}, 'set': {'stock': 1}},
+            {'filter': {'category': ['category-0']}, 'set': {'stock': 1}},
+            {'ids': [pk], 'set': {'colour': 'red'}},
+            {'ids': [pk], 'set': {'price_percent': -150}},
+            {'set': {'stock': 1}},
+            {'prices': [pk]},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.bulk(data).status_code, 400)
+        self.assertEqual(self.sent, [])
+
+
+class RankingTest(TestCase):
+    """?ordering=bestselling/trending rank by maintained counters with a stable tiebreaker."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog()
+        self.user = User.objects.create_user('shopper', password='secret')
+        self.client = APIClient()
+
+    def order(self, product, quantity, hours_ago=0, status='pending'):
+        order = Order.objects.create(user=self.user, total_amount=product.price * quantity, status=status,
+                                     **ORDER_ADDRESS)
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(hours=hours_ago))
+        return order
+
+    def ranked(self, ordering, **params):
+        response = self.client.get('/api/products/', {'ordering': ordering, **params})
+        return [row['id'] for row in response.json()['results']]
+
+    def test_bestselling(self):
+        first, second = self.products[:2]
+        record_sale(second.pk, 5)
+        record_sale(first.pk, 2)
+        self.assertEqual(Product.objects.get(pk=second.pk).stock, 95)
+        others = sorted((p.pk for p in self.products[2:]), reverse=True)
+        self.assertEqual(self.ranked('bestselling'), [second.pk, first.pk, *others])
+
+    def test_ties_paginate_without_overlap(self):
+        pages = [self.ranked(ordering, page=page, page_size=2) for ordering in ('bestselling', 'trending')
+                 for page in (1, 2, 3)]
+        for ordering_pages in (pages[:3], pages[3:]):
+            ids = [pk for page in ordering_pages for pk in page]
+            self.assertEqual(ids, sorted((p.pk for p in self.products), reverse=True))
+
+    def test_trending_decays_with_age(self):
+        recent, old, cancelled = self.products[:3]
+        self.order(recent, 1, hours_ago=1)
+        self.order(old, 3, hours_ago=24 * 30)
+        self.order(old, 1, hours_ago=24 * 7)
+        self.order(cancelled, 10, hours_ago=1, status='cancelled')
+        self.assertEqual(refresh_trending_scores(), 2)
+        self.assertEqual(self.ranked('trending')[:2], [recent.pk, old.pk])
+        self.assertEqual(Product.objects.get(pk=cancelled.pk).trending_score, 0)
+
+    def test_recount_sales(self):
+        self.order(self.products[3], 4)
+        self.order(self.products[3], 1)
+        record_sale(self.products[0].pk, 9)  # not backed by an order: dropped by the recount
+        recount_sales()
+        counts = dict(ProductCard.objects.filter(sales_count__gt=0).values_list('pk', 'sales_count'))
+        self.assertEqual(counts, {self.products[3].pk: 5})
+
+
+class WishlistTest(TestCase):
+    """The wishlist pages by cursor, newest first, and answers batch status lookups."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog(count=8)
+        self.user = User.objects.create_user('shopper', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pages_with_equal_timestamps(self):
+        items = [Wishlist.objects.create(user=self.user, product=product) for product in self.products]
+        # Several items added in the same instant.
+        Wishlist.objects.filter(pk__in=[item.pk for item in items[2:6]]).update(created_at=items[2].created_at)
+        seen = []
+        url = '/api/wishlist/?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        expected = Wishlist.objects.filter(user=self.user).order_by('-created_at', '-id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
+
+    def test_status(self):
+        Wishlist.objects.create(user=self.user, product=self.products[1])
+        ids = [self.products[0].pk, self.products[1].pk]
+        response = self.client.get('/api/wishlist/status/', {'product_ids': ','.join(map(str, ids))})
+        self.assertEqual(response.json()['wishlisted'], [self.products[1].pk])
+        response = self.client.post('/api/wishlist/status/', {'product_ids': ids}, format='json')
+        self.assertEqual(response.json()['status'], {str(ids[0]): False, str(ids[1]): True})
+        response = self.client.post('/api/wishlist/status/', {'product_ids': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductCardTest(TestCase):
+    """Cards follow every write to their product, category and reviews."""
+
+    def setUp(self):
+        cache.clear()
+        self.categories, self.products = create_catalog(2)
+        self.product = self.products[0]
+        self.client = APIClient()
+
+    def card(self):
+        return ProductCard.objects.get(product=self.product)
+
+    def test_follows_product(self):
+        self.assertEqual((self.card().name, self.card().category_slug), ('Product 0', 'category-0'))
+        self.product.price = Decimal('7.50')
+        self.product.category = self.categories[1]
+        self.product.save()
+        card = self.card()
+        self.assertEqual((card.price, card.category_slug), (Decimal('7.50'), 'category-1'))
+        self.product.delete()
+        self.assertFalse(ProductCard.objects.filter(product_id=self.products[0].pk).exists())
+
+    def test_follows_category(self):
+        category = self.categories[0]
+        category.name, category.slug = 'Lamps', 'lamps'
+        category.save()
+        self.assertEqual((self.card().category_name, self.card().category_slug), ('Lamps', 'lamps'))
+
+    def test_follows_reviews(self):
+        users = [User.objects.create_user(f'reviewer-{i}') for i in range(2)]
+        Review.objects.create(product=self.product, user=users[0], rating=5, comment='')
+        review = Review.objects.create(product=self.product, user=users[1], rating=2, comment='')
+        self.assertEqual((self.card().average_rating, self.card().reviews_count), (3.5, 2))
+        review.delete()
+        self.assertEqual((self.card().average_rating, self.card().reviews_count), (5, 1))
+
+    def test_listing_reads_cards(self):
+        Product.objects.filter(pk=self.product.pk).update(name='Renamed')
+        names = {row['name'] for row in self.client.get('/api/products/').json()['results']}
+        self.assertEqual(names, {'Product 0', 'Product 1'})
+        self.assertEqual(rebuild_product_cards(), (2, 0))
+        names = {row['name'] for row in self.client.get('/api/products/').json()['results']}
+        self.assertEqual(names, {'Renamed', 'Product 1'})
+
+
+class FragmentCacheTest(SimpleTestCase):
+    """Card fragments live in a byte-bounded LRU, optionally shared through a cache alias."""
+
+    def test_lru_eviction(self):
+        fragments = FragmentCache(max_bytes=10)
+        fragments.set_many({'a': b'aaaa', 'b': b'bbbb'})
+        fragments.get_many(['a'])
+        fragments.set_many({'c': b'cccc', 'big': b'x' * 11})
+        self.assertEqual(fragments.get_many(['a', 'b', 'c', 'big']), {'a': b'aaaa', 'c': b'cccc'})
+        stats = fragments.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (3, 2, 1))
+        self.assertEqual((stats['entries'], stats['bytes']), (2, 8))
+
+    def test_shared_tier(self):
+        cache.clear()
+        FragmentCache(shared_alias='default').set_many({'a': b'card'})
+        other = FragmentCache(shared_alias='default')
+        self.assertEqual(other.get_many(['a']), {'a': b'card'})
+        self.assertEqual(other.get_many(['a']), {'a': b'card'})
+        stats = other.stats()
+        self.assertEqual((stats['shared_hits'], stats['hits']), (1, 1))
+
+
+class FragmentListingTest(TestCase):
+    """Product listings reuse cached card fragments until the card changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.categories, self.products = create_catalog(3)
+        self.fragments = FragmentCache()
+        patcher = mock.patch('shop.serializers.get_fragment_cache', return_value=self.fragments)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def prices(self, **params):
+        results = self.client.get('/api/products/', params).json()['results']
+        return {row['id']: row['price'] for row in results}
+
+    def test_reused_until_card_changes(self):
+        first = self.prices()
+        self.assertEqual(self.fragments.stats()['misses'], 3)
+        self.assertEqual(self.prices(), first)
+        self.assertEqual(self.fragments.stats()['hits'], 3)
+
+        product = self.products[0]
+        product.price = Decimal('99.00')
+        product.save()
+        self.assertEqual(self.prices()[product.pk], '99.00')
+        stats = self.fragments.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (5, 4))
+
+    def test_sparse_fields_bypass_cache(self):
+        self.client.get('/api/products/', {'fields': 'id,name'})
+        self.assertEqual(self.fragments.stats()['entries'], 0)
+
+
+class ProductFeedTest(TestCase):
+    """Partner feeds are rebuilt segment by segment and served from disk."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = self.settings(
+            SHOP_FEED_ROOT=tmp.name, SHOP_FEED_SEGMENT_SIZE=2, SHOP_FEED_BASE_URL='https://shop.example/',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.categories, self.products = create_catalog()
+        Product.objects.filter(pk=self.products[5].pk).update(available=False)
+        self.available = [product.pk for product in self.products[:5]]
+        self.segments = len({pk // 2 for pk in self.available})
+
+    def read(self, feed_format):
+        with open(feed_path(feed_format), 'rb') as f:
+            return gzip.decompress(f.read()).decode()
+
+    def test_formats(self):
+        result = build_product_feeds()
+        self.assertEqual(result, {'segments': self.segments, 'rewritten': self.segments, 'products_written': 5})
+
+        items = [json.loads(line) for line in self.read('ndjson').splitlines()]
+        self.assertEqual([item['id'] for item in items], self.available)
+        self.assertEqual(items[0]['link'], f'https://shop.example/products/{self.products[0].slug}/')
+        self.assertEqual((items[0]['price'], items[0]['availability']), ('10.00', 'in stock'))
+
+        rows = list(csv.DictReader(io.StringIO(self.read('csv'))))
+        self.assertEqual([int(row['id']) for row in rows], self.available)
+        root = ElementTree.fromstring(self.read('xml'))
+        self.assertEqual([int(product.find('id').text) for product in root], self.available)
+
+    def test_incremental(self):
+        build_product_feeds()
+        self.assertEqual(build_product_feeds()['rewritten'], 0)
+
+        product = self.products[2]
+        product.name = 'Renamed'
+        product.save()
+        result = build_product_feeds(formats=['ndjson'])
+        self.assertEqual(result['rewritten'], 1)
+        self.assertLessEqual(result['products_written'], 2)
+        titles = [json.loads(line)['title'] for line in self.read('ndjson').splitlines()]
+        self.assertIn('Renamed', titles)
+        # The other formats are still stale.
+        self.assertEqual(build_product_feeds()['rewritten'], 1)
+
+        Product.objects.get(pk=self.products[0].pk).delete()
+        build_product_feeds()
+        ids = [json.loads(line)['id'] for line in self.read('ndjson').splitlines()]
+        self.assertEqual(ids, self.available[1:])
+        self.assertEqual(build_product_feeds(full=True)['rewritten'], len({pk // 2 for pk in ids}))
+
+    def test_served_without_database(self):
+        self.assertEqual(self.client.get('/api/feeds/products.ndjson.gz').status_code, 404)
+        build_product_feeds()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/feeds/products.ndjson.gz')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(len(gzip.decompress(body).splitlines()), 5)
+        self.assertEqual(self.client.get('/api/feeds/products.json.gz').status_code, 404)
+
+
+class SitemapTest(TestCase):
+    """Sitemaps list storefront pages in gzipped shards rebuilt only when they change."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = self.settings(
+            SHOP_SITEMAP_ROOT=tmp.name, SHOP_SITEMAP_SHARD_SIZE=2, SHOP_SITEMAP_BASE_URL='https://shop.example/',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.categories, self.products = create_catalog()
+        Product.objects.filter(pk=self.products[5].pk).update(available=False)
+        Category.objects.filter(pk=self.categories[1].pk).update(is_active=False)
+        self.shards = len({p.pk // 2 for p in self.products[:5]}) + 1
+
+    def locs(self):
+        locs = []
+        for name in sorted(os.listdir(get_sitemap_root())):
+            if name.endswith('.xml.gz'):
+                with gzip.open(os.path.join(get_sitemap_root(), name)) as f:
+                    locs += [loc.text for loc in ElementTree.parse(f).iter(f'{{{SITEMAP_NS}}}loc')]
+        return locs
+
+    def test_storefront_urls(self):
+        self.assertEqual(build_sitemaps(), {'shards': self.shards, 'rewritten': self.shards})
+        locs = self.locs()
+        self.assertIn('https://shop.example/categories/category-0/', locs)
+        self.assertNotIn('https://shop.example/categories/category-1/', locs)
+        self.assertIn(f'https://shop.example/products/{self.products[0].slug}/', locs)
+        self.assertNotIn(f'https://shop.example/products/{self.products[5].slug}/', locs)
+        self.assertEqual(len(locs), 6)
+
+        with open(os.path.join(get_sitemap_root(), 'sitemap.xml')) as f:
+            index = [loc.text for loc in ElementTree.parse(f).iter(f'{{{SITEMAP_NS}}}loc')]
+        self.assertEqual(len(index), self.shards)
+        self.assertTrue(all(loc.startswith('https://shop.example/sitemaps/sitemap-') for loc in index))
+
+    @override_settings(SHOP_PRODUCT_URL_TEMPLATE='/p/{slug}')
+    def test_url_template(self):
+        build_sitemaps()
+        self.assertIn(f'https://shop.example/p/{self.products[0].slug}', self.locs())
+
+    def test_incremental(self):
+        build_sitemaps()
+        self.assertEqual(build_sitemaps()['rewritten'], 0)
+        product = self.products[2]
+        product.name = 'Renamed'
+        product.save()
+        self.assertEqual(build_sitemaps()['rewritten'], 1)
+        # A shard left empty is removed rather than rewritten.
+        deleted = self.products[0]
+        shard_kept = any(p.pk // 2 == deleted.pk // 2 for p in self.products[1:5])
+        Product.objects.get(pk=deleted.pk).delete()
+        self.assertEqual(build_sitemaps()['rewritten'], int(shard_kept))
+        self.assertNotIn(f'https://shop.example/products/{deleted.slug}/', self.locs())
+        self.assertEqual(len(self.locs()), 5)
+        self.assertEqual(build_sitemaps(full=True)['rewritten'], build_sitemaps()['shards'])
+
+    def test_served_without_database(self):
+        build_sitemaps()
+        with self.assertNumQueries(0):
+            index = self.client.get('/sitemap.xml')
+            shard = self.client.get('/sitemaps/sitemap-products-00000.xml.gz')
+        self.assertEqual((index.status_code, shard.status_code), (200, 200))
+        self.assertEqual(shard['Content-Encoding'], 'gzip')
+        self.assertEqual(self.client.get('/sitemaps/manifest.json').status_code, 404)
+
+
+class FacetTest(TestCase):
+    """Facet counts are cached per normalized filter set until the catalog changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.categories, self.products = create_catalog()
+        self.client = APIClient()
+
+    def facets(self, **params):
+        response = self.client.get('/api/products/', {'facets': 'category,price', **params})
+        return response.json()['facets']
+
+    def test_counts(self):
+        facets = self.facets(category='category-0', price_buckets='0,12')
+        # The category facet ignores the category filter itself.
+        self.assertEqual([(row['slug'], row['count']) for row in facets['category']],
+                         [('category-0', 3), ('category-1', 3)])
+        self.assertEqual([row['count'] for row in facets['price']], [1, 2])
+
+    def test_equivalent_filters_share_cache_entry(self):
+        filters = normalize_product_filters({'min_price': '12', 'featured': 'false'})
+        boundaries = parse_price_buckets('0,12')
+        queryset = Product.objects.filter(available=True)
+        with self.assertNumQueries(2):
+            first = get_product_facets(queryset, filters, ['category', 'price'], boundaries)
+        with self.assertNumQueries(0):
+            second = get_product_facets(
+                queryset, normalize_product_filters({'min_price': '12.00'}), ['category', 'price'], boundaries
+            )
+        self.assertEqual(first, second)
+
+    def test_invalidated_by_product_changes(self):
+        self.assertEqual(self.facets()['category'][1]['count'], 3)
+        product = self.products[0]
+        product.category = self.categories[1]
+        product.save()
+        self.assertEqual(self.facets()['category'][1]['count'], 4)
+        Product.objects.get(pk=self.products[1].pk).delete()
+        self.assertEqual(self.facets()['category'][1]['count'], 3)
+
+
+class RecommendationTest(TestCase):
+    """Frequently-bought-together pairs are precomputed from orders, in full or incrementally."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog()
+        self.user = User.objects.create_user('shopper', password='secret')
+        self.client = APIClient()
+
+    def order(self, *indexes):
+        order = Order.objects.create(user=self.user, total_amount=1, **ORDER_ADDRESS)
+        for index in indexes:
+            OrderItem.objects.create(order=order, product=self.products[index], quantity=1, price=1)
+
+    def scores(self, index):
+        rows = ProductRecommendation.objects.filter(product=self.products[index]).order_by('-score', 'recommended_id')
+        return [(row.recommended_id, row.score) for row in rows]
+
+    def test_ranked_by_copurchases(self):
+        self.order(0, 1, 2)
+        self.order(0, 1)
+        self.order(0, 3)
+        build_recommendations()
+        p = self.products
+        self.assertEqual(self.scores(0), [(p[1].pk, 2), (p[2].pk, 1), (p[3].pk, 1)])
+        response = self.client.get(f'/api/products/{p[0].slug}/recommendations/', {'limit': 2})
+        self.assertEqual([row['id'] for row in response.json()], [p[1].pk, p[2].pk])
+
+    def test_incremental_matches_full_rebuild(self):
+        self.order(0, 1, 2)
+        self.order(0, 3)
+        build_recommendations()
+        self.order(0, 3)
+        self.order(0, 3)
+        self.order(4, 5)
+        run = build_recommendations(incremental=True)
+        self.assertEqual(run.orders_processed, 3)
+        incremental = [self.scores(index) for index in range(6)]
+        build_recommendations()
+        self.assertEqual([self.scores(index) for index in range(6)], incremental)
+        self.assertEqual(self.scores(0)[0], (self.products[3].pk, 3))
+
+    def test_counter_keeps_frequent_pairs(self):
+        counter = CoPurchaseCounter(top_k=2)
+        for _ in range(5):
+            counter.add_basket({1, 2})
+        for other in range(100, 140):
+            counter.add_basket({1, other})
+        self.assertLessEqual(len(counter.counts[1]), counter.prune_at)
+        self.assertEqual(top_items(counter.counts[1], 1), [(2, 5)])
+
+
+class SparseFieldsTest(TestCase):
+    """?fields= / ?exclude= trim both the response and the query behind it."""
+
+    def setUp(self):
+        self.categories, self.products = create_catalog()
+        self.url = f'/api/products/{self.products[0].slug}/'
+        self.client = APIClient()
+
+    def test_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,name,price'})
+        self.assertEqual(set(response.json()), {'id', 'name', 'price'})
+        product_query = next(q['sql'] for q in queries if 'FROM "shop_product"' in q['sql'])
+        self.assertNotIn('"description"', product_query)
+        self.assertFalse(any('shop_review' in q['sql'] for q in queries))
+
+    def test_exclude(self):
+        data = self.client.get(self.url, {'exclude': 'description,additional_images'}).json()
+        self.assertNotIn('description', data)
+        self.assertNotIn('additional_images', data)
+        self.assertEqual(data['category_name'], 'Category 0')
+
+    def test_related_field_joined(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url, {'fields': 'id,category_name'}).json()
+        self.assertEqual(data, {'id': self.products[0].pk, 'category_name': 'Category 0'})
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    """FastJSONRenderer's output matches DRF's JSONRenderer byte for byte."""
+
+    data = {
+        'created_at': datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=dt_timezone.utc),
+        'naive': datetime(2024, 5, 1, 12, 30),
+        'day': date(2024, 5, 1),
+        'price': Decimal('12.50'),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'text': 'line\u2028separator \u00e9',
+        'counts': {1: 2},
+        'items': [None, True, 1.5],
+    }
+
+    def test_matches_json_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_fragments_spliced(self):
+        data = {'cards': [JSONFragment(b'{"id":1}'), JSONFragment(b'{"id":2}')], 'count': 2}
+        self.assertEqual(FastJSONRenderer().render(data), b'{"cards":[{"id":1},{"id":2}],"count":2}')
+
+    def test_indent_falls_back(self):
+        rendered = FastJSONRenderer().render({'a': JSONFragment(b'[1]')}, 'application/json; indent=2')
+        self.assertEqual(rendered, b'{\n  "a": [\n    1\n  ]\n}')
 
-# Create your tests here.
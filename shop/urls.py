@@ -12,10 +12,13 @@ urlpatterns = [
     
     # Product URLs
     path('products/', views.ProductListView.as_view(), name='product-list'),
+    path('products/bulk/', views.bulk_update_products_view, name='product-bulk-update'),
     path('products/<slug:slug>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('products/<slug:slug>/recommendations/', views.ProductRecommendationsView.as_view(), name='product-recommendations'),
     
     # Cart URLs
     path('cart/', views.cart_detail, name='cart-detail'),
+    path('cart/summary/', views.cart_summary, name='cart-summary'),
     path('cart/add/', views.add_to_cart, name='add-to-cart'),
     path('cart/items/<int:item_id>/update/', views.update_cart_item, name='update-cart-item'),
     path('cart/items/<int:item_id>/remove/', views.remove_from_cart, name='remove-from-cart'),
@@ -25,6 +28,7 @@ urlpatterns = [
     path('orders/', views.OrderListView.as_view(), name='order-list'),
     path('orders/<uuid:order_id>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('orders/create/', views.create_order, name='create-order'),
+    path('orders/events/', views.order_events, name='order-events'),
     
     # Review URLs
     path('products/<int:product_id>/reviews/', views.ProductReviewListView.as_view(), name='product-reviews'),
@@ -35,4 +39,12 @@ urlpatterns = [
     path('wishlist/add/', views.add_to_wishlist, name='add-to-wishlist'),
     path('wishlist/remove/<int:product_id>/', views.remove_from_wishlist, name='remove-from-wishlist'),
     path('wishlist/toggle/', views.toggle_wishlist, name='toggle-wishlist'),
+    path('wishlist/status/', views.wishlist_status, name='wishlist-status'),
+    
+    # Partner feeds
+    path('feeds/products.<str:feed_format>.gz', views.product_feed, name='product-feed'),
+    
+    # Report URLs
+    path('reports/sales/', views.sales_report_view, name='sales-report'),
+    path('reports/fragment-cache/', views.fragment_cache_stats, name='fragment-cache-stats'),
 ]
\ No newline at end of file
@@ -1,17 +1,42 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from django.conf import settings
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+from django.utils.http import parse_etags
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
 from django.contrib.sessions.models import Session
-
-from .models import Category, Product, ProductImage, Cart, CartItem, Order, OrderItem, Review, Wishlist
+from django.db.models import Prefetch, prefetch_related_objects
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from mediafiles.delivery import serve_file
+from wembli.batch import no_batch
+from wembli.sparse_fields import SparseQuerysetMixin
+from wembli.write_queue import write_coordinator
+
+from .models import Category, Product, ProductImage, Cart, CartItem, Order, OrderItem, Review, Wishlist, ProductCard
 from .serializers import (
-    CategorySerializer, ProductSerializer, ProductListSerializer, ProductImageSerializer,
+    CategorySerializer, ProductSerializer, ProductListSerializer, ProductCardSerializer, ProductImageSerializer,
     CartSerializer, CartItemSerializer, OrderSerializer, OrderCreateSerializer,
     ReviewSerializer, WishlistSerializer
 )
+from .bulk import BulkUpdateError, bulk_set_prices, bulk_update_products, select_products
+from .carts import (
+    StaleCart, adjust_cart_totals, cart_etag, cart_totals, parse_cart_version, reset_cart_totals
+)
+from .facets import get_product_facets, parse_facets, parse_price_buckets
+from .filters import filter_product_cards, normalize_product_filters
+from .feeds import FEED_FORMATS, get_feed_root
+from .fragments import get_fragment_cache
+from .metrics import checkout_failures, checkouts
+from .order_events import changes_since, format_event, get_retry_ms, stream_order_events
+from .rankings import record_sale
+from .recommendations import get_top_k
+from .rollups import sales_report
+from .sitemaps import SHARD_NAME_RE, get_sitemap_root
 
 
 class ProductPagination(PageNumberPagination):
@@ -20,14 +45,25 @@ class ProductPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class WishlistPagination(CursorPagination):
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # The id breaks ties between items added in the same instant.
+    ordering = ('-created_at', '-id')
+
+
+WISHLIST_STATUS_MAX_IDS = 500
+
+
 # Category Views
-class CategoryListView(generics.ListCreateAPIView):
+class CategoryListView(SparseQuerysetMixin, generics.ListCreateAPIView):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     lookup_field = 'slug'
@@ -35,64 +71,112 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Product Views
-class ProductListView(generics.ListCreateAPIView):
+class ProductListView(SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = ProductListSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = ProductPagination
 
+    def get_serializer_class(self):
+        # Listings are read from the denormalized card table.
+        if self.request.method in ('GET', 'HEAD'):
+            return ProductCardSerializer
+        return ProductListSerializer
+
     def get_queryset(self):
-        queryset = Product.objects.filter(available=True)
-        
-        # Filter by category
-        category = self.request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category__slug=category)
-        
-        # Filter by featured
-        featured = self.request.query_params.get('featured')
-        if featured and featured.lower() == 'true':
-            queryset = queryset.filter(featured=True)
-        
-        # Search functionality
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(category__name__icontains=search)
-            )
-        
-        # Price filtering
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
+        queryset = ProductCard.objects.filter(available=True)
+        queryset = filter_product_cards(queryset, normalize_product_filters(self.request.query_params))
         
         # Ordering
         ordering = self.request.query_params.get('ordering', '-create_at')
         valid_orderings = ['name', '-name', 'price', '-price', 'create_at', '-create_at']
+        # Many products share a rank (e.g. no sales yet); -pk keeps pages stable.
+        ranking_orderings = {'bestselling': ('-sales_count', '-pk'), 'trending': ('-trending_score', '-pk')}
         if ordering in valid_orderings:
             queryset = queryset.order_by(ordering)
+        elif ordering in ranking_orderings:
+            queryset = queryset.order_by(*ranking_orderings[ordering])
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        
+        # Facet counts for the current filter set, e.g. ?facets=category,price
+        facets = parse_facets(request.query_params.get('facets'))
+        if facets:
+            response.data['facets'] = get_product_facets(
+                Product.objects.filter(available=True),
+                normalize_product_filters(request.query_params),
+                facets,
+                parse_price_buckets(request.query_params.get('price_buckets')),
+            )
+        
+        return response
+
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.filter(available=True)
     serializer_class = ProductSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
-class ProductsByCategory(generics.ListAPIView):
+class ProductRecommendationsView(generics.ListAPIView):
+    """Frequently bought together, served from the precomputed recommendations table."""
     serializer_class = ProductListSerializer
+    default_limit = 8
+
+    def get_queryset(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, get_top_k()))
+        
+        return Product.objects.filter(
+            recommended_in__product__slug=self.kwargs['slug'],
+            available=True,
+        ).select_related('category').prefetch_related('reviews').order_by('-recommended_in__score')[:limit]
+
+
+class ProductsByCategory(SparseQuerysetMixin, generics.ListAPIView):
+    serializer_class = ProductCardSerializer
     pagination_class = ProductPagination
 
     def get_queryset(self):
         category_slug = self.kwargs['category_slug']
-        return Product.objects.filter(category__slug=category_slug, available=True)
+        return ProductCard.objects.filter(category_slug=category_slug, available=True)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_update_products_view(request):
+    """Batched product changes without per-object saves.
+
+    Body: ``ids`` and/or ``filter`` (product list filters plus ``available``;
+    ``{}`` selects every product) with ``set``, e.g. ``{"price_percent": -10}``,
+    ``{"stock": 0, "available": false}``; or ``prices``, ``{id: price}``.
+    ``dry_run`` only counts the matches.
+    """
+    batch_size = getattr(settings, 'SHOP_BULK_BATCH_SIZE', 1000)
+    try:
+        if 'prices' in request.data:
+            if not isinstance(request.data['prices'], dict):
+                raise BulkUpdateError('prices must be an object of product id to price')
+            result = bulk_set_prices(request.data['prices'], batch_size=batch_size)
+        else:
+            ids, filters = request.data.get('ids'), request.data.get('filter')
+            if ids is None and filters is None:
+                raise BulkUpdateError('Select products with ids and/or filter')
+            if not isinstance(request.data.get('set'), dict):
+                raise BulkUpdateError('set must be an object of changes')
+            result = bulk_update_products(
+                select_products(ids=ids, filters=filters), request.data['set'],
+                batch_size=batch_size, dry_run=bool(request.data.get('dry_run')),
+            )
+    except BulkUpdateError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
 
 
 # Cart Views
@@ -108,11 +192,72 @@ def get_or_create_cart(request):
     return cart
 
 
+CART_TOTAL_FIELDS = ('version', 'item_count', 'line_count', 'subtotal')
+
+
+def serialize_cart(cart):
+    """CartSerializer data with the items and their products loaded in one query."""
+    cart._prefetched_objects_cache = {}
+    prefetch_related_objects([cart], Prefetch('items', queryset=CartItem.objects.select_related('product')))
+    return CartSerializer(cart).data
+
+
+def cart_totals_data(totals):
+    return {
+        'version': totals['version'],
+        'item_count': totals['item_count'],
+        'line_count': totals['line_count'],
+        'subtotal': f"{totals['subtotal']:.2f}",
+    }
+
+
+def cart_response(request, cart, changed=(), removed=(), status_code=status.HTTP_200_OK):
+    """The whole cart, or with ``?delta=1`` just the changed lines, removed line ids and new totals."""
+    cart.refresh_from_db(fields=CART_TOTAL_FIELDS)
+    if request.query_params.get('delta'):
+        data = cart_totals_data(cart.__dict__)
+        data['items'] = CartItemSerializer(changed, many=True).data
+        data['removed'] = list(removed)
+    else:
+        data = serialize_cart(cart)
+    response = Response(data, status=status_code)
+    response['ETag'] = cart_etag(cart.version)
+    return response
+
+
+def stale_cart_response(cart):
+    totals = cart_totals(cart.pk)
+    response = Response(
+        {'error': 'Cart has changed', **cart_totals_data(totals)},
+        status=status.HTTP_412_PRECONDITION_FAILED,
+    )
+    response['ETag'] = cart_etag(totals['version'])
+    return response
+
+
 @api_view(['GET'])
 def cart_detail(request):
     cart = get_or_create_cart(request)
-    serializer = CartSerializer(cart)
-    return Response(serializer.data)
+    etag = cart_etag(cart.version)
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(serialize_cart(cart))
+    response['ETag'] = etag
+    return response
+
+
+@api_view(['GET'])
+def cart_summary(request):
+    """Item count, line count and subtotal for the header badge, read from the cart's counters."""
+    if request.user.is_authenticated:
+        summary = Cart.objects.filter(user=request.user).values(*CART_TOTAL_FIELDS).first()
+    elif request.session.session_key:
+        summary = Cart.objects.filter(session_key=request.session.session_key).values(*CART_TOTAL_FIELDS).first()
+    else:
+        # Don't start a session (or a cart) just to report an empty one.
+        summary = None
+    return Response(cart_totals_data(summary or {'version': 0, 'item_count': 0, 'line_count': 0, 'subtotal': 0}))
 
 
 @api_view(['POST'])
@@ -120,6 +265,7 @@ def add_to_cart(request):
     cart = get_or_create_cart(request)
     product_id = request.data.get('product_id')
     quantity = int(request.data.get('quantity', 1))
+    expected_version = parse_cart_version(request)
     
     try:
         product = Product.objects.get(id=product_id, available=True)
@@ -129,68 +275,111 @@ def add_to_cart(request):
     if quantity > product.stock:
         return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
     
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'quantity': quantity}
-    )
-    
-    if not created:
-        cart_item.quantity += quantity
-        if cart_item.quantity > product.stock:
-            return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
-        cart_item.save()
+    try:
+        with write_coordinator.atomic():
+            cart_item, created = CartItem.objects.get_or_create(
+                cart=cart,
+                product=product,
+                defaults={'quantity': quantity}
+            )
+            
+            if not created:
+                cart_item.quantity += quantity
+                if cart_item.quantity > product.stock:
+                    return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
+                cart_item.save()
+            adjust_cart_totals(
+                cart.pk, items=quantity, lines=int(created), subtotal=quantity * product.price,
+                expected_version=expected_version,
+            )
+    except StaleCart:
+        return stale_cart_response(cart)
     
-    serializer = CartSerializer(cart)
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return cart_response(request, cart, changed=[cart_item], status_code=status.HTTP_201_CREATED)
 
 
 @api_view(['PUT'])
 def update_cart_item(request, item_id):
     cart = get_or_create_cart(request)
     quantity = int(request.data.get('quantity', 1))
+    expected_version = parse_cart_version(request)
     
     try:
-        cart_item = CartItem.objects.get(id=item_id, cart=cart)
+        cart_item = CartItem.objects.select_related('product').get(id=item_id, cart=cart)
     except CartItem.DoesNotExist:
         return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    if quantity <= 0:
-        cart_item.delete()
-    else:
-        if quantity > cart_item.product.stock:
-            return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
-        cart_item.quantity = quantity
-        cart_item.save()
+    price = cart_item.product.price
+    changed, removed = [], []
+    try:
+        if quantity <= 0:
+            with write_coordinator.atomic():
+                old_quantity = CartItem.objects.filter(pk=cart_item.pk).values_list('quantity', flat=True).first()
+                if old_quantity is not None and cart_item.delete()[0]:
+                    adjust_cart_totals(
+                        cart.pk, items=-old_quantity, lines=-1, subtotal=-old_quantity * price,
+                        expected_version=expected_version,
+                    )
+            removed.append(item_id)
+        else:
+            if quantity > cart_item.product.stock:
+                return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
+            cart_item.quantity = quantity
+            with write_coordinator.atomic():
+                # Diff against the stored quantity, not the one read above, so
+                # concurrent updates of the same line don't skew the counters.
+                old_quantity = CartItem.objects.filter(pk=cart_item.pk).values_list('quantity', flat=True).first()
+                if old_quantity is not None:
+                    cart_item.save(update_fields=['quantity'])
+                    delta = quantity - old_quantity
+                    adjust_cart_totals(
+                        cart.pk, items=delta, subtotal=delta * price, expected_version=expected_version,
+                    )
+            changed.append(cart_item)
+    except StaleCart:
+        return stale_cart_response(cart)
     
-    serializer = CartSerializer(cart)
-    return Response(serializer.data)
+    return cart_response(request, cart, changed=changed, removed=removed)
 
 
 @api_view(['DELETE'])
 def remove_from_cart(request, item_id):
     cart = get_or_create_cart(request)
+    expected_version = parse_cart_version(request)
     
     try:
-        cart_item = CartItem.objects.get(id=item_id, cart=cart)
-        cart_item.delete()
+        cart_item = CartItem.objects.select_related('product').get(id=item_id, cart=cart)
+        with write_coordinator.atomic():
+            old_quantity = CartItem.objects.filter(pk=cart_item.pk).values_list('quantity', flat=True).first()
+            if old_quantity is not None and cart_item.delete()[0]:
+                adjust_cart_totals(
+                    cart.pk, items=-old_quantity, lines=-1, subtotal=-old_quantity * cart_item.product.price,
+                    expected_version=expected_version,
+                )
     except CartItem.DoesNotExist:
         return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
+    except StaleCart:
+        return stale_cart_response(cart)
     
-    serializer = CartSerializer(cart)
-    return Response(serializer.data)
+    return cart_response(request, cart, removed=[item_id])
 
 
 @api_view(['DELETE'])
 def clear_cart(request):
     cart = get_or_create_cart(request)
-    cart.items.all().delete()
-    serializer = CartSerializer(cart)
-    return Response(serializer.data)
+    expected_version = parse_cart_version(request)
+    try:
+        with write_coordinator.atomic():
+            removed = list(cart.items.values_list('id', flat=True))
+            cart.items.all().delete()
+            reset_cart_totals(cart.pk, expected_version=expected_version)
+    except StaleCart:
+        return stale_cart_response(cart)
+    return cart_response(request, cart, removed=removed)
 
 
 # Order Views
-class OrderListView(generics.ListAPIView):
+class OrderListView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -198,7 +387,7 @@ class OrderListView(generics.ListAPIView):
         return Order.objects.filter(user=self.request.user)
 
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(SparseQuerysetMixin, generics.RetrieveAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'order_id'
@@ -207,45 +396,90 @@ class OrderDetailView(generics.RetrieveAPIView):
         return Order.objects.filter(user=self.request.user)
 
 
+@require_GET
+async def order_events(request):
+    """Server-Sent Events feed of the user's order status changes, ``?order=<order_id>`` for one order.
+
+    Streams are held open on the ASGI entry point (wembli.asgi). Under WSGI a
+    worker can't be parked on a connection, so the missed events are sent and
+    the client reconnects after the ``retry`` interval instead.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid Last-Event-ID'}, status=400)
+    order_id = request.GET.get('order') or None
+    
+    if not isinstance(request, ASGIRequest):
+        events = await changes_since(last_event_id, user_id=user.pk) if last_event_id is not None else []
+        body = f'retry: {get_retry_ms()}\n\n' + ''.join(
+            format_event(event) for event in events if order_id is None or event['order_id'] == order_id
+        )
+        return HttpResponse(body, content_type='text/event-stream')
+    
+    response = StreamingHttpResponse(
+        stream_order_events(user.pk, last_event_id, order_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_order(request):
     cart = get_or_create_cart(request)
+    cart_items = list(cart.items.select_related('product'))
     
-    if not cart.items.exists():
+    if not cart_items:
+        checkout_failures.inc(reason='empty_cart')
         return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
     
     serializer = OrderCreateSerializer(data=request.data)
     if serializer.is_valid():
-        # Create order
-        order = serializer.save(
-            user=request.user,
-            total_amount=cart.total_price
-        )
-        
-        # Create order items
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            # Update product stock
-            cart_item.product.stock -= cart_item.quantity
-            cart_item.product.save()
-        
-        # Clear cart
-        cart.items.all().delete()
+        try:
+            with write_coordinator.atomic():
+                # Create order
+                order = serializer.save(
+                    user=request.user,
+                    total_amount=sum(cart_item.get_total_price() for cart_item in cart_items)
+                )
+            
+                # Create order items
+                for cart_item in cart_items:
+                    OrderItem.objects.create(
+                        order=order,
+                        product=cart_item.product,
+                        quantity=cart_item.quantity,
+                        price=cart_item.product.price
+                    )
+                    # Update product stock and bestseller counter
+                    record_sale(cart_item.product_id, cart_item.quantity)
+            
+                # Clear cart
+                cart.items.all().delete()
+                reset_cart_totals(cart.pk)
+        except Exception as exc:
+            checkout_failures.inc(reason=type(exc).__name__)
+            raise
+        checkouts.inc()
         
+        prefetch_related_objects([order], 'items__product')
         order_serializer = OrderSerializer(order)
         return Response(order_serializer.data, status=status.HTTP_201_CREATED)
     
+    checkout_failures.inc(reason='invalid')
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 # Review Views
-class ProductReviewListView(generics.ListCreateAPIView):
+class ProductReviewListView(SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
@@ -259,7 +493,7 @@ class ProductReviewListView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user, product=product)
 
 
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -268,12 +502,49 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Wishlist Views
-class WishlistView(generics.ListAPIView):
+class WishlistView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = WishlistSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = WishlistPagination
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user).order_by('-created_at')
+        return Wishlist.objects.filter(user=self.request.user).select_related('product')
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def wishlist_status(request):
+    """Which of the given product ids are in the user's wishlist.
+
+    ``GET ?product_ids=1,2,3`` or ``POST {"product_ids": [1, 2, 3]}``.
+    """
+    if request.method == 'POST':
+        raw_ids = request.data.get('product_ids', [])
+    else:
+        raw_ids = request.query_params.get('product_ids', '').split(',')
+    if not isinstance(raw_ids, list):
+        return Response({'error': 'product_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        product_ids = {int(product_id) for product_id in raw_ids if str(product_id).strip()}
+    except (TypeError, ValueError):
+        return Response({'error': 'product_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(product_ids) > WISHLIST_STATUS_MAX_IDS:
+        return Response(
+            {'error': f'At most {WISHLIST_STATUS_MAX_IDS} product ids per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    wishlisted = set()
+    if product_ids:
+        wishlisted = set(
+            Wishlist.objects.filter(user=request.user, product_id__in=product_ids)
+            .values_list('product_id', flat=True)
+        )
+    return Response({
+        'wishlisted': sorted(wishlisted),
+        'status': {str(product_id): product_id in wishlisted for product_id in sorted(product_ids)},
+    })
 
 
 @api_view(['POST'])
@@ -335,4 +606,51 @@ def toggle_wishlist(request):
         return Response({
             'added': False,
             'message': 'Product removed from wishlist'
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+# Report Views
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def sales_report_view(request):
+    """Revenue, units by product/category and orders by status, from the daily rollups."""
+    today = timezone.localdate()
+    try:
+        start = parse_date(request.query_params.get('start', '')) or today.replace(day=1)
+        end = parse_date(request.query_params.get('end', '')) or today
+    except ValueError:
+        # Well-formed but impossible dates such as 2024-13-45
+        return Response({'error': 'Invalid date'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(sales_report(start, end))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def fragment_cache_stats(request):
+    """Hit ratio, bytes saved and size of this process's product fragment cache."""
+    return Response(get_fragment_cache().stats())
+
+
+@no_batch
+@require_GET
+def product_feed(request, feed_format):
+    """The gzipped partner feed built by ``manage.py build_product_feeds``; no database access."""
+    if feed_format not in FEED_FORMATS:
+        raise Http404('Unknown feed format')
+    return serve_file(request, get_feed_root(), f'products.{feed_format}.gz')
+
+
+@require_GET
+def sitemap_index(request):
+    """``sitemap.xml`` as written by ``manage.py build_sitemaps``."""
+    return serve_file(request, get_sitemap_root(), 'sitemap.xml')
+
+
+@require_GET
+def sitemap_shard(request, name):
+    if not SHARD_NAME_RE.match(name):
+        raise Http404('Unknown sitemap')
+    return serve_file(request, get_sitemap_root(), name)
@@ -0,0 +1,64 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from taskqueue.queue import claim_tasks, release_stale_locks, run_task
+
+
+class Command(BaseCommand):
+    help = 'Run queued tasks with a pool of worker threads or processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--pool', choices=('thread', 'process'), default='thread')
+        parser.add_argument('--batch-size', type=int, default=20, help='Tasks claimed per poll.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--once', action='store_true', help='Exit when no task is due.')
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        if options['pool'] == 'process':
+            # Forked workers must open their own database connections.
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=options['workers'])
+        else:
+            executor = ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='task')
+
+        outcomes = {}
+        with executor:
+            while not self.stopping:
+                release_stale_locks()
+                task_ids = claim_tasks(worker_id, batch_size=options['batch_size'])
+                if not task_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                if options['pool'] == 'process':
+                    connections.close_all()
+                futures = [executor.submit(run_task, task_id) for task_id in task_ids]
+                wait(futures)
+                for future in futures:
+                    try:
+                        outcome = future.result()
+                    except Exception as exc:
+                        # Couldn't even record the outcome (e.g. lost the database);
+                        # release_stale_locks() requeues the task later.
+                        self.stderr.write(f'Task runner error: {exc!r}')
+                        outcome = 'error'
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        summary = ', '.join(f'{count} {outcome}' for outcome, count in sorted(outcomes.items()))
+        self.stdout.write(self.style.SUCCESS(f'Processed {sum(outcomes.values())} tasks ({summary or "none"}).'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
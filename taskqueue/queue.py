@@ -0,0 +1,152 @@
+"""
+Durable, database-backed task queue.
+
+Side effects that don't have to finish before the response (rollups, image
+resizing, notifications) are registered with ``@task`` in an app's
+``tasks.py`` and queued with ``.delay()``. The task row is written in the
+caller's transaction, so a task is queued only if the work that produced it
+commits. ``manage.py run_tasks`` claims due tasks in batches, runs them on a
+thread or process pool and retries failures with exponential backoff.
+"""
+
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Task
+
+
+registry = {}
+
+
+def get_retry_backoff():
+    return getattr(settings, 'TASKQUEUE_RETRY_BACKOFF', 5)
+
+
+def get_retry_backoff_max():
+    return getattr(settings, 'TASKQUEUE_RETRY_BACKOFF_MAX', 3600)
+
+
+def get_lock_timeout():
+    return timedelta(seconds=getattr(settings, 'TASKQUEUE_LOCK_TIMEOUT', 600))
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, idempotency_key=None, countdown=0, **kwargs):
+        return enqueue(self.name, args, kwargs, idempotency_key=idempotency_key,
+                       countdown=countdown, max_attempts=self.max_attempts)
+
+
+def task(func=None, *, name=None, max_attempts=5):
+    """Register ``func`` as a task; arguments must be JSON serializable."""
+    def register(func):
+        task_name = name or f'{func.__module__.split(".")[0]}.{func.__name__}'
+        registry[task_name] = TaskFunction(func, task_name, max_attempts)
+        return registry[task_name]
+
+    return register(func) if func is not None else register
+
+
+def enqueue(name, args=(), kwargs=None, idempotency_key=None, countdown=0, max_attempts=5):
+    """Queue a task; with an ``idempotency_key`` already used, return the existing task instead."""
+    if name not in registry:
+        raise KeyError(f'Unknown task {name!r}')
+    fields = {
+        'name': name,
+        'args': list(args),
+        'kwargs': kwargs or {},
+        'max_attempts': max_attempts,
+        'run_at': timezone.now() + timedelta(seconds=countdown),
+    }
+    if idempotency_key is None:
+        queued = Task.objects.create(**fields)
+    else:
+        existing = Task.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+        try:
+            with transaction.atomic():
+                queued = Task.objects.create(idempotency_key=idempotency_key, **fields)
+        except IntegrityError:
+            return Task.objects.get(idempotency_key=idempotency_key)
+
+    if getattr(settings, 'TASKQUEUE_EAGER', False):
+        # No worker (tests, quick local runs): run right after the caller commits.
+        transaction.on_commit(lambda: run_task(queued.pk))
+    return queued
+
+
+def release_stale_locks(now=None):
+    """Requeue tasks whose worker died while running them."""
+    now = now or timezone.now()
+    return Task.objects.filter(status=Task.RUNNING, locked_at__lt=now - get_lock_timeout()).update(
+        status=Task.QUEUED, locked_by='', locked_at=None, run_at=now,
+    )
+
+
+def claim_tasks(worker_id, batch_size=20, now=None):
+    """Atomically mark up to ``batch_size`` due tasks as running; returns their ids."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.QUEUED, run_at__lte=now)
+            .order_by('run_at', 'pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            Task.objects.filter(pk__in=ids, status=Task.QUEUED).update(
+                status=Task.RUNNING, locked_by=worker_id, locked_at=now,
+            )
+    return ids
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: ~5s, 10s, 20s, ... capped at TASKQUEUE_RETRY_BACKOFF_MAX."""
+    delay = min(get_retry_backoff() * 2 ** (attempts - 1), get_retry_backoff_max())
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def run_task(task_id):
+    """Run one claimed task and record the outcome; returns the final status."""
+    close_old_connections()
+    try:
+        queued = Task.objects.get(pk=task_id)
+        func = registry.get(queued.name)
+        attempts = queued.attempts + 1
+        try:
+            if func is None:
+                raise KeyError(f'Unknown task {queued.name!r}')
+            func(*queued.args, **queued.kwargs)
+        except Exception:
+            now = timezone.now()
+            error = traceback.format_exc()
+            if attempts >= queued.max_attempts:
+                fields = {'status': Task.FAILED, 'finished_at': now}
+            else:
+                fields = {'status': Task.QUEUED, 'run_at': now + retry_delay(attempts)}
+            Task.objects.filter(pk=task_id).update(
+                attempts=attempts, last_error=error, locked_by='', locked_at=None, **fields
+            )
+            return fields['status']
+
+        Task.objects.filter(pk=task_id).update(
+            status=Task.DONE, attempts=attempts, locked_by='', locked_at=None,
+            finished_at=timezone.now(),
+        )
+        return Task.DONE
+    finally:
+        close_old_connections()
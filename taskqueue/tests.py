@@ -0,0 +1,90 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Task
+from .queue import claim_tasks, enqueue, release_stale_locks, retry_delay, run_task, task
+
+
+calls = []
+
+
+@task(name='taskqueue.tests.record', max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@task(name='taskqueue.tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('boom')
+
+
+class TaskQueueTest(TestCase):
+    """Queued tasks are claimed once, retried with backoff and run eagerly when configured."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_idempotency_key(self):
+        first = record.delay(1, idempotency_key='once')
+        second = record.delay(2, idempotency_key='once')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(Task.objects.get().args, [1])
+
+    def test_unknown_task(self):
+        with self.assertRaises(KeyError):
+            enqueue('taskqueue.tests.missing')
+
+    def test_claim_due_tasks(self):
+        now = timezone.now()
+        due = [record.delay(i).pk for i in range(3)]
+        record.delay(3, countdown=60)
+        self.assertEqual(claim_tasks('worker-a', batch_size=2, now=now + timedelta(seconds=1)), due[:2])
+        self.assertEqual(claim_tasks('worker-b', now=now + timedelta(seconds=1)), due[2:])
+        self.assertEqual(claim_tasks('worker-b', now=now + timedelta(seconds=1)), [])
+        self.assertEqual(Task.objects.get(pk=due[0]).locked_by, 'worker-a')
+        self.assertEqual(Task.objects.filter(status=Task.RUNNING).count(), 3)
+
+    def test_run_task(self):
+        queued = record.delay('hello')
+        self.assertEqual(run_task(queued.pk), Task.DONE)
+        self.assertEqual(calls, ['hello'])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.DONE, 1))
+        self.assertIsNotNone(queued.finished_at)
+
+    def test_retry_then_fail(self):
+        queued = fail.delay()
+        before = timezone.now()
+        self.assertEqual(run_task(queued.pk), Task.QUEUED)
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreater(queued.run_at, before)
+        self.assertIn('ValueError: boom', queued.last_error)
+        self.assertEqual(run_task(queued.pk), Task.FAILED)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+
+    @override_settings(TASKQUEUE_RETRY_BACKOFF=5, TASKQUEUE_RETRY_BACKOFF_MAX=60)
+    def test_retry_delay(self):
+        with mock.patch('taskqueue.queue.random.uniform', return_value=1):
+            delays = [retry_delay(attempts).total_seconds() for attempts in range(1, 6)]
+        self.assertEqual(delays, [5, 10, 20, 40, 60])
+
+    def test_release_stale_locks(self):
+        queued = record.delay(1)
+        claim_tasks('worker-a')
+        self.assertEqual(release_stale_locks(), 0)
+        self.assertEqual(release_stale_locks(timezone.now() + timedelta(hours=1)), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.locked_by), (Task.QUEUED, ''))
+
+    @override_settings(TASKQUEUE_EAGER=True)
+    def test_eager_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('eager')
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['eager'])
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wembli.settings')
 
 application = get_asgi_application()
+
+# Long-lived streams (/api/orders/events/) are only held open when served from
+# here, e.g. `uvicorn wembli.asgi:application`; each idle stream is a parked
+# coroutine rather than a worker thread.
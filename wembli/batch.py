@@ -0,0 +1,217 @@
+"""
+Multi-request batch endpoint: ``POST /api/batch/``.
+
+::
+
+    {"requests": [
+        {"id": "categories", "method": "GET", "path": "/api/categories/"},
+        {"id": "featured", "method": "GET", "path": "/api/products/?featured=true"},
+        {"id": "add", "method": "POST", "path": "/api/cart/add/", "body": {"product_id": 3}}
+    ]}
+
+returns ``{"responses": [{"id": ..., "status": ..., "body": ...}, ...]}`` in
+request order. Sub-requests go straight to the ``shop``/``accounts`` views,
+reusing the batch request's user, token and session, so authentication and
+middleware run once. Runs of consecutive GETs execute concurrently on a small
+thread pool; writes run one at a time on the request thread, in order, so a
+GET listed after a write sees its result.
+"""
+
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection, connections
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .db_router import is_pinned, pin_to_primary, unpin
+
+
+BATCH_NAMESPACES = ('shop', 'accounts')
+READ_METHODS = ('GET', 'HEAD')
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def get_max_requests():
+    return getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+
+
+def get_max_workers():
+    return getattr(settings, 'BATCH_MAX_WORKERS', 4)
+
+
+def no_batch(view):
+    """Mark a view whose response can't be embedded in a batch, e.g. a streamed download."""
+    view.batchable = False
+    return view
+
+
+def check_batchable(match):
+    """The reason the view behind ``match`` can't run in a batch, or None."""
+    if not set(match.namespaces) & set(BATCH_NAMESPACES):
+        return 'cannot be batched'
+    if iscoroutinefunction(match.func):
+        # Async views return a coroutine, and are usually long-lived streams.
+        return 'is an async view and cannot be batched'
+    if not getattr(match.func, 'batchable', True):
+        return 'streams its response and cannot be batched'
+    return None
+
+
+def parse_sub_request(index, spec):
+    """
+    Validate one entry of ``requests``. Malformed entries fail the whole batch;
+    a path that can't be served inside a batch only fails its own item, via
+    the sub-request's ``error``.
+    """
+    if not isinstance(spec, dict):
+        raise BatchError(f'requests[{index}] must be an object')
+    method = str(spec.get('method', 'GET')).upper()
+    if method not in READ_METHODS + WRITE_METHODS:
+        raise BatchError(f'requests[{index}]: unsupported method {method}')
+    url = urlsplit(str(spec.get('path', '')))
+    sub = {
+        'id': spec.get('id', index),
+        'method': method,
+        'path': url.path,
+        'query': url.query,
+        'body': spec.get('body'),
+        'match': None,
+        'error': None,
+    }
+    try:
+        sub['match'] = resolve(url.path)
+    except Resolver404:
+        sub['error'] = (status.HTTP_404_NOT_FOUND, f'No route for {url.path}')
+        return sub
+    reason = check_batchable(sub['match'])
+    if reason:
+        sub['error'] = (status.HTTP_400_BAD_REQUEST, f'{url.path} {reason}')
+    return sub
+
+
+def build_sub_request(request, sub):
+    """A WSGIRequest for ``sub`` carrying over the batch request's headers, session and user."""
+    body = json.dumps(sub['body']).encode() if sub['body'] is not None else b''
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('wsgi.') and key not in ('CONTENT_LENGTH', 'CONTENT_TYPE')
+    }
+    environ.update({
+        'REQUEST_METHOD': sub['method'],
+        'PATH_INFO': sub['path'],
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': sub['query'],
+        'HTTP_ACCEPT': 'application/json',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    sub_request.session = request._request.session
+    sub_request.user = request.user
+    sub_request.resolver_match = sub['match']
+    # DRF views skip their authenticators and use these instead.
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    # CSRF was enforced on the batch request itself.
+    sub_request._dont_enforce_csrf_checks = True
+    return sub_request
+
+
+def run_sub_request(request, sub):
+    if sub['error']:
+        status_code, message = sub['error']
+        return {'id': sub['id'], 'status': status_code, 'body': {'error': message}}
+    sub_request = build_sub_request(request, sub)
+    match = sub['match']
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+    except Exception as exc:
+        response = response_for_exception(sub_request, exc)
+
+    if getattr(response, 'streaming', False):
+        return {'id': sub['id'], 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': 'Streaming responses cannot be batched'}}
+    if hasattr(response, 'data'):
+        # A DRF response: return its data as-is; the batch response renders it once.
+        body = response.data
+    else:
+        if hasattr(response, 'render'):
+            response.render()
+        content = response.content.decode(response.charset or 'utf-8')
+        try:
+            body = json.loads(content) if content else None
+        except ValueError:
+            body = content
+    return {'id': sub['id'], 'status': response.status_code, 'body': body}
+
+
+def run_reads(request, subs):
+    """Run independent read-only sub-requests on a thread pool."""
+    if len(subs) == 1:
+        return [run_sub_request(request, subs[0])]
+    pinned = is_pinned()
+
+    def worker(sub):
+        if pinned:
+            pin_to_primary()
+        try:
+            return run_sub_request(request, sub)
+        finally:
+            unpin()
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=min(get_max_workers(), len(subs))) as executor:
+        return list(executor.map(worker, subs))
+
+
+def execute_batch(request, subs):
+    # Worker threads use their own connections, which can't see uncommitted
+    # data, so inside a transaction everything runs on this thread.
+    concurrent = get_max_workers() > 1 and not connection.in_atomic_block
+    results = []
+    reads = []
+    for sub in subs:
+        if concurrent and sub['method'] in READ_METHODS:
+            reads.append(sub)
+            continue
+        if reads:
+            results.extend(run_reads(request, reads))
+            reads = []
+        results.append(run_sub_request(request, sub))
+    if reads:
+        results.extend(run_reads(request, reads))
+    return results
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch_view(request):
+    specs = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(specs, list) or not specs:
+        return Response({'error': 'requests must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(specs) > get_max_requests():
+        return Response(
+            {'error': f'At most {get_max_requests()} requests per batch'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        subs = [parse_sub_request(index, spec) for index, spec in enumerate(specs)]
+    except BatchError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'responses': execute_batch(request, subs)})
@@ -0,0 +1,149 @@
+"""
+Primary/replica database routing.
+
+Safe catalog reads go to one of ``settings.DATABASE_REPLICAS``; everything
+else goes to ``default``. Once a request writes (or opens a transaction on
+the primary) its remaining reads are pinned to the primary so it always sees
+its own writes. ``PrimaryPinningMiddleware`` clears the pin between requests.
+"""
+
+import json
+import os
+import random
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import connections
+
+
+PRIMARY = 'default'
+
+# Models whose listings tolerate replica lag.
+REPLICA_READ_MODELS = {
+    'shop.category',
+    'shop.product',
+    'shop.productcard',
+    'shop.productimage',
+    'shop.productrecommendation',
+    'shop.review',
+    'shop.wishlist',
+}
+
+_request_state = Local()
+
+
+def pin_to_primary():
+    _request_state.pinned = True
+
+
+def unpin():
+    _request_state.pinned = False
+
+
+def is_pinned():
+    return getattr(_request_state, 'pinned', False)
+
+
+def sync_marker_path(database_name):
+    return f'{database_name}.sync'
+
+
+def sqlite_mtime(database_name):
+    """Last modification of an SQLite database, including its WAL file."""
+    mtimes = [0.0]
+    for path in (database_name, f'{database_name}-wal'):
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            pass
+    return max(mtimes)
+
+
+class ReplicaLagGuard:
+    """Skip replicas that are too far behind the primary.
+
+    For SQLite replicas, ``sync_replicas`` writes a marker next to the replica
+    file recording the primary's modification time at snapshot; lag is how much
+    newer the primary is now. Other engines are assumed to replicate in near
+    real time. Results are cached for ``check_interval`` seconds.
+    """
+
+    check_interval = 1.0
+
+    def __init__(self):
+        self._checked = {}
+
+    def lag(self, alias):
+        replica = connections.settings[alias]
+        primary = connections.settings[PRIMARY]
+        if replica['ENGINE'] != 'django.db.backends.sqlite3' or primary['ENGINE'] != replica['ENGINE']:
+            return 0.0
+        try:
+            with open(sync_marker_path(replica['NAME'])) as marker:
+                synced_mtime = json.load(marker)['primary_mtime']
+        except (OSError, ValueError, KeyError):
+            return float('inf')
+        return max(0.0, sqlite_mtime(primary['NAME']) - synced_mtime)
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        checked_at, healthy = self._checked.get(alias, (0.0, False))
+        if now - checked_at > self.check_interval:
+            max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 30)
+            healthy = self.lag(alias) <= max_lag
+            self._checked[alias] = (now, healthy)
+        return healthy
+
+
+lag_guard = ReplicaLagGuard()
+
+
+def get_replicas():
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', []) if alias in settings.DATABASES]
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if model._meta.label_lower not in REPLICA_READ_MODELS:
+            return PRIMARY
+        if is_pinned() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+
+        replicas = [alias for alias in get_replicas() if lag_guard.is_healthy(alias)]
+        if not replicas:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary.
+        if db in get_replicas():
+            return False
+        return None
+
+
+class PrimaryPinningMiddleware:
+    """Start every request unpinned so reads may use a replica until it writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unpin()
+        try:
+            return self.get_response(request)
+        finally:
+            unpin()
@@ -0,0 +1,71 @@
+import json
+import re
+import secrets
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class JSONFragment:
+    """Already-serialized JSON (bytes) that ``FastJSONRenderer`` splices into its output as-is."""
+
+    __slots__ = ('content',)
+
+    def __init__(self, content):
+        self.content = content
+
+    def __len__(self):
+        return len(self.content)
+
+
+class FragmentJSONEncoder(encoders.JSONEncoder):
+    """Standard-library fallback: fragments are decoded and encoded again."""
+
+    def default(self, obj):
+        if isinstance(obj, JSONFragment):
+            return json.loads(obj.content)
+        return super().default(obj)
+
+
+# Stands in for a fragment while orjson encodes the surrounding document; the
+# per-process random token keeps it from colliding with real string values.
+_FRAGMENT_MARKER = f'fragment-{secrets.token_hex(8)}-'
+_FRAGMENT_RE = re.compile(rb'"' + _FRAGMENT_MARKER.encode() + rb'(\d+)"')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` backed by orjson when it is installed.
+
+    Output is the same compact JSON; pretty-printed requests (``indent``) and
+    environments without orjson fall back to the standard renderer.
+    ``JSONFragment`` values are copied into the output without re-encoding.
+    """
+
+    encoder_class = FragmentJSONEncoder
+    _encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        fragments = []
+
+        def default(obj):
+            if isinstance(obj, JSONFragment):
+                fragments.append(obj.content)
+                return f'{_FRAGMENT_MARKER}{len(fragments) - 1}'
+            return self._encoder.default(obj)
+
+        # OPT_UTC_Z: UTC datetimes end in 'Z', as with DRF's encoder.
+        ret = orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        if fragments:
+            ret = _FRAGMENT_RE.sub(lambda match: fragments[int(match.group(1))], ret)
+        # Keep the output a strict JavaScript subset, like JSONRenderer does.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
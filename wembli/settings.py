@@ -43,10 +43,17 @@ INSTALLED_APPS = [
        
     'accounts',
     'shop',
+    'mediafiles',
+    'taskqueue',
+    'monitoring',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.middleware.SlowQueryMiddleware',
+    'monitoring.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'wembli.db_router.PrimaryPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,13 +85,59 @@ WSGI_APPLICATION = 'wembli.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent traffic: WAL so readers don't block the writer,
+# a busy timeout instead of immediate "database is locked" errors, and
+# BEGIN IMMEDIATE so transactions take the write lock up front instead of
+# failing when they upgrade from a read. Writes from one process are further
+# serialized by wembli.write_queue.write_coordinator.
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=20000',
+    'PRAGMA cache_size=-32000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+]
+
+# WEMBLI_DB_NAME points the default database elsewhere, e.g. the scratch
+# database of `manage.py benchmark_startup`.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('WEMBLI_DB_NAME') or BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+        },
     }
 }
 
+# Read replicas for catalog traffic, see wembli/db_router.py. Set
+# WEMBLI_SQLITE_REPLICA=1 to try it locally with a second SQLite file that
+# `manage.py sync_replicas` refreshes from db.sqlite3.
+DATABASE_REPLICAS = []
+if os.environ.get('WEMBLI_SQLITE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-replica.sqlite3',
+        # No persistent connections: sync_replicas swaps the file underneath.
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': 'PRAGMA cache_size=-32000;PRAGMA mmap_size=268435456',
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+
+DATABASE_ROUTERS = ['wembli.db_router.PrimaryReplicaRouter']
+
+# Replicas further behind the primary than this are skipped
+REPLICA_MAX_LAG_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,7 +179,174 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored once per distinct content, named by their SHA-256
+STORAGES = {
+    'default': {
+        'BACKEND': 'mediafiles.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# File fields that reference content-addressed uploads; gc_media keeps files
+# referenced by any of them.
+MEDIA_FILE_FIELDS = [
+    'shop.Product.image',
+    'shop.ProductImage.image',
+    'shop.Category.image',
+    'accounts.Profile.avatar',
+]
+
+# Media paths only staff may download
+MEDIA_PRIVATE_PREFIXES = []
+
+# How file bytes reach clients: None streams them from Django,
+# 'x-accel-redirect' hands them to nginx and 'x-sendfile' to Apache/lighttpd.
+FILE_DELIVERY = os.environ.get('FILE_DELIVERY') or None
+FILE_DELIVERY_MAX_AGE = 3600
+
+# nginx `internal` locations for X-Accel-Redirect and the directories they alias
+ACCEL_REDIRECT_LOCATIONS = {
+    '/protected-media/': MEDIA_ROOT,
+    '/protected-feeds/': os.path.join(BASE_DIR, 'feeds'),
+    '/protected-sitemaps/': os.path.join(BASE_DIR, 'sitemaps'),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wembli',
+    }
+}
+
+
+# Shop
+
+# Boundaries of the price buckets returned by /api/products/?facets=price
+SHOP_FACET_PRICE_BUCKETS = [0, 25, 50, 100, 250, 500]
+SHOP_FACET_CACHE_TIMEOUT = 300
+
+# Number of "frequently bought together" products kept per product
+SHOP_RECOMMENDATIONS_TOP_K = 20
+
+# Half-life of an order's contribution to ?ordering=trending
+SHOP_TRENDING_HALF_LIFE_HOURS = 72
+
+# Rendered product card JSON kept per process (bytes, LRU), plus an optional
+# shared tier: the alias of a cache in CACHES that all processes use
+SHOP_FRAGMENT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+SHOP_FRAGMENT_CACHE_SHARED = None
+SHOP_FRAGMENT_CACHE_TIMEOUT = 3600
+
+# Products per UPDATE / transaction in bulk product operations
+# (/api/products/bulk/, `manage.py bulk_update_products`)
+SHOP_BULK_BATCH_SIZE = 1000
+
+# Partner product feeds (`manage.py build_product_feeds`), written below
+# SHOP_FEED_ROOT in segments of SHOP_FEED_SEGMENT_SIZE product ids and served
+# from /api/feeds/products.<xml|csv|ndjson>.gz. Links and image URLs are
+# made absolute with SHOP_FEED_BASE_URL.
+SHOP_FEED_ROOT = os.path.join(BASE_DIR, 'feeds')
+SHOP_FEED_SEGMENT_SIZE = 5000
+SHOP_FEED_BASE_URL = os.environ.get('WEMBLI_SITE_URL', 'http://localhost:8000')
+SHOP_FEED_CURRENCY = 'USD'
+
+# Storefront pages of products and categories, linked from sitemaps and
+# partner feeds: paths on the public site ({slug} is filled in). The pages are
+# rendered by the storefront, /api/ only serves their data.
+SHOP_PRODUCT_URL_TEMPLATE = '/products/{slug}/'
+SHOP_CATEGORY_URL_TEMPLATE = '/categories/{slug}/'
+
+# Sitemaps (`manage.py build_sitemaps`), written below SHOP_SITEMAP_ROOT in
+# gzipped shards of up to SHOP_SITEMAP_SHARD_SIZE URLs (at most 50,000) and
+# served from /sitemap.xml and /sitemaps/
+SHOP_SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SHOP_SITEMAP_SHARD_SIZE = 50000
+SHOP_SITEMAP_BASE_URL = SHOP_FEED_BASE_URL
+
+# /api/orders/events/: how often each process checks the change table for
+# changes made by other processes, keep-alive interval, and client retry
+SHOP_ORDER_FEED_POLL_SECONDS = 2
+SHOP_ORDER_FEED_HEARTBEAT_SECONDS = 15
+SHOP_ORDER_FEED_RETRY_MS = 5000
+
+
+# Task queue (taskqueue app), worked by `manage.py run_tasks`. Failed tasks
+# are retried after TASKQUEUE_RETRY_BACKOFF * 2**(attempt-1) seconds.
+# TASKQUEUE_EAGER runs tasks in-process right after the enqueuing transaction
+# commits, for running without a worker.
+TASKQUEUE_EAGER = bool(os.environ.get('WEMBLI_TASKQUEUE_EAGER'))
+TASKQUEUE_RETRY_BACKOFF = 5
+TASKQUEUE_RETRY_BACKOFF_MAX = 3600
+TASKQUEUE_LOCK_TIMEOUT = 600
+
+
+# /api/batch/: sub-requests per batch, and threads for concurrent GETs
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+
+# /metrics (monitoring app). With METRICS_DIR set, each process writes its
+# values there every METRICS_FLUSH_SECONDS and /metrics adds them up; needed
+# under a pre-forked server, and the directory should be emptied on deploy.
+# The endpoint requires METRICS_TOKEN as a bearer token when one is set, and
+# otherwise a request from INTERNAL_IPS or a staff user.
+METRICS_DIR = os.environ.get('WEMBLI_METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = 5
+METRICS_TOKEN = os.environ.get('WEMBLI_METRICS_TOKEN') or None
+
+
+# Slow query log (monitoring.slow_queries): queries over the threshold (ms;
+# None turns it off) are logged with their view and call site, and SELECTs
+# are EXPLAINed for SLOW_QUERY_EXPLAIN_SAMPLE_RATE of occurrences, at most once
+# per statement every SLOW_QUERY_EXPLAIN_INTERVAL seconds in each process.
+# Plans reading one of SLOW_QUERY_FULL_SCAN_TABLES in full are flagged.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = 1.0
+SLOW_QUERY_EXPLAIN_INTERVAL = 3600
+SLOW_QUERY_FULL_SCAN_TABLES = ['shop_product', 'shop_order', 'shop_orderitem', 'shop_review']
+SLOW_QUERY_LOG_FILE = os.path.join(BASE_DIR, 'logs', 'slow_queries.log')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+# N+1 detection (monitoring.nplusone): a SELECT repeated NPLUSONE_THRESHOLD
+# times in one request is reported with the serializer field and call site,
+# as a warning ('warn'), an exception ('raise') or not at all (None).
+# `manage.py test` runs with NPLUSONE_TEST_MODE instead (monitoring.runner), so
+# a test request that repeats a query fails; NPlusOneTestMixin also catches
+# queries made outside requests. NPLUSONE_ALLOWLIST holds fnmatch patterns of
+# accepted fields ('ReviewSerializer.user_name'), locations ('shop/views.py:*')
+# or normalized SQL.
+NPLUSONE_MODE = 'warn' if DEBUG else None
+NPLUSONE_TEST_MODE = 'raise'
+NPLUSONE_THRESHOLD = 3
+NPLUSONE_ALLOWLIST = [
+    # Keyset batches: one id query per batch by design
+    'shop/bulk.py:* in iter_id_batches',
+]
+TEST_RUNNER = 'monitoring.runner.NPlusOneTestRunner'
+
+# Startup budget, enforced by shop.tests.StartupBudgetTest (median of cold starts, ms)
+STARTUP_IMPORT_BUDGET_MS = 1500
+STARTUP_FIRST_RESPONSE_BUDGET_MS = 2000
+
+
+# Django REST framework
+
+REST_FRAMEWORK = {
+    # FastJSONRenderer uses orjson when installed and the standard encoder otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'wembli.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
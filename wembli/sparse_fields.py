@@ -0,0 +1,102 @@
+"""
+Sparse fieldsets: ``?fields=id,name,price`` / ``?exclude=description``.
+
+``SparseFieldsetMixin`` drops unrequested fields from a serializer bound to a
+GET request. ``SparseQuerysetMixin`` does the matching work on the queryset of
+a generic view: ``.only()`` the columns still needed, ``select_related`` only
+for requested related fields and prefetches only for requested nested fields.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+
+
+def parse_field_list(value):
+    if not value:
+        return set()
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def get_sparse_fields(request, available):
+    """Names from ``available`` selected by the request's ``fields``/``exclude`` params."""
+    params = getattr(request, 'query_params', request.GET)
+    fields = parse_field_list(params.get('fields'))
+    exclude = parse_field_list(params.get('exclude'))
+    return [name for name in available if (not fields or name in fields) and name not in exclude]
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin; applies to the top-level serializer of GET requests only.
+
+    Fields that are not plain model attributes declare what they need in
+    ``sparse_field_requirements``, e.g. ``{'average_rating': {'prefetch': ['reviews']}}``.
+    """
+
+    sparse_field_requirements = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method == 'GET':
+            selected = set(get_sparse_fields(request, self.fields))
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, context):
+        serializer = cls(context=context)
+        model_meta = queryset.model._meta
+        only = {model_meta.pk.name}
+        select_related = set()
+        prefetch_related = set()
+        can_restrict = True
+
+        for name, field in serializer.fields.items():
+            requirements = cls.sparse_field_requirements.get(name)
+            if requirements is not None:
+                only.update(requirements.get('only', ()))
+                select_related.update(requirements.get('select_related', ()))
+                prefetch_related.update(requirements.get('prefetch', ()))
+                continue
+            if field.source == '*':
+                continue
+
+            parts = field.source_attrs
+            try:
+                model_field = model_meta.get_field(parts[0])
+            except FieldDoesNotExist:
+                # A property or method; we can't tell which columns it reads.
+                can_restrict = False
+                continue
+
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch_related.add(parts[0])
+            elif not model_field.concrete:
+                # Reverse one-to-one: join it, but .only() can't name it.
+                select_related.add(parts[0])
+                can_restrict = False
+            elif model_field.is_relation and len(parts) > 1:
+                # 'category.name' -> select_related('category'), only('category__name')
+                select_related.add('__'.join(parts[:-1]))
+                only.update('__'.join(parts[:depth]) for depth in range(1, len(parts) + 1))
+            else:
+                only.add(model_field.name)
+
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(prefetch_related))
+        if can_restrict:
+            queryset = queryset.only(*sorted(only))
+        return queryset
+
+
+class SparseQuerysetMixin:
+    """Generic view mixin that prunes the queryset to the requested serializer fields."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.request.method == 'GET' and hasattr(serializer_class, 'optimize_queryset'):
+            queryset = serializer_class.optimize_queryset(queryset, self.get_serializer_context())
+        return queryset
@@ -0,0 +1,143 @@
+"""
+Cold-start measurement for the WSGI and ASGI entry points.
+
+Every run happens in a fresh interpreter, because only a fresh interpreter
+shows what a new worker or a short-lived ``manage.py`` pays: the time to
+import ``wembli.wsgi``/``wembli.asgi`` (settings, app registry, models,
+signals) and the time to serve the first request (URLconf, views,
+serializers, renderers). The probes run against a freshly migrated scratch
+database, so the first request is a real ``200`` from a view that queries,
+serializes and renders. ``DEFERRED_MODULES`` must not be imported by
+startup itself; they load on first use.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+ENTRYPOINTS = ('wsgi', 'asgi')
+
+PROBE_PATH = '/api/categories/'
+
+DEFERRED_MODULES = (
+    'PIL.Image',
+    'rest_framework.serializers',
+    'shop.serializers',
+    'shop.views',
+    'accounts.serializers',
+    'accounts.views',
+)
+
+PROBE = r'''
+import asyncio, importlib, io, json, sys, time
+
+entrypoint, path, deferred = sys.argv[1], sys.argv[2], sys.argv[3].split(',')
+started = time.perf_counter()
+application = importlib.import_module('wembli.' + entrypoint).application
+imported = time.perf_counter()
+loaded = [name for name in deferred if name in sys.modules]
+
+if entrypoint == 'wsgi':
+    statuses = []
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0), 'wsgi.multithread': False,
+        'wsgi.multiprocess': True, 'wsgi.run_once': False,
+    }
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(body)
+    getattr(body, 'close', lambda: None)()
+    status = int(statuses[0].split()[0])
+else:
+    messages = []
+    requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+        if message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    async def serve():
+        global done
+        done = asyncio.Event()
+        await application(scope, receive, send)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    asyncio.run(serve())
+    status = next(m['status'] for m in messages if m['type'] == 'http.response.start')
+
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (responded - imported) * 1000,
+    'status': status,
+    'loaded_at_import': loaded,
+}))
+'''
+
+
+def probe_env(database_name):
+    return dict(os.environ, DJANGO_SETTINGS_MODULE='wembli.settings', WEMBLI_DB_NAME=database_name)
+
+
+@contextmanager
+def probe_database():
+    """Path of a freshly migrated SQLite file, migrated in its own interpreter like the probes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        database_name = os.path.join(tmp, 'startup.sqlite3')
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '--no-input', '-v0'],
+            cwd=BASE_DIR, env=probe_env(database_name), capture_output=True, text=True, check=True,
+        )
+        yield database_name
+
+
+def probe_startup(database_name, entrypoint='wsgi', path=PROBE_PATH):
+    """Import ``wembli.<entrypoint>`` and serve one GET in a fresh interpreter."""
+    if entrypoint not in ENTRYPOINTS:
+        raise ValueError(f'Unknown entry point {entrypoint!r}')
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, entrypoint, path, ','.join(DEFERRED_MODULES)],
+        cwd=BASE_DIR, env=probe_env(database_name), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(entrypoint='wsgi', path=PROBE_PATH, runs=5, database_name=None):
+    """Median import and first-response times over ``runs`` cold starts.
+
+    Without ``database_name`` the probes use a scratch database of their own.
+    """
+    if database_name is None:
+        with probe_database() as database_name:
+            return measure_startup(entrypoint, path, runs, database_name)
+    samples = [probe_startup(database_name, entrypoint, path) for _ in range(runs)]
+    return {
+        'entrypoint': entrypoint,
+        'runs': runs,
+        'import_ms': statistics.median(s['import_ms'] for s in samples),
+        'first_response_ms': statistics.median(s['first_response_ms'] for s in samples),
+        'statuses': sorted({s['status'] for s in samples}),
+        'loaded_at_import': sorted({name for s in samples for name in s['loaded_at_import']}),
+    }
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from mediafiles.views import serve_media
+from monitoring.views import metrics_view
+from shop.views import sitemap_index, sitemap_shard
+from wembli.batch import batch_view
 
 admin.site.site_header = "Webmbli Ecommerce Adminstration"
 admin.site.site_title = "Webmbli Ecommerce"
@@ -9,7 +12,12 @@ admin.site.index_title = "Webmbli Ecommerce Admin"
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/batch/', batch_view, name='batch'),
+    path('metrics', metrics_view, name='metrics'),
+    path('sitemap.xml', sitemap_index, name='sitemap-index'),
+    path('sitemaps/<str:name>', sitemap_shard, name='sitemap-shard'),
     path('api/', include('shop.urls')),
     path('accounts/', include('accounts.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='media'),
+]
 
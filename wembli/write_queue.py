@@ -0,0 +1,104 @@
+"""
+In-process write coordination for SQLite.
+
+SQLite allows one writer at a time. When many threads of one process try to
+write at once they spin on the database lock until ``busy_timeout`` expires
+and some fail with "database is locked". ``WriteCoordinator`` instead makes
+them take turns on an in-process lock (``atomic``), and can group short
+independent writes from many threads into one transaction and one fsync
+(``submit``). On other database backends both degrade to plain transactions.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.db import close_old_connections, connections, transaction
+
+
+class WriteCoordinator:
+    def __init__(self, using='default', max_batch=64, max_wait=0.002):
+        self.using = using
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._lock = threading.RLock()
+        self._jobs = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    @property
+    def serializes(self):
+        return connections[self.using].vendor == 'sqlite'
+
+    @contextmanager
+    def atomic(self):
+        """``transaction.atomic`` that waits its turn instead of contending for the lock."""
+        if not self.serializes:
+            with transaction.atomic(using=self.using):
+                yield
+            return
+        with self._lock:
+            with transaction.atomic(using=self.using):
+                yield
+
+    def submit(self, func, *args, **kwargs):
+        """Run ``func`` in the next batched write transaction and return its result.
+
+        Blocks until the batch has committed. ``func`` runs on the writer
+        thread, so it must not depend on uncommitted state of the caller; when
+        the caller is itself inside a transaction, ``func`` runs inline instead.
+        """
+        if not self.serializes or connections[self.using].in_atomic_block:
+            with transaction.atomic(using=self.using):
+                return func(*args, **kwargs)
+
+        future = Future()
+        self._jobs.put((future, func, args, kwargs))
+        self._ensure_writer()
+        return future.result()
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._writer.start()
+
+    def _next_batch(self):
+        batch = [self._jobs.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._jobs.get(timeout=self.max_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            results = []
+            try:
+                with self._lock, transaction.atomic(using=self.using):
+                    for future, func, args, kwargs in batch:
+                        # A savepoint per job: one failing job doesn't roll back the others.
+                        try:
+                            with transaction.atomic(using=self.using):
+                                results.append((future, func(*args, **kwargs), None))
+                        except Exception as exc:
+                            results.append((future, None, exc))
+            except Exception as exc:
+                for future, *_ in batch:
+                    future.set_exception(exc)
+                continue
+
+            for future, result, exc in results:
+                if exc is not None:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+
+
+write_coordinator = WriteCoordinator()
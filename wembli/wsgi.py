@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wembli.settings')
 
 application = get_wsgi_application()
+
+# Emulate the front-end server's X-Accel-Redirect / X-Sendfile handling locally.
+if os.environ.get('WEMBLI_OFFLOAD_PROXY'):
+    from mediafiles.proxy import OffloadProxy
+
+    application = OffloadProxy(application)